@@ -36,6 +36,77 @@ class Config(object):
     # Alpha Vantage API Key
     ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY", default="demo")
 
+    # Symbol of the benchmark used by the portfolio analytics (beta)
+    BENCHMARK_SYMBOL = os.getenv("BENCHMARK_SYMBOL", default="SPY")
+
+    # Number of days of daily returns used for the correlation matrix
+    CORRELATION_LOOKBACK_DAYS = int(
+        os.getenv("CORRELATION_LOOKBACK_DAYS", default=365)
+    )
+
+    # Monte Carlo projection of the portfolios: number of simulated
+    # paths, number of trading days simulated, number of worker
+    # processes, number of days of daily returns used to estimate the
+    # statistics and seconds before a failed projection is retried
+    PROJECTION_SIMULATIONS = int(
+        os.getenv("PROJECTION_SIMULATIONS", default=5000)
+    )
+    PROJECTION_HORIZON_DAYS = int(
+        os.getenv("PROJECTION_HORIZON_DAYS", default=252)
+    )
+    PROJECTION_WORKERS = int(os.getenv("PROJECTION_WORKERS", default=2))
+    PROJECTION_LOOKBACK_DAYS = int(
+        os.getenv("PROJECTION_LOOKBACK_DAYS", default=365)
+    )
+    PROJECTION_RETRY_SECONDS = int(
+        os.getenv("PROJECTION_RETRY_SECONDS", default=300)
+    )
+
+    # Quotes API: seconds before the quote of a symbol whose refresh
+    # failed is retrieved from Alpha Vantage again
+    QUOTE_RETRY_SECONDS = int(os.getenv("QUOTE_RETRY_SECONDS", default=300))
+
+    # Live price streams (Server-Sent Events): maximum number of queued
+    # updates per stream, seconds between heartbeats, maximum duration
+    # of a stream (the browser then reconnects) and seconds between the
+    # refreshes of the quotes of the streamed symbols (0: no refreshes)
+    #
+    # Sizing: every open stocks page holds one gthread worker thread for
+    # its stream, so a process with GUNICORN_THREADS threads (see the
+    # Procfile) serves at most PRICE_STREAM_MAX_STREAMS streams, and
+    # keeps the other threads for the pages and the API. The pages that
+    # are refused a stream (503) poll the quotes API every
+    # PRICE_POLL_SECONDS instead. With WEB_CONCURRENCY processes, up to
+    # WEB_CONCURRENCY * PRICE_STREAM_MAX_STREAMS pages have a stream.
+    PRICE_STREAM_QUEUE_SIZE = int(
+        os.getenv("PRICE_STREAM_QUEUE_SIZE", default=100)
+    )
+    PRICE_STREAM_HEARTBEAT_SECONDS = float(
+        os.getenv("PRICE_STREAM_HEARTBEAT_SECONDS", default=15)
+    )
+    PRICE_STREAM_MAX_SECONDS = float(
+        os.getenv("PRICE_STREAM_MAX_SECONDS", default=300)
+    )
+    PRICE_STREAM_REFRESH_SECONDS = float(
+        os.getenv("PRICE_STREAM_REFRESH_SECONDS", default=300)
+    )
+    PRICE_STREAM_MAX_STREAMS = int(
+        os.getenv("PRICE_STREAM_MAX_STREAMS", default=24)
+    )
+    PRICE_POLL_SECONDS = int(os.getenv("PRICE_POLL_SECONDS", default=60))
+
+    # Compression of the responses (HTML and JSON): gzip level (1-9),
+    # brotli quality (0-11) and minimum size (in bytes) of the bodies
+    # that are compressed (streamed bodies are always compressed)
+    COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", default=6))
+    COMPRESSION_BROTLI_QUALITY = int(
+        os.getenv("COMPRESSION_BROTLI_QUALITY", default=5)
+    )
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", default=500))
+
+    # Number of stocks displayed per page in the list of stocks
+    STOCKS_PER_PAGE = int(os.getenv("STOCKS_PER_PAGE", default=25))
+
     # Logging
     LOG_TO_STDOUT = os.getenv("LOG_TO_STDOUT", default=False)
 
@@ -63,3 +134,9 @@ class TestingConfig(Config):
         default=f"sqlite:///{os.path.join(BASEDIR, 'instance', 'test.db')}",
     )
     WTF_CSRF_ENABLED = False
+    PROJECTION_SIMULATIONS = 400
+    PROJECTION_HORIZON_DAYS = 20
+    PROJECTION_WORKERS = 1
+    PRICE_STREAM_HEARTBEAT_SECONDS = 0.05
+    PRICE_STREAM_MAX_SECONDS = 0.2
+    PRICE_STREAM_REFRESH_SECONDS = 0
@@ -50,7 +50,9 @@ def create_app() -> Flask:
 
     initialize_extensions(app)
     register_blueprints(app)
+    register_static_assets(app)
     configure_logging(app)
+    register_compression(app)
     register_app_callbacks(app)
     register_error_pages(app)
     return app
@@ -81,6 +83,7 @@ def initialize_extensions(app):
 
 def register_blueprints(app: Flask) -> None:
     # import the blueprints
+    from project.api import api_blueprint
     from project.stocks import stocks_blueprint
     from project.users import users_blueprint
 
@@ -88,6 +91,22 @@ def register_blueprints(app: Flask) -> None:
     # register blueprints with the Flask application instance (app)
     app.register_blueprint(stocks_blueprint)
     app.register_blueprint(users_blueprint, url_prefix="/users")
+    app.register_blueprint(api_blueprint, url_prefix="/api/v1")
+
+
+def register_static_assets(app: Flask) -> None:
+    # serve the static files under fingerprinted names, precompressed
+    from project.assets import init_static_assets
+
+    init_static_assets(app)
+
+
+def register_compression(app: Flask) -> None:
+    # compress the responses; the after_request callbacks of the app run
+    # in the reverse order of registration, so this one runs last
+    from project.compression import compress_response
+
+    app.after_request(compress_response)
 
 
 def configure_logging(app: Flask) -> None:
@@ -135,14 +154,19 @@ def register_app_callbacks(app: Flask):
 
 
 def register_error_pages(app: Flask):
+    from project.pages import cached_page
+
     @app.errorhandler(404)
+    @cached_page
     def page_not_found(e):
         return render_template("404.html"), 404
 
     @app.errorhandler(405)
+    @cached_page
     def method_not_allowed(e):
         return render_template("405.html"), 405
 
     @app.errorhandler(403)
+    @cached_page
     def page_forbidden(e):
         return render_template("403.html"), 403
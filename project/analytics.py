@@ -0,0 +1,345 @@
+"""
+Analytics of the portfolios: return, volatility, maximum drawdown and
+beta against a benchmark, for each holding and for the whole portfolio.
+
+The stored daily closes of the held symbols and the benchmark are
+loaded into a single (dates x symbols) NumPy array, and each statistic
+is computed for every symbol at once using vectorized operations. The
+results are cached per user and trading day.
+"""
+import math
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func
+
+from project import database
+from project.cache import MemoryCache
+from project.history import compute_shares_held, get_lots, load_close_prices
+from project.models import DailyPrice
+from project.queries import get_cost_bases, get_lots_version
+
+TRADING_DAYS_PER_YEAR = 252
+
+# cache of the analytics, keyed by user, trading day and lots version
+analytics_cache = MemoryCache(max_entries=1024)
+
+# cache of the correlation matrices, keyed by symbols and trading day,
+# so the same matrix is shared by every user holding the same symbols
+correlation_cache = MemoryCache(max_entries=256)
+
+
+# --------------
+# Helper Classes
+# --------------
+
+
+@dataclass
+class HoldingAnalytics:
+    """Statistics of the lots of a user with the same symbol."""
+
+    stock_symbol: str
+    value: int
+    cost_basis: int
+    total_return: float
+    volatility: float
+    max_drawdown: float
+    beta: float
+
+
+@dataclass
+class PortfolioAnalytics:
+    """Statistics of the portfolio of a user and of each holding."""
+
+    as_of: date
+    benchmark_symbol: str
+    value: int
+    cost_basis: int
+    total_return: float
+    volatility: float
+    max_drawdown: float
+    beta: float
+    holdings: list
+
+
+@dataclass
+class CorrelationMatrix:
+    """
+    Pairwise correlations of the daily returns of a set of symbols.
+    """
+
+    as_of: date
+    symbols: list
+    correlations: list
+
+
+# ----------------
+# Helper Functions
+# ----------------
+
+
+def to_float(value) -> float:
+    """Convert a NumPy value to a float (None if it is not defined)."""
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def compute_returns(prices):
+    """Compute the daily (simple) returns of each column of prices."""
+    previous_prices = prices[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(
+            previous_prices > 0, prices[1:] / previous_prices - 1.0, 0.0
+        )
+    return returns
+
+
+def compute_volatility(returns, valid):
+    """
+    Compute the annualized volatility of each column of returns, only
+    using the returns where valid is True.
+    """
+    count = valid.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(valid, returns, 0.0).sum(axis=0) / count
+        deviations = np.where(valid, returns - mean, 0.0)
+        variance = (deviations**2).sum(axis=0) / (count - 1)
+    return np.sqrt(variance * TRADING_DAYS_PER_YEAR)
+
+
+def compute_beta(returns, benchmark_returns, valid):
+    """
+    Compute the beta of each column of returns against the benchmark,
+    only using the returns where valid is True.
+    """
+    benchmark_returns = np.broadcast_to(
+        benchmark_returns[:, np.newaxis], returns.shape
+    )
+    count = valid.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(valid, returns, 0.0).sum(axis=0) / count
+        benchmark_mean = (
+            np.where(valid, benchmark_returns, 0.0).sum(axis=0) / count
+        )
+        benchmark_deviations = np.where(
+            valid, benchmark_returns - benchmark_mean, 0.0
+        )
+        covariance = (
+            np.where(valid, returns - mean, 0.0) * benchmark_deviations
+        ).sum(axis=0)
+        variance = (benchmark_deviations**2).sum(axis=0)
+        return np.where(variance > 0, covariance / variance, np.nan)
+
+
+def compute_max_drawdown(prices):
+    """
+    Compute the maximum drawdown (largest fall from a previous peak, as
+    a fraction) of each column of prices.
+    """
+    peaks = np.maximum.accumulate(prices, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdowns = np.where(peaks > 0, 1.0 - prices / peaks, 0.0)
+    return drawdowns.max(axis=0, initial=0.0)
+
+
+def compute_portfolio_analytics(
+    lots: list,
+    cost_bases: dict,
+    symbols: list,
+    benchmark_symbol: str,
+    dates,
+    closes,
+) -> PortfolioAnalytics:
+    """
+    Compute the analytics of a portfolio from its lots, the cost bases
+    (in cents) of the shares held of each symbol and the daily closes of
+    its symbols, followed by the closes of the benchmark (as the last
+    column).
+    """
+    prices = closes[:, :-1].astype(np.float64)
+    benchmark_returns = compute_returns(closes[:, -1].astype(np.float64))
+    shares_held = compute_shares_held(lots, symbols, dates)
+
+    # per holding: only the days on which the stock was held count
+    returns = compute_returns(prices)
+    held = (shares_held[:-1] > 0) & (prices[:-1] > 0)
+    held_prices = np.where(shares_held > 0, prices, 0.0)
+    volatilities = compute_volatility(returns, held)
+    betas = compute_beta(returns, benchmark_returns, held)
+    max_drawdowns = compute_max_drawdown(held_prices)
+
+    values = shares_held[-1] * closes[-1, :-1]
+    cost_bases = np.array(
+        [cost_bases.get(symbol, 0) for symbol in symbols], dtype=np.int64
+    )
+
+    # portfolio: the daily return is the return of each holding weighted
+    # by its value on the previous day, so purchases are not returns
+    holding_values = shares_held * prices
+    previous_values = holding_values[:-1].sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        portfolio_returns = np.where(
+            previous_values > 0,
+            (holding_values[:-1] * returns).sum(axis=1) / previous_values,
+            0.0,
+        )
+    invested = (previous_values > 0)[:, np.newaxis]
+    portfolio_returns = portfolio_returns[:, np.newaxis]
+    growth = np.cumprod(1.0 + portfolio_returns, axis=0)
+
+    value = int(values.sum())
+    cost_basis = int(cost_bases.sum())
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total_returns = np.where(
+            cost_bases > 0, values / cost_bases - 1.0, np.nan
+        )
+        total_return = np.float64(value) / cost_basis - 1.0
+
+    holdings = [
+        HoldingAnalytics(
+            stock_symbol=symbol,
+            value=int(values[index]),
+            cost_basis=int(cost_bases[index]),
+            total_return=to_float(total_returns[index]),
+            volatility=to_float(volatilities[index]),
+            max_drawdown=to_float(max_drawdowns[index]),
+            beta=to_float(betas[index]),
+        )
+        for index, symbol in enumerate(symbols)
+    ]
+    return PortfolioAnalytics(
+        as_of=dates[-1].item(),
+        benchmark_symbol=benchmark_symbol,
+        value=value,
+        cost_basis=cost_basis,
+        total_return=to_float(total_return),
+        volatility=to_float(
+            compute_volatility(portfolio_returns, invested)[0]
+        ),
+        max_drawdown=to_float(compute_max_drawdown(growth)[0]),
+        beta=to_float(
+            compute_beta(portfolio_returns, benchmark_returns, invested)[0]
+        ),
+        holdings=holdings,
+    )
+
+
+def compute_correlation_matrix(closes):
+    """
+    Compute the correlations of the daily returns of each pair of
+    columns of closes, using the days on which both columns of the pair
+    have a previous close (pairwise-complete observations), so a symbol
+    with a short history does not shorten the history of the others.
+
+    The sums over the common days of every pair are computed at once
+    with matrix products.
+    """
+    prices = closes.astype(np.float64)
+    valid = (prices[:-1] > 0).astype(np.float64)
+    returns = compute_returns(prices) * valid
+
+    # (i, j): sums over the days on which both i and j have a return
+    count = valid.T @ valid
+    sums = returns.T @ valid
+    sums_of_squares = (returns**2).T @ valid
+    sums_of_products = returns.T @ returns
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariances = sums_of_products - sums * sums.T / count
+        variances = sums_of_squares - sums**2 / count
+        correlations = covariances / np.sqrt(variances * variances.T)
+    correlations[count < 2] = np.nan
+    return np.clip(correlations, -1.0, 1.0)
+
+
+# ---------
+# Analytics
+# ---------
+
+
+def get_portfolio_analytics(user_id: int) -> PortfolioAnalytics:
+    """
+    Return the analytics of the portfolio of a user (or None if there
+    are no lots or no stored prices), computed once per trading day.
+    """
+    lots = get_lots(user_id)
+    if not lots:
+        return None
+
+    symbols = sorted({lot[0] for lot in lots})
+    benchmark_symbol = current_app.config["BENCHMARK_SYMBOL"]
+    latest_date = (
+        database.session.query(func.max(DailyPrice.date))
+        .filter(DailyPrice.stock_symbol.in_(symbols))
+        .scalar()
+    )
+    if latest_date is None:
+        return None
+
+    def compute():
+        # the benchmark is added as an extra (last) column, which is a
+        # copy of its own column if the benchmark is also held
+        start_date = min(lot[1] for lot in lots).date()
+        loaded_symbols = symbols
+        if benchmark_symbol not in symbols:
+            loaded_symbols = symbols + [benchmark_symbol]
+        dates, closes = load_close_prices(
+            loaded_symbols, start_date, latest_date
+        )
+        if len(dates) == 0:
+            return None
+        benchmark_column = loaded_symbols.index(benchmark_symbol)
+        closes = np.column_stack(
+            (closes[:, : len(symbols)], closes[:, benchmark_column])
+        )
+        return compute_portfolio_analytics(
+            lots,
+            get_cost_bases(user_id),
+            symbols,
+            benchmark_symbol,
+            dates,
+            closes,
+        )
+
+    key = (
+        "portfolio",
+        user_id,
+        latest_date,
+        benchmark_symbol,
+        get_lots_version(user_id),
+    )
+    return analytics_cache.get_or_compute(key, compute)
+
+
+def get_correlation_matrix(symbols: list) -> CorrelationMatrix:
+    """
+    Return the correlation matrix of the daily returns of the symbols
+    over the last CORRELATION_LOOKBACK_DAYS (or None if there are no
+    stored prices), computed once per set of symbols and trading day.
+    """
+    symbols = sorted(set(symbols))
+    latest_date = (
+        database.session.query(func.max(DailyPrice.date))
+        .filter(DailyPrice.stock_symbol.in_(symbols))
+        .scalar()
+    )
+    if latest_date is None:
+        return None
+
+    def compute():
+        start_date = latest_date - timedelta(
+            days=current_app.config["CORRELATION_LOOKBACK_DAYS"]
+        )
+        dates, closes = load_close_prices(symbols, start_date, latest_date)
+        correlations = compute_correlation_matrix(closes)
+        return CorrelationMatrix(
+            as_of=latest_date,
+            symbols=symbols,
+            correlations=[
+                [to_float(value) for value in row] for row in correlations
+            ],
+        )
+
+    key = ("correlation", tuple(symbols), latest_date)
+    return correlation_cache.get_or_compute(key, compute)
@@ -0,0 +1,10 @@
+"""
+The api blueprint provides a versioned JSON API for this application.
+Specifically, it returns the portfolio data of the logged-in user
+without rendering HTML.
+"""
+from flask import Blueprint
+
+api_blueprint = Blueprint("api", __name__)
+
+from . import routes
@@ -0,0 +1,274 @@
+from datetime import datetime
+from functools import wraps
+
+from flask import abort, current_app, request
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+
+from project import database
+from project.encoding import json_response
+from project.models import Stock
+from project.prices import publish_prices, refresh_stock_prices
+from project.queries import (
+    SORT_COLUMNS,
+    SORT_ORDERS,
+    decode_cursor,
+    get_held_symbols,
+    get_portfolio_return,
+    get_portfolio_snapshot,
+    get_portfolio_totals,
+    get_positions,
+    get_stocks_page,
+)
+from project.quotes import MAX_QUOTE_SYMBOLS, get_quotes
+
+from . import api_blueprint
+
+# fields of each resource (all amounts are integer cents)
+STOCK_FIELDS = (
+    "id",
+    "stock_symbol",
+    "number_of_shares",
+    "purchase_price",
+    "purchase_date",
+    "current_price",
+    "current_price_date",
+    "position_value",
+)
+PORTFOLIO_FIELDS = (
+    "value",
+    "cost_basis",
+    "gain",
+    "time_weighted_return",
+    "money_weighted_return",
+    "holdings",
+)
+HOLDING_FIELDS = (
+    "stock_symbol",
+    "number_of_shares",
+    "cost_basis",
+    "current_price",
+    "market_value",
+    "realized_gain",
+)
+
+# maximum number of stocks on a page
+MAX_PAGE_SIZE = 100
+
+
+# ----------------
+# Helper Functions
+# ----------------
+
+
+def api_login_required(f):
+    """
+    Require a logged-in user with a confirmed email address, returning
+    401 (or 403) instead of redirecting to the login page.
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated:
+            abort(401)
+        if not current_user.email_confirmed:
+            abort(403, "Email address not confirmed.")
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+
+def get_fields(available_fields: tuple) -> tuple:
+    """
+    Return the fields selected by the 'fields' argument of the request
+    (comma-separated), or all of the available fields (400 if a field is
+    not available).
+    """
+    if not request.args.get("fields"):
+        return available_fields
+    fields = tuple(request.args["fields"].split(","))
+    invalid_fields = [
+        field for field in fields if field not in available_fields
+    ]
+    if invalid_fields:
+        abort(400, f"Invalid fields: {', '.join(invalid_fields)}.")
+    return fields
+
+
+def get_symbols() -> list:
+    """
+    Return the (unique, upper case) symbols of the 'symbols' argument of
+    the request (comma-separated), with 400 if there are none, too many
+    or invalid symbols.
+    """
+    symbols = list(
+        dict.fromkeys(
+            symbol.strip().upper()
+            for symbol in request.args.get("symbols", "").split(",")
+            if symbol.strip()
+        )
+    )
+    if not symbols:
+        abort(400, "No symbols.")
+    if len(symbols) > MAX_QUOTE_SYMBOLS:
+        abort(400, f"At most {MAX_QUOTE_SYMBOLS} symbols are allowed.")
+    invalid_symbols = [
+        symbol for symbol in symbols if not symbol.isalpha() or len(symbol) > 5
+    ]
+    if invalid_symbols:
+        abort(400, f"Invalid symbols: {', '.join(invalid_symbols)}.")
+    return symbols
+
+
+def serialize(row, fields: tuple) -> dict:
+    """
+    Return the fields of a row (model or dataclass) as a dict, with the
+    dates and datetimes as ISO strings.
+    """
+    data = {}
+    for field in fields:
+        value = getattr(row, field)
+        if hasattr(value, "isoformat"):
+            value = value.isoformat()
+        data[field] = value
+    return data
+
+
+# (the codes with an error page are registered explicitly, as handlers
+# for a code take precedence over the handlers for HTTPException)
+@api_blueprint.errorhandler(HTTPException)
+@api_blueprint.errorhandler(403)
+@api_blueprint.errorhandler(404)
+@api_blueprint.errorhandler(405)
+def api_error(e):
+    return json_response({"error": e.description}, e.code)
+
+
+# ------
+# Routes
+# ------
+
+
+@api_blueprint.route("/portfolio")
+@api_login_required
+def get_portfolio():
+    fields = get_fields(PORTFOLIO_FIELDS)
+
+    # the totals are read from the snapshot of the portfolio (if any)
+    totals = get_portfolio_snapshot(current_user.id)
+    if totals is None:
+        totals = get_portfolio_totals(current_user.id)
+    portfolio = {
+        "value": totals.value,
+        "cost_basis": totals.cost_basis,
+        "gain": totals.gain,
+    }
+    if "time_weighted_return" in fields or "money_weighted_return" in fields:
+        portfolio_return = get_portfolio_return(current_user.id)
+        portfolio["time_weighted_return"] = (
+            portfolio_return and portfolio_return.time_weighted_return
+        )
+        portfolio["money_weighted_return"] = (
+            portfolio_return and portfolio_return.money_weighted_return
+        )
+    if "holdings" in fields:
+        portfolio["holdings"] = [
+            serialize(position, HOLDING_FIELDS)
+            for position in get_positions(current_user.id)
+        ]
+    return json_response({field: portfolio[field] for field in fields})
+
+
+@api_blueprint.route("/stocks")
+@api_login_required
+def list_stocks():
+    fields = get_fields(STOCK_FIELDS)
+    sort = request.args.get("sort", "symbol")
+    order = request.args.get("order", "asc")
+    symbol = request.args.get("symbol", "").strip().upper()
+    limit = request.args.get(
+        "limit", current_app.config["STOCKS_PER_PAGE"], type=int
+    )
+    if sort not in SORT_COLUMNS or order not in SORT_ORDERS:
+        abort(400, "Invalid sort column or order.")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        abort(400, f"The limit must be between 1 and {MAX_PAGE_SIZE}.")
+
+    cursor = None
+    if request.args.get("cursor"):
+        try:
+            cursor = decode_cursor(request.args["cursor"], sort)
+        except ValueError as e:
+            abort(400, str(e))
+
+    # same (keyset) paging and price refresh as the list of stocks
+    stocks, next_cursor = get_stocks_page(
+        current_user.id,
+        sort=sort,
+        order=order,
+        symbol=symbol,
+        cursor=cursor,
+        per_page=limit,
+    )
+    latest_prices = refresh_stock_prices(stocks, [current_user.id])
+    database.session.commit()
+    publish_prices(latest_prices)
+    return json_response(
+        {
+            "stocks": [serialize(stock, fields) for stock in stocks],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@api_blueprint.route("/stocks/<int:id>")
+@api_login_required
+def get_stock(id):
+    fields = get_fields(STOCK_FIELDS)
+    stock = Stock.query.filter_by(id=id).first()
+    if stock is None:
+        abort(404, "Stock not found.")
+    if stock.user_id != current_user.id:
+        abort(403, "Stock is owned by another user.")
+
+    latest_prices = refresh_stock_prices([stock], [current_user.id])
+    database.session.commit()
+    publish_prices(latest_prices)
+    return json_response(serialize(stock, fields))
+
+
+@api_blueprint.route("/quotes")
+@api_login_required
+def list_quotes():
+    symbols = get_symbols()
+    now = datetime.now()
+    # (only the symbols held by the user are retrieved from upstream,
+    # and only the lots of the user are updated)
+    quotes = get_quotes(
+        symbols, now, get_held_symbols(current_user.id), [current_user.id]
+    )
+
+    # the age (in seconds) of each quote lets the clients decide when
+    # to poll again
+    data = {}
+    for symbol in symbols:
+        if symbol not in quotes:
+            continue
+        quote, source = quotes[symbol]
+        data[symbol] = {
+            "price": quote.price,
+            "price_date": quote.price_date.isoformat(),
+            "retrieved_at": quote.retrieved_at.isoformat(timespec="seconds"),
+            "age": int((now - quote.retrieved_at).total_seconds()),
+            "source": source,
+        }
+    return json_response(
+        {
+            "as_of": now.isoformat(timespec="seconds"),
+            "quotes": data,
+            "missing": [symbol for symbol in symbols if symbol not in quotes],
+            "max_age": max(
+                (quote["age"] for quote in data.values()), default=None
+            ),
+        }
+    )
@@ -0,0 +1,158 @@
+"""
+Fingerprinted static files (stylesheets, scripts and images).
+
+When the application starts, every file of the static folder is hashed,
+and url_for('static', filename=...) returns the fingerprinted name of
+the file (e.g. css/base_style.1a2b3c4d5e.css). The fingerprinted files
+are served from memory, with their gzip (and brotli, if installed)
+variants compressed ahead of time, and are cached by the browsers for a
+year as immutable: a change of a file changes its URL. The original
+names are still served by Flask.
+
+Chart.js is vendored in static/vendor, so it is served the same way
+instead of being loaded from a CDN.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+from dataclasses import dataclass
+
+from flask import Flask, current_app, request
+
+from project.cache import MemoryCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# number of hex digits of the hash added to the names of the files
+FINGERPRINT_LENGTH = 10
+
+# the fingerprinted files never change, so they are cached for a year
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+
+# types of the files that are compressed (the images already are)
+COMPRESSED_MIMETYPES = (
+    "text/css",
+    "text/javascript",
+    "application/javascript",
+)
+
+# cache of the compressed variants of the files, keyed by digest and
+# encoding (so that the files are compressed once per process, even if
+# several apps are created)
+compressed_cache = MemoryCache(max_entries=1024)
+
+
+@dataclass
+class StaticAsset:
+    """Static file, with its compressed variants (None if not used)."""
+
+    filename: str
+    mimetype: str
+    body: bytes
+    digest: str
+    gzip_body: bytes = None
+    brotli_body: bytes = None
+
+
+def fingerprint_filename(filename: str, digest: str) -> str:
+    """Add the digest of a file to its name (before the extension)."""
+    root, extension = posixpath.splitext(filename)
+    return f"{root}.{digest}{extension}"
+
+
+def load_static_asset(static_folder: str, filename: str) -> StaticAsset:
+    """Read, hash and compress a file of the static folder."""
+    with open(os.path.join(static_folder, filename), "rb") as file:
+        body = file.read()
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    asset = StaticAsset(
+        filename=filename,
+        mimetype=mimetype,
+        body=body,
+        digest=hashlib.sha256(body).hexdigest()[:FINGERPRINT_LENGTH],
+    )
+    if mimetype in COMPRESSED_MIMETYPES:
+        asset.gzip_body = compressed_cache.get_or_compute(
+            (asset.digest, "gzip"),
+            lambda: gzip.compress(body, compresslevel=9),
+        )
+        if brotli is not None:
+            asset.brotli_body = compressed_cache.get_or_compute(
+                (asset.digest, "br"), lambda: brotli.compress(body)
+            )
+    return asset
+
+
+def load_static_assets(static_folder: str) -> dict:
+    """
+    Return the files of the static folder: a dict of fingerprinted name
+    (with '/' separators) -> StaticAsset.
+    """
+    assets = {}
+    for directory, _, filenames in os.walk(static_folder):
+        for name in filenames:
+            path = os.path.join(directory, name)
+            filename = os.path.relpath(path, static_folder).replace(
+                os.sep, "/"
+            )
+            asset = load_static_asset(static_folder, filename)
+            assets[fingerprint_filename(filename, asset.digest)] = asset
+    return assets
+
+
+def make_asset_response(asset: StaticAsset):
+    """
+    Return a response of a fingerprinted file, with the best variant
+    that the client accepts.
+    """
+    body = asset.body
+    encoding = None
+    if asset.brotli_body is not None and "br" in request.accept_encodings:
+        body, encoding = asset.brotli_body, "br"
+    elif asset.gzip_body is not None and "gzip" in request.accept_encodings:
+        body, encoding = asset.gzip_body, "gzip"
+
+    response = current_app.response_class(body, mimetype=asset.mimetype)
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    if asset.gzip_body is not None:
+        response.vary.add("Accept-Encoding")
+    response.set_etag(f"{asset.digest}-{encoding or 'identity'}")
+    response.cache_control.public = True
+    response.cache_control.max_age = ASSET_MAX_AGE
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
+def init_static_assets(app: Flask) -> None:
+    """
+    Fingerprint the files of the static folder of the app: the URLs of
+    the static files use the fingerprinted names, which are served by
+    make_asset_response().
+    """
+    assets = load_static_assets(app.static_folder)
+    fingerprinted_filenames = {
+        asset.filename: name for name, asset in assets.items()
+    }
+
+    @app.url_defaults
+    def add_fingerprint(endpoint, values):
+        if endpoint == "static" and "filename" in values:
+            values["filename"] = fingerprinted_filenames.get(
+                values["filename"], values["filename"]
+            )
+
+    send_static_file = app.view_functions["static"]
+
+    def static(filename):
+        asset = assets.get(filename)
+        if asset is None:
+            return send_static_file(filename=filename)
+        return make_asset_response(asset)
+
+    app.view_functions["static"] = static
@@ -0,0 +1,62 @@
+"""
+In-memory cache for computed results.
+
+Each (gunicorn) worker process has its own cache. The keys include the
+versions of the data that a result is computed from (e.g. the latest
+trading day), so entries never need to be invalidated explicitly: a
+change of the data creates a new key, and the least recently used
+entries are evicted once the cache is full.
+"""
+import threading
+from collections import OrderedDict
+
+
+class MemoryCache(object):
+    """Thread-safe cache that keeps the most recently used entries."""
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Return the value for a key (or the default if not cached)."""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value) -> None:
+        """Store the value for a key, evicting the oldest entries."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the value for a key, calling compute() to create (and
+        store) the value if it is not cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+
+# marker for a key that is not in the cache (None is a valid value)
+_MISSING = object()
@@ -0,0 +1,281 @@
+"""
+Price charts of the stocks, served from the locally stored prices.
+
+Each range of the details page reads the bars with the coarsest
+resolution that still gives a useful chart: the daily prices for the
+short ranges, and the precomputed weekly or monthly rollups for the
+long ranges, so that every chart reads at most a few hundred rows. The
+series are served as JSON, downsampled to the number of points that the
+chart can show with the Largest-Triangle-Three-Buckets (LTTB) algorithm.
+
+The comparison chart overlays the daily closes of several symbols (e.g.
+the held stocks and the benchmark): all of the series are loaded with
+one query, aligned on the shared trading days with a vectorized forward
+fill, and normalized to 100 at the start date.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import func
+
+from project import database
+from project.cache import MemoryCache
+from project.history import load_close_prices
+from project.models import DailyPrice, MonthlyPrice, WeeklyPrice
+
+# resolution of the bars of a chart -> class (table) of the bars
+BAR_CLASSES = {
+    "daily": DailyPrice,
+    "weekly": WeeklyPrice,
+    "monthly": MonthlyPrice,
+}
+
+# range of a chart -> (number of days shown (None: all), resolution)
+CHART_RANGES = {
+    "1M": (31, "daily"),
+    "3M": (92, "daily"),
+    "6M": (183, "weekly"),
+    "1Y": (366, "weekly"),
+    "5Y": (1827, "weekly"),
+    "Max": (None, "monthly"),
+}
+DEFAULT_CHART_RANGE = "3M"
+
+# number of points of a chart (the series are downsampled with LTTB)
+DEFAULT_CHART_POINTS = 500
+MIN_CHART_POINTS = 3
+MAX_CHART_POINTS = 2000
+
+# cache of the chart series, keyed by symbol, range, number of points,
+# day and last bar (date and close)
+chart_cache = MemoryCache(max_entries=1024)
+
+# maximum number of symbols in a comparison chart
+MAX_COMPARISON_SYMBOLS = 10
+
+# cache of the comparison charts, keyed by symbols, start date and
+# latest trading day
+comparison_cache = MemoryCache(max_entries=256)
+
+
+@dataclass
+class ChartSeries:
+    """Dates and values (in dollars) of a (downsampled) chart."""
+
+    title: str
+    dates: list
+    values: list
+    # indexes of the points in the full series of number_of_bars bars
+    indexes: list
+    number_of_bars: int
+
+
+@dataclass
+class ComparisonChart:
+    """Daily closes of several symbols, normalized to 100 at start."""
+
+    start_date: date
+    dates: list
+    # symbol -> normalized closes (None before the first close)
+    series: dict
+
+
+def get_bar_date_column(bar_class):
+    """Return the column with the date of the bars of a class."""
+    if bar_class is DailyPrice:
+        return DailyPrice.date
+    return bar_class.period_start
+
+
+def get_last_bar(stock_symbol: str, resolution: str) -> tuple:
+    """
+    Return the date (for the rollups, the last day included in the bar)
+    and the close of the last stored bar of a stock at a resolution, or
+    None. The close changes when the last bar is revised.
+    """
+    bar_class = BAR_CLASSES[resolution]
+    last_date_column = getattr(
+        bar_class, "last_date", get_bar_date_column(bar_class)
+    )
+    return (
+        database.session.query(last_date_column, bar_class.close)
+        .filter(bar_class.stock_symbol == stock_symbol)
+        .order_by(get_bar_date_column(bar_class).desc())
+        .first()
+    )
+
+
+def downsample_lttb(values, points: int):
+    """
+    Return the indexes of the points (including the first and the last
+    one) selected from values by the Largest-Triangle-Three-Buckets
+    algorithm, or of all of the values if there are at most points.
+
+    The values (evenly spaced) between the first and the last one are
+    split into points - 2 buckets, and the point selected from each
+    bucket forms the largest triangle with the point selected from the
+    previous bucket and the average of the next bucket.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if points >= len(values) or points < MIN_CHART_POINTS:
+        return np.arange(len(values))
+
+    last = len(values) - 1
+    edges = np.linspace(1, last, points - 1).astype(np.int64)
+    # the last "bucket" only holds the last value
+    edges = np.append(edges, last + 1)
+    indexes = np.empty(points, dtype=np.int64)
+    indexes[0] = 0
+    indexes[-1] = last
+    selected = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        average_x = (next_start + next_end - 1) / 2.0
+        average_y = values[next_start:next_end].mean()
+        x = np.arange(start, end)
+        areas = np.abs(
+            (selected - average_x) * (values[start:end] - values[selected])
+            - (selected - x) * (average_y - values[selected])
+        )
+        selected = start + int(np.argmax(areas))
+        indexes[bucket + 1] = selected
+    return indexes
+
+
+def downsample_chart(
+    title: str, labels: list, values: list, points: int
+) -> ChartSeries:
+    """Downsample the labels (dates) and values of a chart with LTTB."""
+    values = [float(value) for value in values]
+    indexes = downsample_lttb(values, points).tolist()
+    return ChartSeries(
+        title=title,
+        dates=[labels[index].strftime("%Y-%m-%d") for index in indexes],
+        values=[values[index] for index in indexes],
+        indexes=indexes,
+        number_of_bars=len(values),
+    )
+
+
+def get_price_bars(stock_symbol: str, chart_range: str, today: date = None):
+    """
+    Return the stored (OHLC) bars of a stock for a chart range (ending
+    today), in chronological order.
+    """
+    days, resolution = CHART_RANGES[chart_range]
+    bar_class = BAR_CLASSES[resolution]
+    date_column = get_bar_date_column(bar_class)
+
+    query = bar_class.query.filter(bar_class.stock_symbol == stock_symbol)
+    if days is not None:
+        start_date = (today or date.today()) - timedelta(days=days)
+        if bar_class is not DailyPrice:
+            # include the period that contains the start date
+            start_date = bar_class.get_period_start(start_date)
+        query = query.filter(date_column >= start_date)
+    return query.order_by(date_column).all()
+
+
+def get_price_chart_data(
+    stock_symbol: str, chart_range: str, today: date = None
+) -> tuple:
+    """
+    Return the title, labels (dates) and values (closes in dollars) of
+    the chart of a stock for a range, or None if no prices are stored
+    for the range.
+    """
+    bars = get_price_bars(stock_symbol, chart_range, today)
+    if not bars:
+        return None
+
+    days, resolution = CHART_RANGES[chart_range]
+    title = f"{stock_symbol} ({chart_range}, {resolution} closes)"
+    if resolution == "daily":
+        labels = [bar.date for bar in bars]
+    else:
+        labels = [bar.last_date for bar in bars]
+    values = [bar.close / 100 for bar in bars]
+    return title, labels, values
+
+
+def get_chart_series(
+    stock_symbol: str,
+    chart_range: str,
+    points: int = DEFAULT_CHART_POINTS,
+    today: date = None,
+) -> ChartSeries:
+    """
+    Return the chart of a stock for a range (ending today), downsampled
+    to at most points points, or None if no prices are stored for the
+    range. The charts are cached until the last bar changes.
+    """
+    today = today or date.today()
+    resolution = CHART_RANGES[chart_range][1]
+    last_bar = get_last_bar(stock_symbol, resolution)
+    if last_bar is None:
+        return None
+
+    def compute():
+        chart_data = get_price_chart_data(stock_symbol, chart_range, today)
+        if chart_data is None:
+            return None
+        return downsample_chart(*chart_data, points)
+
+    key = (
+        "chart",
+        stock_symbol,
+        chart_range,
+        points,
+        today,
+        tuple(last_bar),
+    )
+    return chart_cache.get_or_compute(key, compute)
+
+
+def normalize_closes(closes):
+    """
+    Normalize each column of closes to 100 at its first (non-zero)
+    close. The values before the first close of a column are NaN.
+    """
+    prices = closes.astype(np.float64)
+    started = np.maximum.accumulate(prices > 0, axis=0)
+    first_rows = np.argmax(started, axis=0)
+    base = prices[first_rows, np.arange(prices.shape[1])]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(started, 100.0 * prices / base, np.nan)
+
+
+def get_comparison_chart(symbols: list, start_date: date) -> ComparisonChart:
+    """
+    Return the daily closes of the symbols from start_date, aligned on
+    the same trading days and normalized to 100 at the start (or None
+    if no prices are stored), computed once per trading day.
+    """
+    symbols = sorted(set(symbols))
+    latest_date = (
+        database.session.query(func.max(DailyPrice.date))
+        .filter(DailyPrice.stock_symbol.in_(symbols))
+        .scalar()
+    )
+    if latest_date is None or latest_date < start_date:
+        return None
+
+    def compute():
+        dates, closes = load_close_prices(symbols, start_date, latest_date)
+        normalized = np.round(normalize_closes(closes), 2)
+        return ComparisonChart(
+            start_date=start_date,
+            dates=[day.isoformat() for day in dates.astype(object)],
+            series={
+                symbol: [
+                    None if np.isnan(value) else float(value)
+                    for value in normalized[:, column]
+                ]
+                for column, symbol in enumerate(symbols)
+            },
+        )
+
+    key = ("comparison", tuple(symbols), start_date, latest_date)
+    return comparison_cache.get_or_compute(key, compute)
@@ -0,0 +1,149 @@
+"""
+Compression of the HTML and JSON responses.
+
+The responses are compressed with brotli (if installed and accepted by
+the client) or gzip, at the levels set in the configuration, after the
+view and the other after_request callbacks. A body is only compressed
+if it is at least COMPRESSION_MIN_SIZE bytes, except for the streamed
+bodies (e.g. the list of stocks), whose chunks are compressed and
+flushed one at a time, so that they still reach the browser as they are
+generated.
+
+Responses that are already compressed (the cached pages, whose bodies
+are compressed once with compress_body(), and the static files) are
+left unchanged, as are the Server-Sent Events streams, which are not
+buffered by the browsers if they are compressed.
+"""
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# types of the responses that are compressed
+COMPRESSED_MIMETYPES = (
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+)
+
+
+# --------------
+# Helper Classes
+# --------------
+
+
+class GzipCompressor(object):
+    """Incremental gzip compressor (with the interface of brotli's)."""
+
+    def __init__(self, level: int) -> None:
+        # (wbits 16 + MAX_WBITS writes the gzip header and trailer)
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+# ----------------
+# Helper Functions
+# ----------------
+
+
+def get_content_encoding() -> str:
+    """
+    Return the best encoding ('br' or 'gzip') accepted by the client,
+    or None.
+    """
+    if brotli is not None and "br" in request.accept_encodings:
+        return "br"
+    if "gzip" in request.accept_encodings:
+        return "gzip"
+    return None
+
+
+def create_compressor(encoding: str):
+    """Create an incremental compressor of an encoding."""
+    config = current_app.config
+    if encoding == "br":
+        return brotli.Compressor(quality=config["COMPRESSION_BROTLI_QUALITY"])
+    return GzipCompressor(config["COMPRESSION_LEVEL"])
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """Compress a whole body with an encoding ('br' or 'gzip')."""
+    compressor = create_compressor(encoding)
+    return compressor.process(body) + compressor.finish()
+
+
+def compress_chunks(chunks, compressor):
+    """Compress the chunks of a streamed body, flushing each chunk."""
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        if chunk:
+            yield compressor.process(chunk) + compressor.flush()
+    yield compressor.finish()
+
+
+def is_compressible(response) -> bool:
+    """Return True if a response can be compressed."""
+    return (
+        200 <= response.status_code < 300
+        and response.status_code != 204
+        and response.mimetype in COMPRESSED_MIMETYPES
+        and "Content-Encoding" not in response.headers
+        and not response.direct_passthrough
+    )
+
+
+# -----------
+# Compression
+# -----------
+
+
+def compress_response(response):
+    """
+    Compress a response (after_request callback), if the client accepts
+    a compressed response and the response is worth compressing.
+    """
+    if request.method == "HEAD" or not is_compressible(response):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = get_content_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        chunks = response.response
+        response.response = compress_chunks(
+            chunks, create_compressor(encoding)
+        )
+        if hasattr(chunks, "close"):
+            response.call_on_close(chunks.close)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < current_app.config["COMPRESSION_MIN_SIZE"]:
+            return response
+        response.set_data(compress_body(body, encoding))
+
+    response.headers["Content-Encoding"] = encoding
+    # the compressed body is a different representation of the entity,
+    # so a strong entity tag becomes weak (the conditional responses
+    # already have weak entity tags, see project/conditional.py)
+    etag, is_weak = response.get_etag()
+    if etag is not None and not is_weak:
+        response.set_etag(etag, weak=True)
+    return response
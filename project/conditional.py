@@ -0,0 +1,74 @@
+"""
+Conditional responses (ETag / Last-Modified) for the portfolio pages.
+
+The validators of a response are computed from the versions of the
+data that it shows (e.g. the lots and the prices of a user), with cheap
+queries that run before the view. If the validators match the request
+(If-None-Match / If-Modified-Since), a 304 response is returned without
+running the view, so no template is rendered and no price is retrieved.
+
+The entity tags are weak, since the same entity is sent compressed or
+not (see project/compression.py), so the 304 responses carry the same
+entity tag as the (compressed) 200 responses.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from werkzeug.http import is_resource_modified
+
+
+def make_etag(*parts) -> str:
+    """Return an entity tag of the parts of a response."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def to_utc(value: datetime) -> datetime:
+    """Convert a (naive, local) datetime to UTC, in whole seconds."""
+    if value is None:
+        return None
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def conditional(get_validators):
+    """
+    Decorator of a (GET) view that answers the conditional requests.
+
+    get_validators() is called with the arguments of the view, and
+    returns the parts of the entity tag (combined with the URL) and the
+    last modification time (or None) of the response, or None if they
+    are not known before the view runs (e.g. if prices are refreshed).
+
+    The view always runs if there are flashed messages to show.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            validators = None
+            if request.method == "GET" and "_flashes" not in session:
+                validators = get_validators(*args, **kwargs)
+            if validators is None:
+                return f(*args, **kwargs)
+
+            parts, last_modified = validators
+            etag = make_etag(request.full_path, *parts)
+            last_modified = to_utc(last_modified)
+            if is_resource_modified(
+                request.environ, etag=etag, last_modified=last_modified
+            ):
+                response = make_response(f(*args, **kwargs))
+            else:
+                response = current_app.response_class(status=304)
+
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # the responses are specific to the user, and revalidated
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+
+        return decorated_function
+
+    return decorator
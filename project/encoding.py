@@ -0,0 +1,118 @@
+"""
+Encoding of the JSON responses, and the compact encoding of the series
+returned by the JSON endpoints.
+
+The JSON responses are serialized with orjson if it is installed (it is
+several times faster than the json module for large payloads), and with
+the json module otherwise.
+
+Long series repeat full ISO dates and decimal prices, so the chart
+endpoints can also return them in a compact format (?format=compact):
+the dates are sent as the number of days since the previous date
+(starting from a base date), and the values as integer cents, each one
+as the difference from the previous value. The deltas are small and
+repetitive, so they compress well (the responses are compressed by
+project/compression.py). The series are decoded by static/js/compact.js.
+"""
+import json
+from datetime import date, timedelta
+
+from flask import current_app, request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+COMPACT_FORMAT = "compact"
+
+
+def is_compact_format_requested() -> bool:
+    """Return True if the request asks for the compact format."""
+    return request.args.get("format") == COMPACT_FORMAT
+
+
+def encode_deltas(values: list) -> list:
+    """
+    Encode integer values as the difference from the previous (not
+    None) value. None values are kept as None.
+    """
+    deltas = []
+    previous = 0
+    for value in values:
+        if value is None:
+            deltas.append(None)
+        else:
+            deltas.append(value - previous)
+            previous = value
+    return deltas
+
+
+def decode_deltas(deltas: list) -> list:
+    """Decode the values encoded by encode_deltas()."""
+    values = []
+    previous = 0
+    for delta in deltas:
+        if delta is None:
+            values.append(None)
+        else:
+            previous += delta
+            values.append(previous)
+    return values
+
+
+def encode_dates(dates: list) -> tuple:
+    """
+    Encode ISO dates (in ascending order) as the base (first) date and
+    the number of days since the previous date.
+    """
+    if not dates:
+        return None, []
+    days = [date.fromisoformat(day).toordinal() for day in dates]
+    return dates[0], encode_deltas([day - days[0] for day in days])
+
+
+def decode_dates(base_date: str, deltas: list) -> list:
+    """Decode the dates encoded by encode_dates() (as ISO strings)."""
+    if base_date is None:
+        return []
+    base_date = date.fromisoformat(base_date)
+    return [
+        (base_date + timedelta(days=days)).isoformat()
+        for days in decode_deltas(deltas)
+    ]
+
+
+def to_cents(values: list) -> list:
+    """Convert values in dollars to integer cents (None is kept)."""
+    return [None if value is None else round(value * 100) for value in values]
+
+
+def encode_series(dates: list, values: list) -> dict:
+    """
+    Encode ISO dates and integer values (e.g. cents) in the compact
+    format.
+    """
+    base_date, days = encode_dates(dates)
+    return {
+        "format": COMPACT_FORMAT,
+        "base_date": base_date,
+        "days": days,
+        "values": encode_deltas(values),
+    }
+
+
+def dump_json(payload) -> bytes:
+    """
+    Serialize a payload (of JSON types only) to JSON without whitespace.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def json_response(payload, status: int = 200):
+    """Return a JSON response of the payload (see dump_json())."""
+    return current_app.response_class(
+        dump_json(payload), status=status, mimetype="application/json"
+    )
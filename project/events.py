@@ -0,0 +1,188 @@
+"""
+Live price updates pushed to the open portfolio pages (SSE).
+
+Each application process has one hub that fans out the price changes
+to the streams of the pages that are open in it. The hub is fed by the
+price refresh (so a price retrieved once is pushed to every viewer of
+the symbol), and by a background refresher that refreshes the prices
+of the subscribed symbols while there are subscribers.
+
+Each stream has a bounded queue: if a client falls behind, the oldest
+queued update is dropped. A stream sends a heartbeat (comment) when
+there are no updates, which also detects disconnected clients (the
+write fails and the stream is closed), and ends after a maximum
+duration, after which the browser reconnects. A stream holds one
+worker thread, so the application runs with gunicorn gthread workers,
+and each process serves at most PRICE_STREAM_MAX_STREAMS streams (the
+hub checks and takes a slot in one step): the other pages are refused
+a stream and poll the quotes API instead.
+"""
+import json
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import date
+
+# --------------
+# Helper Classes
+# --------------
+
+
+@dataclass
+class PriceUpdate:
+    """Current price (in cents) of a symbol, pushed to the streams."""
+
+    stock_symbol: str
+    price: int
+    price_date: date
+
+
+class Subscription(object):
+    """Stream of the price updates of a set of symbols."""
+
+    def __init__(self, symbols: set, max_queued_updates: int) -> None:
+        self.symbols = set(symbols)
+        self.updates = queue.Queue(maxsize=max_queued_updates)
+
+    def push(self, update: PriceUpdate) -> None:
+        """Queue an update, dropping the oldest update if full."""
+        while True:
+            try:
+                self.updates.put_nowait(update)
+                return
+            except queue.Full:
+                try:
+                    self.updates.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class PriceHub(object):
+    """Thread-safe fan-out of the price updates to the subscriptions."""
+
+    def __init__(self) -> None:
+        self._subscriptions = {}
+        self._open_subscriptions = set()
+        self._last_prices = {}
+        self._lock = threading.Lock()
+
+    def subscribe(
+        self,
+        symbols: set,
+        max_queued_updates: int = 100,
+        max_subscriptions: int = None,
+    ) -> Subscription:
+        """
+        Create a subscription to the updates of the symbols, or return
+        None if there are already max_subscriptions subscriptions (the
+        number of subscriptions is checked and increased atomically).
+        """
+        subscription = Subscription(symbols, max_queued_updates)
+        with self._lock:
+            if (
+                max_subscriptions is not None
+                and len(self._open_subscriptions) >= max_subscriptions
+            ):
+                return None
+            for symbol in subscription.symbols:
+                self._subscriptions.setdefault(symbol, set()).add(subscription)
+            self._open_subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Remove a subscription (when its stream is closed); removing it
+        again has no effect.
+        """
+        with self._lock:
+            if subscription not in self._open_subscriptions:
+                return
+            for symbol in subscription.symbols:
+                subscriptions = self._subscriptions.get(symbol, set())
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    self._subscriptions.pop(symbol, None)
+            self._open_subscriptions.discard(subscription)
+
+    def count_subscriptions(self) -> int:
+        """Return the number of subscriptions (open streams)."""
+        with self._lock:
+            return len(self._open_subscriptions)
+
+    def get_symbols(self) -> set:
+        """Return the symbols with at least one subscription."""
+        with self._lock:
+            return set(self._subscriptions)
+
+    def publish(self, update: PriceUpdate) -> int:
+        """
+        Push an update to the subscriptions of its symbol, unless the
+        price is the same as the last published one.
+
+        Returns the number of subscriptions that the update was pushed
+        to.
+        """
+        key = (update.price, update.price_date)
+        with self._lock:
+            if self._last_prices.get(update.stock_symbol) == key:
+                return 0
+            self._last_prices[update.stock_symbol] = key
+            subscriptions = list(
+                self._subscriptions.get(update.stock_symbol, ())
+            )
+        for subscription in subscriptions:
+            subscription.push(update)
+        return len(subscriptions)
+
+
+# hub of the price updates of this process
+price_hub = PriceHub()
+
+
+# ----------------
+# Helper Functions
+# ----------------
+
+
+def format_event(update: PriceUpdate) -> str:
+    """Format a price update as a Server-Sent Event."""
+    data = asdict(update)
+    data["price_date"] = update.price_date.isoformat()
+    return f"event: price\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_price_updates(
+    subscription: Subscription,
+    heartbeat_seconds: float,
+    max_seconds: float,
+    hub: PriceHub = price_hub,
+):
+    """
+    Generate the Server-Sent Events of the price updates of a
+    subscription, with a heartbeat every heartbeat_seconds without
+    updates, for up to max_seconds.
+
+    The subscription is created by the caller (when the stream is
+    accepted), and removed when the stream ends or is closed (e.g. when
+    the client disconnects and the write of the next event or heartbeat
+    fails).
+    """
+    end = time.monotonic() + max_seconds
+    try:
+        # the browser reconnects after 5 seconds once the stream ends
+        yield "retry: 5000\n\n"
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                update = subscription.updates.get(
+                    timeout=min(heartbeat_seconds, remaining)
+                )
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+            else:
+                yield format_event(update)
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,383 @@
+"""
+Daily history of the value of the portfolios.
+
+The value of a portfolio on each trading day is computed from the lots
+(Stock) and the sales (Transaction) of the user and the stored daily
+prices (DailyPrice), and then stored in the portfolio_values table. The
+history is extended incrementally: only the days after the last stored
+value are computed. When a close is added or changed for a day that is
+already stored (a late or corrected close), the stored values of the
+portfolios holding the stock are deleted from that day onwards, so the
+next update computes them again.
+
+The value of a portfolio on any past date is computed on demand from
+the daily closes of each symbol, which are kept in memory as sorted
+arrays so that the last close on or before the date is a binary search.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from itertools import groupby
+
+import numpy as np
+from sqlalchemy import and_, func
+from sqlalchemy.orm import aliased
+
+from project import database
+from project.cache import MemoryCache
+from project.models import DailyPrice, PortfolioValue, Stock, Transaction
+
+# cache of the (sorted) daily closes of each symbol, keyed by the symbol
+# and the version of its stored daily prices
+price_series_cache = MemoryCache(max_entries=1024)
+
+
+# --------------
+# Helper Classes
+# --------------
+
+
+@dataclass
+class HoldingValuation:
+    """Value of the shares of a symbol held on a date."""
+
+    stock_symbol: str
+    number_of_shares: int
+    close: int
+    close_date: date
+    value: int
+
+
+@dataclass
+class PortfolioValuation:
+    """Value of a portfolio (and of each holding) on a date."""
+
+    as_of: date
+    value: int
+    holdings: list
+
+
+# ----------------
+# Helper Functions
+# ----------------
+
+
+def get_lots_of_users(
+    user_ids: list, with_price: bool = False, purchased_by: date = None
+) -> list:
+    """
+    Return the (user_id, stock_symbol, purchase_date, number_of_shares)
+    of the lots of the users (optionally only the lots purchased on or
+    before purchased_by), optionally followed by the price of a share.
+
+    A lot has the number of shares that were purchased, and each sale is
+    returned as a lot of negative shares (at the sale price) on its
+    transaction date, so that the shares held on any date are a sum.
+    """
+    # (a lot recorded as a buy keeps its purchased shares in the buy,
+    # since the shares of the lot are reduced when they are sold)
+    buy = aliased(Transaction)
+    buy_columns = [
+        Stock.user_id,
+        Stock.stock_symbol,
+        Stock.purchase_date,
+        func.coalesce(buy.number_of_shares, Stock.number_of_shares),
+    ]
+    sell_columns = [
+        Transaction.user_id,
+        Transaction.stock_symbol,
+        Transaction.transaction_date,
+        -Transaction.number_of_shares,
+    ]
+    if with_price:
+        buy_columns.append(Stock.purchase_price)
+        sell_columns.append(Transaction.price)
+
+    buys = (
+        database.session.query(*buy_columns)
+        .outerjoin(
+            buy, and_(buy.stock_id == Stock.id, buy.transaction_type == "buy")
+        )
+        .filter(Stock.user_id.in_(user_ids), Stock.purchase_date.isnot(None))
+    )
+    sells = database.session.query(*sell_columns).filter(
+        Transaction.user_id.in_(user_ids),
+        Transaction.transaction_type == "sell",
+    )
+    if purchased_by is not None:
+        last_time = datetime.combine(purchased_by, time.max)
+        buys = buys.filter(Stock.purchase_date <= last_time)
+        sells = sells.filter(Transaction.transaction_date <= last_time)
+    return buys.union_all(sells).all()
+
+
+def get_lots(user_id: int, purchased_by: date = None) -> list:
+    """
+    Return the (stock_symbol, purchase_date, number_of_shares) of the
+    lots and the sales of a user (see get_lots_of_users()).
+    """
+    return [
+        lot[1:]
+        for lot in get_lots_of_users([user_id], purchased_by=purchased_by)
+    ]
+
+
+def load_close_prices(symbols: list, start_date: date, end_date: date):
+    """
+    Load the daily closes of the symbols from start_date to end_date.
+
+    Returns the trading dates (as datetime64[D]) and a (dates x symbols)
+    array of closes in cents. Days without a close for a symbol use the
+    previous close (including the last close before start_date), or 0
+    if there is no previous close.
+    """
+    rows = (
+        database.session.query(
+            DailyPrice.stock_symbol, DailyPrice.date, DailyPrice.close
+        )
+        .filter(
+            DailyPrice.stock_symbol.in_(symbols),
+            DailyPrice.date >= start_date,
+            DailyPrice.date <= end_date,
+        )
+        .all()
+    )
+    if not rows:
+        return np.array([], dtype="datetime64[D]"), np.zeros(
+            (0, len(symbols)), dtype=np.int64
+        )
+
+    # last close of each symbol before the start date
+    last_dates = (
+        database.session.query(
+            DailyPrice.stock_symbol, func.max(DailyPrice.date).label("date")
+        )
+        .filter(
+            DailyPrice.stock_symbol.in_(symbols),
+            DailyPrice.date < start_date,
+        )
+        .group_by(DailyPrice.stock_symbol)
+        .subquery()
+    )
+    previous_rows = database.session.query(
+        DailyPrice.stock_symbol, DailyPrice.close
+    ).join(
+        last_dates,
+        and_(
+            DailyPrice.stock_symbol == last_dates.c.stock_symbol,
+            DailyPrice.date == last_dates.c.date,
+        ),
+    )
+
+    columns = {symbol: index for index, symbol in enumerate(symbols)}
+    row_dates = np.array([row[1] for row in rows], dtype="datetime64[D]")
+    dates = np.unique(row_dates)
+
+    # row 0 holds the closes before the start date
+    closes = np.zeros((len(dates) + 1, len(symbols)), dtype=np.int64)
+    known = np.zeros(closes.shape, dtype=bool)
+    for symbol, close in previous_rows:
+        closes[0, columns[symbol]] = close
+        known[0, columns[symbol]] = True
+
+    row_indexes = np.searchsorted(dates, row_dates) + 1
+    column_indexes = np.array([columns[row[0]] for row in rows])
+    closes[row_indexes, column_indexes] = [row[2] for row in rows]
+    known[row_indexes, column_indexes] = True
+
+    # forward fill: use the close of the last row with a known close
+    last_known = np.where(known, np.arange(len(closes))[:, np.newaxis], 0)
+    np.maximum.accumulate(last_known, axis=0, out=last_known)
+    closes = np.take_along_axis(closes, last_known, axis=0)
+
+    return dates, closes[1:]
+
+
+def load_price_series(symbols: list) -> dict:
+    """
+    Return the stored daily closes of each of the symbols as a tuple of
+    sorted dates (as datetime64[D]) and closes in cents.
+
+    The series are cached by symbol and version (highest id and latest
+    update time of its stored prices, read from an index), so only the
+    symbols whose prices have changed are loaded from the database.
+    """
+    versions = {
+        symbol: (symbol, last_id, last_update)
+        for symbol, last_id, last_update in database.session.query(
+            DailyPrice.stock_symbol,
+            func.max(DailyPrice.id),
+            func.max(DailyPrice.updated_on),
+        )
+        .filter(DailyPrice.stock_symbol.in_(symbols))
+        .group_by(DailyPrice.stock_symbol)
+    }
+
+    series = {}
+    for symbol, key in versions.items():
+        cached_series = price_series_cache.get(key)
+        if cached_series is not None:
+            series[symbol] = cached_series
+
+    missing_symbols = [symbol for symbol in versions if symbol not in series]
+    if missing_symbols:
+        rows = (
+            database.session.query(
+                DailyPrice.stock_symbol, DailyPrice.date, DailyPrice.close
+            )
+            .filter(DailyPrice.stock_symbol.in_(missing_symbols))
+            .order_by(DailyPrice.stock_symbol, DailyPrice.date)
+        )
+        for symbol, symbol_rows in groupby(rows, key=lambda row: row[0]):
+            symbol_rows = list(symbol_rows)
+            series[symbol] = (
+                np.array(
+                    [row[1] for row in symbol_rows], dtype="datetime64[D]"
+                ),
+                np.array([row[2] for row in symbol_rows], dtype=np.int64),
+            )
+            price_series_cache.set(versions[symbol], series[symbol])
+    return series
+
+
+def compute_shares_held(lots: list, symbols: list, dates):
+    """
+    Compute the number of shares of each symbol held on each date.
+
+    The lots are (stock_symbol, purchase_date, number_of_shares) tuples
+    (with negative shares for the sales). A lot counts from the first
+    trading day on or after its purchase date, so the number of shares
+    held is a cumulative sum over the shares purchased on each trading
+    day.
+    """
+    columns = {symbol: index for index, symbol in enumerate(symbols)}
+    lot_columns = np.array([columns[lot[0]] for lot in lots])
+    lot_dates = np.array(
+        [lot[1].date() for lot in lots], dtype="datetime64[D]"
+    )
+    lot_shares = np.array([lot[2] for lot in lots], dtype=np.int64)
+
+    # shares purchased on each trading day (lots purchased after the
+    # last date land in the extra last row and are ignored)
+    purchases = np.zeros((len(dates) + 1, len(symbols)), dtype=np.int64)
+    np.add.at(
+        purchases,
+        (np.searchsorted(dates, lot_dates), lot_columns),
+        lot_shares,
+    )
+    return np.cumsum(purchases, axis=0)[:-1]
+
+
+def compute_portfolio_values(lots: list, symbols: list, dates, closes):
+    """Compute the value (in cents) of a portfolio on each date."""
+    shares_held = compute_shares_held(lots, symbols, dates)
+    return (shares_held * closes).sum(axis=1)
+
+
+# -------------
+# History Tasks
+# -------------
+
+
+def update_portfolio_history(user_id: int, end_date: date = None) -> int:
+    """
+    Extend the daily value history of the portfolio of a user up to
+    end_date (default: today).
+
+    Returns the number of daily values that were added.
+    """
+    lots = get_lots(user_id)
+    if not lots:
+        return 0
+
+    last_date = (
+        database.session.query(func.max(PortfolioValue.date))
+        .filter(PortfolioValue.user_id == user_id)
+        .scalar()
+    )
+    if last_date is not None:
+        start_date = last_date + timedelta(days=1)
+    else:
+        start_date = min(lot[1] for lot in lots).date()
+    end_date = end_date or date.today()
+    if start_date > end_date:
+        return 0
+
+    symbols = sorted({lot[0] for lot in lots})
+    dates, closes = load_close_prices(symbols, start_date, end_date)
+    if len(dates) == 0:
+        return 0
+
+    values = compute_portfolio_values(lots, symbols, dates, closes)
+    database.session.bulk_insert_mappings(
+        PortfolioValue,
+        [
+            {"user_id": user_id, "date": day, "value": int(value)}
+            for day, value in zip(dates.tolist(), values)
+        ],
+    )
+    return len(dates)
+
+
+def invalidate_portfolio_history(user_id: int, from_date: datetime) -> None:
+    """
+    Delete the stored daily values of a portfolio from a date onwards
+    (e.g. after adding a lot purchased in the past), so that they are
+    computed again by the next update.
+    """
+    PortfolioValue.query.filter(
+        PortfolioValue.user_id == user_id,
+        PortfolioValue.date >= from_date.date(),
+    ).delete(synchronize_session=False)
+
+
+def get_portfolio_history(user_id: int) -> tuple:
+    """Return the stored dates and values (in cents) of a portfolio."""
+    rows = (
+        database.session.query(PortfolioValue.date, PortfolioValue.value)
+        .filter(PortfolioValue.user_id == user_id)
+        .order_by(PortfolioValue.date)
+        .all()
+    )
+    return [row[0] for row in rows], [row[1] for row in rows]
+
+
+def get_portfolio_value_as_of(user_id: int, as_of: date) -> PortfolioValuation:
+    """
+    Return the value of the portfolio of a user on a (past) date, using
+    the last stored close of each symbol on or before the date. The lots
+    purchased (and the shares sold) after the date are excluded, and a
+    symbol without a close on or before the date has no value.
+    """
+    shares = {}
+    for symbol, purchase_date, number_of_shares in get_lots(
+        user_id, purchased_by=as_of
+    ):
+        shares[symbol] = shares.get(symbol, 0) + number_of_shares
+
+    series = load_price_series(list(shares))
+    day = np.datetime64(as_of, "D")
+    holdings = []
+    for symbol in sorted(shares):
+        if shares[symbol] == 0:
+            continue
+        close, close_date = 0, None
+        if symbol in series:
+            dates, closes = series[symbol]
+            index = np.searchsorted(dates, day, side="right") - 1
+            if index >= 0:
+                close, close_date = int(closes[index]), dates[index].item()
+        holdings.append(
+            HoldingValuation(
+                stock_symbol=symbol,
+                number_of_shares=shares[symbol],
+                close=close,
+                close_date=close_date,
+                value=shares[symbol] * close,
+            )
+        )
+
+    return PortfolioValuation(
+        as_of=as_of,
+        value=sum(holding.value for holding in holdings),
+        holdings=holdings,
+    )
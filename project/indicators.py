@@ -0,0 +1,285 @@
+"""
+Technical indicators of the stocks, shown as overlays on the charts.
+
+The indicators are computed with NumPy over the whole stored series of
+closes of a symbol (at the resolution of the chart): the rolling
+windows use cumulative sums, and the exponential moving averages are
+computed in blocks with a closed form of the recurrence instead of a
+Python loop over the bars. The results are cached per symbol,
+resolution, indicator, parameters and last bar (date and close), so
+every user viewing a symbol shares one computation per day.
+"""
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from project import database
+from project.cache import MemoryCache
+from project.charts import BAR_CLASSES, get_bar_date_column, get_last_bar
+
+# cache of the indicators, keyed by symbol, resolution, indicator,
+# parameters and last bar (date and close)
+indicator_cache = MemoryCache(max_entries=1024)
+
+# the largest factor (e**230 ~ 1e100) used when computing the
+# exponential smoothing in blocks, to stay within the float64 range
+MAX_BLOCK_EXPONENT = 230.0
+
+
+# --------------
+# Helper Classes
+# --------------
+
+
+@dataclass
+class Indicator:
+    """Indicator that can be shown as an overlay on a chart."""
+
+    title: str
+    # labels of the lines returned by the function
+    labels: tuple
+    function: Callable
+    parameters: dict
+    # True if the lines are not prices (e.g. the RSI)
+    separate_axis: bool = False
+
+
+# ----------------
+# Helper Functions
+# ----------------
+
+
+def compute_sma(values, window: int):
+    """
+    Compute the simple moving average of values over a window (NaN for
+    the first window - 1 values), using a cumulative sum.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    sma = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.concatenate(([0.0], values)))
+        first = window - 1
+        sma[first:] = (sums[window:] - sums[:-window]) / window
+    return sma
+
+
+def compute_rolling_std(values, window: int):
+    """
+    Compute the (population) standard deviation of values over a window
+    (NaN for the first window - 1 values), using cumulative sums.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    std = np.full(len(values), np.nan)
+    if len(values) >= window:
+        # subtract the mean first to limit the cancellation error
+        centered = values - values.mean()
+        sums = np.cumsum(np.concatenate(([0.0], centered)))
+        squares = np.cumsum(np.concatenate(([0.0], centered**2)))
+        mean = (sums[window:] - sums[:-window]) / window
+        mean_of_squares = (squares[window:] - squares[:-window]) / window
+        first = window - 1
+        std[first:] = np.sqrt(np.clip(mean_of_squares - mean**2, 0.0, None))
+    return std
+
+
+def exponential_smoothing(values, alpha: float, initial: float):
+    """
+    Compute s[i] = (1 - alpha) * s[i - 1] + alpha * values[i] for each
+    of the values, where s[-1] is the initial value.
+
+    The recurrence is solved in closed form for blocks of values:
+        s[k] = d**k * (s[-1] + sum(alpha * values[j] / d**j, j <= k))
+    with d = 1 - alpha, where the blocks are short enough for d**-k to
+    stay within the range of a float64.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        return values.copy()
+
+    block_size = max(1, int(MAX_BLOCK_EXPONENT / -np.log(decay)))
+    smoothed = np.empty(len(values))
+    previous = initial
+    for start in range(0, len(values), block_size):
+        end = min(start + block_size, len(values))
+        powers = decay ** np.arange(1, end - start + 1)
+        smoothed[start:end] = powers * (
+            previous + np.cumsum(alpha * values[start:end] / powers)
+        )
+        previous = smoothed[end - 1]
+    return smoothed
+
+
+def compute_ema(values, span: int):
+    """
+    Compute the exponential moving average of values with a span
+    (alpha = 2 / (span + 1)), starting from the first value.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return values
+    return np.concatenate(
+        (
+            values[:1],
+            exponential_smoothing(values[1:], 2.0 / (span + 1), values[0]),
+        )
+    )
+
+
+def compute_rsi(values, period: int = 14):
+    """
+    Compute the relative strength index of values (NaN for the first
+    period values), using Wilder's smoothing of the average gains and
+    losses (seeded with their simple average over the first period).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rsi = np.full(len(values), np.nan)
+    if len(values) <= period:
+        return rsi
+
+    changes = np.diff(values)
+    gains = np.clip(changes, 0.0, None)
+    losses = np.clip(-changes, 0.0, None)
+    averages = []
+    for moves in (gains, losses):
+        seed = moves[:period].mean()
+        averages.append(
+            np.concatenate(
+                (
+                    [seed],
+                    exponential_smoothing(moves[period:], 1 / period, seed),
+                )
+            )
+        )
+    average_gains, average_losses = averages
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative_strength = average_gains / average_losses
+        rsi[period:] = np.where(
+            average_losses > 0,
+            100.0 - 100.0 / (1.0 + relative_strength),
+            100.0,
+        )
+    return rsi
+
+
+def compute_bollinger_bands(values, window: int = 20, width: float = 2.0):
+    """
+    Compute the upper and lower Bollinger bands of values: the simple
+    moving average plus/minus width standard deviations.
+    """
+    sma = compute_sma(values, window)
+    std = compute_rolling_std(values, window)
+    return sma + width * std, sma - width * std
+
+
+# indicators that can be selected as overlays
+INDICATORS = {
+    "sma20": Indicator(
+        "SMA (20)",
+        ("SMA (20)",),
+        lambda values, window: (compute_sma(values, window),),
+        {"window": 20},
+    ),
+    "sma50": Indicator(
+        "SMA (50)",
+        ("SMA (50)",),
+        lambda values, window: (compute_sma(values, window),),
+        {"window": 50},
+    ),
+    "ema20": Indicator(
+        "EMA (20)",
+        ("EMA (20)",),
+        lambda values, span: (compute_ema(values, span),),
+        {"span": 20},
+    ),
+    "bollinger20": Indicator(
+        "Bollinger Bands (20, 2)",
+        ("Bollinger Upper (20, 2)", "Bollinger Lower (20, 2)"),
+        compute_bollinger_bands,
+        {"window": 20, "width": 2.0},
+    ),
+    "rsi14": Indicator(
+        "RSI (14)",
+        ("RSI (14)",),
+        lambda values, period: (compute_rsi(values, period),),
+        {"period": 14},
+        separate_axis=True,
+    ),
+}
+
+
+# ----------
+# Indicators
+# ----------
+
+
+def get_indicator(stock_symbol: str, resolution: str, name: str) -> tuple:
+    """
+    Return the lines (arrays aligned with the stored bars of the symbol
+    at the resolution) of an indicator, or None if no bars are stored.
+    """
+    bar_class = BAR_CLASSES[resolution]
+    date_column = get_bar_date_column(bar_class)
+    last_bar = get_last_bar(stock_symbol, resolution)
+    if last_bar is None:
+        return None
+
+    def compute():
+        closes = np.array(
+            [
+                close
+                for (close,) in database.session.query(bar_class.close)
+                .filter(bar_class.stock_symbol == stock_symbol)
+                .order_by(date_column)
+            ],
+            dtype=np.float64,
+        )
+        return indicator.function(closes / 100, **indicator.parameters)
+
+    indicator = INDICATORS[name]
+    key = (
+        "indicator",
+        stock_symbol,
+        resolution,
+        name,
+        tuple(sorted(indicator.parameters.items())),
+        tuple(last_bar),
+    )
+    return indicator_cache.get_or_compute(key, compute)
+
+
+def get_indicator_overlays(
+    stock_symbol: str,
+    resolution: str,
+    names: list,
+    number_of_bars: int,
+    indexes: list = None,
+) -> list:
+    """
+    Return the overlays of the selected indicators for a chart of the
+    last number_of_bars bars of a symbol (only the points at indexes of
+    these bars, if given): a list of dicts with the label, the values
+    (None where undefined) and if the overlay uses a separate axis.
+    """
+    overlays = []
+    for name in names:
+        lines = get_indicator(stock_symbol, resolution, name)
+        if lines is None:
+            continue
+        indicator = INDICATORS[name]
+        for label, line in zip(indicator.labels, lines):
+            line = line[-number_of_bars:]
+            if indexes is not None:
+                line = line[indexes]
+            overlays.append(
+                {
+                    "label": label,
+                    "values": [
+                        None if np.isnan(value) else round(float(value), 4)
+                        for value in line
+                    ],
+                    "separate_axis": indicator.separate_axis,
+                }
+            )
+    return overlays
@@ -0,0 +1,118 @@
+"""
+Ledger of the purchases and sales of stocks, with lot matching.
+
+Each purchased lot (Stock) is recorded as a buy transaction. A sell is
+matched against the open shares of the buys, in FIFO (oldest first) or
+LIFO (newest first) order, when it is recorded: the remaining shares of
+the matched buys (and the shares of their lots), the realized gain of
+the sell and the position of the user are updated at that point, so the
+ledger is never replayed.
+"""
+from datetime import datetime
+
+from sqlalchemy import func
+
+from project import database
+from project.models import Position, Stock, Transaction
+
+LOT_MATCHING_METHODS = ("fifo", "lifo")
+
+# number of open buys loaded at a time when matching a sell
+MATCH_BATCH_SIZE = 100
+
+
+def record_buy(stock: Stock) -> Transaction:
+    """Record a purchased lot as a buy and add it to the position."""
+    transaction = Transaction.from_stock(stock)
+    database.session.add(transaction)
+    Position.add_lot(stock)
+    return transaction
+
+
+def record_sell(
+    user_id: int,
+    stock_symbol: str,
+    number_of_shares: int,
+    price: int,
+    transaction_date: datetime,
+    method: str = "fifo",
+) -> Transaction:
+    """
+    Record a sale of shares (price in cents) of a stock by a user.
+
+    The shares are matched against the open shares of the buys made on
+    or before the transaction date, using the given lot matching method.
+    Only the open buys are loaded, in batches of MATCH_BATCH_SIZE. The
+    position of the user is locked first, so that concurrent sales of
+    the same stock cannot match the same shares.
+
+    Raises a ValueError if the method is not valid or if the user does
+    not hold enough shares on the transaction date (the session is then
+    rolled back by the caller).
+    """
+    if method not in LOT_MATCHING_METHODS:
+        raise ValueError(f"Invalid lot matching method ({method})!")
+    if number_of_shares <= 0:
+        raise ValueError("Number of shares must be positive!")
+
+    position = (
+        Position.query.filter_by(user_id=user_id, stock_symbol=stock_symbol)
+        .with_for_update()
+        .first()
+    )
+    open_buys = Transaction.query.filter(
+        Transaction.user_id == user_id,
+        Transaction.stock_symbol == stock_symbol,
+        Transaction.transaction_type == "buy",
+        Transaction.remaining_shares > 0,
+        Transaction.transaction_date <= transaction_date,
+    )
+    available_shares = open_buys.with_entities(
+        func.coalesce(func.sum(Transaction.remaining_shares), 0)
+    ).scalar()
+    if position is None or available_shares < number_of_shares:
+        raise ValueError(
+            f"Only {available_shares} shares of {stock_symbol} are held!"
+        )
+
+    if method == "fifo":
+        open_buys = open_buys.order_by(
+            Transaction.transaction_date.asc(), Transaction.id.asc()
+        )
+    else:
+        open_buys = open_buys.order_by(
+            Transaction.transaction_date.desc(), Transaction.id.desc()
+        )
+
+    sell = Transaction(
+        user_id,
+        stock_symbol,
+        "sell",
+        number_of_shares,
+        price,
+        transaction_date,
+    )
+    unmatched_shares = number_of_shares
+    cost_basis = 0
+    while unmatched_shares > 0:
+        # (the buys matched by the previous batch are flushed first)
+        batch = open_buys.limit(MATCH_BATCH_SIZE).all()
+        if not batch:
+            raise ValueError(
+                f"Only {number_of_shares - unmatched_shares} shares of "
+                f"{stock_symbol} are held!"
+            )
+        for buy in batch:
+            matched_shares = min(buy.remaining_shares, unmatched_shares)
+            buy.remaining_shares -= matched_shares
+            if buy.stock is not None:
+                buy.stock.remove_shares(matched_shares)
+            unmatched_shares -= matched_shares
+            cost_basis += matched_shares * buy.price
+            sell.realized_gain += matched_shares * (price - buy.price)
+            if unmatched_shares == 0:
+                break
+
+    database.session.add(sell)
+    position.remove_shares(number_of_shares, cost_basis, sell.realized_gain)
+    return sell
@@ -1,7 +1,9 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 import requests
 from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.orm import declared_attr
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from project import database
@@ -15,9 +17,27 @@ def create_alpha_vantage_url_daily_compact(symbol: str) -> str:
     )
 
 
-def get_current_stock_price(symbol: str) -> float:
-    current_price = 0.0
-    url = create_alpha_vantage_url_daily_compact(symbol)
+def create_alpha_vantage_url_daily_full(symbol: str) -> str:
+    return (
+        f"https://alphavantage.co/query?function={'TIME_SERIES_DAILY'}"
+        f"&symbol={symbol}&outputsize={'full'}"
+        f"&apikey={current_app.config['ALPHA_VANTAGE_API_KEY']}"
+    )
+
+
+def get_daily_stock_prices(symbol: str, full: bool = False) -> list:
+    """
+    Retrieve the daily prices of a stock from Alpha Vantage.
+
+    Returns a list of (date, open, high, low, close) tuples ordered from
+    oldest to latest, with the prices as integers (in cents). The list
+    is empty if the prices could not be retrieved.
+    """
+    daily_prices = []
+    if full:
+        url = create_alpha_vantage_url_daily_full(symbol)
+    else:
+        url = create_alpha_vantage_url_daily_compact(symbol)
 
     # attempt the GET call to Alpha Vantage
     # check that a ConnectionError does not occur (network issue)
@@ -27,14 +47,14 @@ def get_current_stock_price(symbol: str) -> float:
         current_app.logger.warning(
             f"Error! Network problem preventing retrieving the stock data ({symbol})!"
         )
-        return current_price
+        return daily_prices
 
     if r.status_code != 200:
         current_app.logger.warning(
             f"Error! Received unexpected status code ({r.status_code}) "
             f"when retrieving daily stock data ({symbol})!"
         )
-        return current_price
+        return daily_prices
 
     daily_data = r.json()
 
@@ -45,14 +65,30 @@ def get_current_stock_price(symbol: str) -> float:
             f"Could not find the Time Series (Daily) key"
             f"when retrieving the daily stock data ({symbol})!"
         )
-        return current_price
-
-    for element in daily_data["Time Series (Daily)"]:
-        current_price = float(
-            daily_data["Time Series (Daily)"][element]["4. close"]
+        return daily_prices
+
+    for element, prices in daily_data["Time Series (Daily)"].items():
+        close = prices["4. close"]
+        daily_prices.append(
+            (
+                date.fromisoformat(element),
+                round(float(prices.get("1. open", close)) * 100),
+                round(float(prices.get("2. high", close)) * 100),
+                round(float(prices.get("3. low", close)) * 100),
+                round(float(close) * 100),
+            )
         )
-        break
 
+    # sort the prices as data from API is read in latest to oldest
+    daily_prices.sort()
+    return daily_prices
+
+
+def get_current_stock_price(symbol: str) -> float:
+    current_price = 0.0
+    daily_prices = get_daily_stock_prices(symbol)
+    if daily_prices:
+        current_price = daily_prices[-1][4] / 100
     return current_price
 
 
@@ -135,7 +171,7 @@ class Stock(database.Model):
 
     The following attributes of a stock are stored in this table:
         stock_symbol: str
-        number_of_shares: integer
+        number_of_shares (shares of the lot that were not sold): integer
         purchase_price: integer
         user_id (primary key of user that owns the stock): int
         purchase_date: datetime
@@ -150,6 +186,21 @@ class Stock(database.Model):
     """
 
     __tablename__ = "stocks"
+    # indexes for listing (and paging through) the stocks of a user
+    __table_args__ = (
+        database.Index(
+            "ix_stocks_user_id_stock_symbol", "user_id", "stock_symbol", "id"
+        ),
+        database.Index(
+            "ix_stocks_user_id_position_value",
+            "user_id",
+            "position_value",
+            "id",
+        ),
+        database.Index(
+            "ix_stocks_user_id_purchase_date", "user_id", "purchase_date", "id"
+        ),
+    )
 
     id = database.Column(database.Integer, primary_key=True)
     stock_symbol = database.Column(database.String, nullable=False)
@@ -183,6 +234,17 @@ class Stock(database.Model):
     def __repr__(self) -> str:
         return f"{self.stock_symbol} - {self.number_of_shares} shares purchased at ${self.purchase_price / 100}"
 
+    def set_current_price(self, current_price: int) -> None:
+        """Set the current price (in cents) retrieved from the API."""
+        self.current_price = current_price
+        self.current_price_date = datetime.now()
+        self.position_value = self.current_price * self.number_of_shares
+
+    def remove_shares(self, number_of_shares: int) -> None:
+        """Remove sold shares from the lot."""
+        self.number_of_shares -= number_of_shares
+        self.position_value = self.current_price * self.number_of_shares
+
     def get_stock_data(self) -> None:
         if (
             self.current_price_date is None
@@ -190,11 +252,7 @@ class Stock(database.Model):
         ):
             current_price = get_current_stock_price(self.stock_symbol)
             if current_price > 0.0:
-                self.current_price = int(current_price * 100)
-                self.current_price_date = datetime.now()
-                self.position_value = (
-                    self.current_price * self.number_of_shares
-                )
+                self.set_current_price(round(current_price * 100))
                 current_app.logger.debug(
                     f"Retrieved current price {self.current_price / 100} "
                     f"for the stock data ({self.stock_symbol})!"
@@ -265,3 +323,607 @@ class Stock(database.Model):
         values.reverse()
 
         return title, labels, values
+
+
+class Position(database.Model):
+    """Class that represents the position of a user in a stock.
+
+    A position combines all of the purchased lots (Stock) of a user with
+    the same symbol, so that views can read a single precomputed row per
+    symbol instead of grouping the lots.
+
+    The following attributes of a position are stored in this table:
+        user_id (primary key of user that owns the position): int
+        stock_symbol: str
+        number_of_shares (total over all lots): int
+        cost_basis (total purchase price over all lots): int
+        current_price: int
+        market_value (current price * number of shares): int
+        realized_gain (total gain (or loss) of the shares sold): int
+        updated_on: datetime
+
+    Note: the amounts are stored as integers (in cents), like in Stock.
+    """
+
+    __tablename__ = "positions"
+    __table_args__ = (database.UniqueConstraint("user_id", "stock_symbol"),)
+
+    id = database.Column(database.Integer, primary_key=True)
+    user_id = database.Column(
+        database.Integer, database.ForeignKey("users.id"), nullable=False
+    )
+    stock_symbol = database.Column(database.String, nullable=False, index=True)
+    number_of_shares = database.Column(database.Integer, nullable=False)
+    cost_basis = database.Column(database.Integer, nullable=False)
+    current_price = database.Column(database.Integer, nullable=False)
+    market_value = database.Column(database.Integer, nullable=False)
+    realized_gain = database.Column(
+        database.Integer, nullable=False, server_default="0"
+    )
+    updated_on = database.Column(database.DateTime)
+
+    def __init__(self, user_id: int, stock_symbol: str) -> None:
+        self.user_id = user_id
+        self.stock_symbol = stock_symbol
+        self.number_of_shares = 0
+        self.cost_basis = 0
+        self.current_price = 0
+        self.market_value = 0
+        self.realized_gain = 0
+        self.updated_on = datetime.now()
+
+    def __repr__(self) -> str:
+        return f"{self.stock_symbol} - {self.number_of_shares} shares held"
+
+    @property
+    def average_cost(self) -> int:
+        """Weighted-average purchase price of a share (in cents)."""
+        if self.number_of_shares == 0:
+            return 0
+        return round(self.cost_basis / self.number_of_shares)
+
+    @property
+    def gain(self) -> int:
+        """Unrealized gain (or loss) of the position (in cents)."""
+        return self.market_value - self.cost_basis
+
+    @classmethod
+    def add_lot(cls, stock: Stock) -> "Position":
+        """Add a newly purchased lot (Stock) to its user's position."""
+        position = cls.query.filter_by(
+            user_id=stock.user_id, stock_symbol=stock.stock_symbol
+        ).first()
+        if position is None:
+            position = cls(stock.user_id, stock.stock_symbol)
+            database.session.add(position)
+
+        position.number_of_shares += stock.number_of_shares
+        position.cost_basis += stock.purchase_price * stock.number_of_shares
+        if stock.current_price:
+            position.current_price = stock.current_price
+        position.market_value = (
+            position.current_price * position.number_of_shares
+        )
+        position.updated_on = datetime.now()
+        return position
+
+    def remove_shares(
+        self, number_of_shares: int, cost_basis: int, realized_gain: int
+    ) -> None:
+        """Remove sold shares (and the cost basis of their lots)."""
+        self.number_of_shares -= number_of_shares
+        self.cost_basis -= cost_basis
+        self.realized_gain += realized_gain
+        self.market_value = self.current_price * self.number_of_shares
+        self.updated_on = datetime.now()
+
+    @classmethod
+    def update_price(
+        cls, stock_symbol: str, current_price: int, user_ids=None
+    ) -> None:
+        """
+        Update the price of the positions in a stock (of the given
+        users, or of every user) with one UPDATE.
+        """
+        query = cls.query.filter_by(stock_symbol=stock_symbol)
+        if user_ids is not None:
+            query = query.filter(cls.user_id.in_(user_ids))
+        query.update(
+            {
+                cls.current_price: current_price,
+                cls.market_value: cls.number_of_shares * current_price,
+                cls.updated_on: datetime.now(),
+            },
+            synchronize_session="fetch",
+        )
+
+
+class PortfolioSnapshot(database.Model):
+    """Class that represents the latest totals of a user's portfolio.
+
+    The snapshot is updated whenever a stock is added or the prices are
+    refreshed, so that the headline numbers of a portfolio can be read
+    from a single row.
+
+    The following attributes of a snapshot are stored in this table:
+        user_id (primary key of user that owns the portfolio): int
+        value (market value of all positions): int
+        cost_basis (total purchase price of all positions): int
+        gain (value - cost basis): int
+        as_of (datetime that the totals were computed): datetime
+
+    Note: the amounts are stored as integers (in cents), like in Stock.
+    """
+
+    __tablename__ = "portfolio_snapshots"
+
+    id = database.Column(database.Integer, primary_key=True)
+    user_id = database.Column(
+        database.Integer,
+        database.ForeignKey("users.id"),
+        nullable=False,
+        unique=True,
+    )
+    value = database.Column(database.Integer, nullable=False)
+    cost_basis = database.Column(database.Integer, nullable=False)
+    gain = database.Column(database.Integer, nullable=False)
+    as_of = database.Column(database.DateTime, nullable=False)
+
+    def __init__(self, user_id: int) -> None:
+        self.user_id = user_id
+        self.value = 0
+        self.cost_basis = 0
+        self.gain = 0
+        self.as_of = datetime.now()
+
+    def __repr__(self) -> str:
+        return f"<PortfolioSnapshot: user {self.user_id} at {self.as_of}>"
+
+    @classmethod
+    def update_for_users(cls, user_ids) -> None:
+        """Recompute the snapshots of the users from their positions."""
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+
+        totals = {
+            user_id: (value, cost_basis)
+            for user_id, value, cost_basis in database.session.query(
+                Position.user_id,
+                func.sum(Position.market_value),
+                func.sum(Position.cost_basis),
+            )
+            .filter(Position.user_id.in_(user_ids))
+            .group_by(Position.user_id)
+        }
+        snapshots = {
+            snapshot.user_id: snapshot
+            for snapshot in cls.query.filter(cls.user_id.in_(user_ids))
+        }
+
+        for user_id in user_ids:
+            snapshot = snapshots.get(user_id)
+            if snapshot is None:
+                snapshot = cls(user_id)
+                database.session.add(snapshot)
+            snapshot.value, snapshot.cost_basis = totals.get(user_id, (0, 0))
+            snapshot.gain = snapshot.value - snapshot.cost_basis
+            snapshot.as_of = datetime.now()
+
+
+class DailyPrice(database.Model):
+    """Class that represents the daily prices of a stock.
+
+    The daily prices retrieved from Alpha Vantage are stored locally, so
+    that historical values can be computed without calling the API.
+
+    The following attributes of a daily price are stored in this table:
+        stock_symbol: str
+        date: date
+        open: integer
+        high: integer
+        low: integer
+        close: integer
+        updated_on (when the prices were added or changed): datetime
+
+    Note: the prices are stored as integers (in cents), like in Stock.
+    """
+
+    __tablename__ = "daily_prices"
+    __table_args__ = (
+        database.UniqueConstraint("stock_symbol", "date"),
+        # index for the version of the stored prices of a stock
+        database.Index(
+            "ix_daily_prices_stock_symbol_updated_on",
+            "stock_symbol",
+            "updated_on",
+        ),
+    )
+
+    id = database.Column(database.Integer, primary_key=True)
+    stock_symbol = database.Column(database.String, nullable=False)
+    date = database.Column(database.Date, nullable=False)
+    open = database.Column(database.Integer, nullable=False)
+    high = database.Column(database.Integer, nullable=False)
+    low = database.Column(database.Integer, nullable=False)
+    close = database.Column(database.Integer, nullable=False)
+    updated_on = database.Column(database.DateTime)
+
+    def __init__(
+        self,
+        stock_symbol: str,
+        date: "date",
+        open: int,
+        high: int,
+        low: int,
+        close: int,
+    ) -> None:
+        self.stock_symbol = stock_symbol
+        self.date = date
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.updated_on = datetime.now()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.stock_symbol} - closed at ${self.close / 100} "
+            f"on {self.date}"
+        )
+
+    @classmethod
+    def add_prices(cls, stock_symbol: str, daily_prices: list) -> list:
+        """
+        Add (or update) the daily prices of a stock, as returned by
+        get_daily_stock_prices().
+
+        Returns the list of the daily prices that were added or changed.
+        """
+        if not daily_prices:
+            return []
+
+        existing_prices = {
+            daily_price.date: daily_price
+            for daily_price in cls.query.filter(
+                cls.stock_symbol == stock_symbol,
+                cls.date >= daily_prices[0][0],
+            )
+        }
+
+        changed_prices = []
+        for daily_data in daily_prices:
+            daily_price = existing_prices.get(daily_data[0])
+            if daily_price is None:
+                daily_price = cls(stock_symbol, *daily_data)
+                database.session.add(daily_price)
+            elif (
+                daily_price.open,
+                daily_price.high,
+                daily_price.low,
+                daily_price.close,
+            ) != daily_data[1:]:
+                (
+                    daily_price.open,
+                    daily_price.high,
+                    daily_price.low,
+                    daily_price.close,
+                ) = daily_data[1:]
+                daily_price.updated_on = datetime.now()
+            else:
+                continue
+            changed_prices.append(daily_price)
+
+        # update the weekly and monthly rollups of the changed days
+        WeeklyPrice.update_periods(stock_symbol, changed_prices)
+        MonthlyPrice.update_periods(stock_symbol, changed_prices)
+        # (a late close of a day that is already in the value history)
+        if changed_prices:
+            PortfolioValue.invalidate_for_symbol(
+                stock_symbol,
+                min(daily_price.date for daily_price in changed_prices),
+            )
+        return changed_prices
+
+
+class PriceRollup(database.Model):
+    """Base class for the (OHLC) rollups of the daily prices of a stock.
+
+    A rollup combines the daily prices of a stock over a period (e.g. a
+    week) into a single row, so that charts of long ranges read a few
+    hundred rows instead of aggregating years of daily prices.
+
+    The following attributes of a rollup are stored in the table:
+        stock_symbol: str
+        period_start (first day of the period): date
+        open (open of the first day in the period): integer
+        high (highest high in the period): integer
+        low (lowest low in the period): integer
+        close (close of the last day in the period): integer
+        last_date (last day with a daily price in the period): date
+
+    A subclass defines the period with two static methods:
+        get_period_start(day): first day of the period containing a day
+        get_period_end(period_start): last day of the period
+
+    Note: the prices are stored as integers (in cents), like in Stock.
+    """
+
+    __abstract__ = True
+
+    id = database.Column(database.Integer, primary_key=True)
+    stock_symbol = database.Column(database.String, nullable=False)
+    period_start = database.Column(database.Date, nullable=False)
+    open = database.Column(database.Integer, nullable=False)
+    high = database.Column(database.Integer, nullable=False)
+    low = database.Column(database.Integer, nullable=False)
+    close = database.Column(database.Integer, nullable=False)
+    last_date = database.Column(database.Date, nullable=False)
+
+    @declared_attr
+    def __table_args__(cls):
+        return (database.UniqueConstraint("stock_symbol", "period_start"),)
+
+    def __init__(self, stock_symbol: str, period_start: "date") -> None:
+        self.stock_symbol = stock_symbol
+        self.period_start = period_start
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.stock_symbol} - closed at ${self.close / 100} "
+            f"in the period starting on {self.period_start}"
+        )
+
+    @classmethod
+    def update_periods(cls, stock_symbol: str, daily_prices: list) -> None:
+        """
+        Recompute the rollups of the periods that contain the given
+        (added or changed) daily prices of a stock.
+        """
+        period_starts = {
+            cls.get_period_start(daily_price.date)
+            for daily_price in daily_prices
+        }
+        if not period_starts:
+            return
+
+        rows = DailyPrice.query.filter(
+            DailyPrice.stock_symbol == stock_symbol,
+            DailyPrice.date >= min(period_starts),
+            DailyPrice.date <= cls.get_period_end(max(period_starts)),
+        ).order_by(DailyPrice.date)
+        periods = {}
+        for daily_price in rows:
+            period_start = cls.get_period_start(daily_price.date)
+            if period_start in period_starts:
+                periods.setdefault(period_start, []).append(daily_price)
+
+        rollups = {
+            rollup.period_start: rollup
+            for rollup in cls.query.filter(
+                cls.stock_symbol == stock_symbol,
+                cls.period_start.in_(period_starts),
+            )
+        }
+        for period_start, period_prices in periods.items():
+            rollup = rollups.get(period_start)
+            if rollup is None:
+                rollup = cls(stock_symbol, period_start)
+                database.session.add(rollup)
+            rollup.open = period_prices[0].open
+            rollup.high = max(
+                daily_price.high for daily_price in period_prices
+            )
+            rollup.low = min(daily_price.low for daily_price in period_prices)
+            rollup.close = period_prices[-1].close
+            rollup.last_date = period_prices[-1].date
+
+
+class WeeklyPrice(PriceRollup):
+    """Class that represents the weekly prices of a stock (Mon-Sun)."""
+
+    __tablename__ = "weekly_prices"
+
+    @staticmethod
+    def get_period_start(day: "date") -> "date":
+        return day - timedelta(days=day.weekday())
+
+    @staticmethod
+    def get_period_end(period_start: "date") -> "date":
+        return period_start + timedelta(days=6)
+
+
+class MonthlyPrice(PriceRollup):
+    """Class that represents the monthly prices of a stock."""
+
+    __tablename__ = "monthly_prices"
+
+    @staticmethod
+    def get_period_start(day: "date") -> "date":
+        return day.replace(day=1)
+
+    @staticmethod
+    def get_period_end(period_start: "date") -> "date":
+        next_month = (period_start + timedelta(days=31)).replace(day=1)
+        return next_month - timedelta(days=1)
+
+
+class PortfolioValue(database.Model):
+    """Class that represents the value of a portfolio on a day.
+
+    The following attributes of a portfolio value are stored:
+        user_id (primary key of user that owns the portfolio): int
+        date: date
+        value (market value of all stocks owned on that day): int
+
+    Note: the value is stored as an integer (in cents), like in Stock.
+    """
+
+    __tablename__ = "portfolio_values"
+    __table_args__ = (database.UniqueConstraint("user_id", "date"),)
+
+    id = database.Column(database.Integer, primary_key=True)
+    user_id = database.Column(
+        database.Integer, database.ForeignKey("users.id"), nullable=False
+    )
+    date = database.Column(database.Date, nullable=False)
+    value = database.Column(database.BigInteger, nullable=False)
+
+    def __init__(self, user_id: int, date: "date", value: int) -> None:
+        self.user_id = user_id
+        self.date = date
+        self.value = value
+
+    def __repr__(self) -> str:
+        return f"<PortfolioValue: user {self.user_id} on {self.date}>"
+
+    @classmethod
+    def invalidate_for_symbol(
+        cls, stock_symbol: str, from_date: "date"
+    ) -> None:
+        """
+        Delete the stored values of the portfolios holding a stock from
+        a date onwards (e.g. after a close of that date was added or
+        changed), so that they are computed again by the next update.
+        """
+        user_ids = select(Stock.user_id).where(
+            Stock.stock_symbol == stock_symbol
+        )
+        cls.query.filter(
+            cls.user_id.in_(user_ids), cls.date >= from_date
+        ).delete(synchronize_session=False)
+
+
+class PortfolioReturn(database.Model):
+    """Class that represents the returns of the portfolio of a user.
+
+    The returns are computed by a nightly batch (see returns.py), so
+    that the profile page can read them from a single row.
+
+    The following attributes of the returns are stored in this table:
+        user_id (primary key of user that owns the portfolio): int
+        time_weighted_return (cumulative TWR, as a fraction): float
+        money_weighted_return (annualized IRR, as a fraction): float
+        as_of (last trading day included): date
+        updated_on: datetime
+
+    Note: a return is None (NULL) if it is undefined for the portfolio.
+    """
+
+    __tablename__ = "portfolio_returns"
+
+    id = database.Column(database.Integer, primary_key=True)
+    user_id = database.Column(
+        database.Integer,
+        database.ForeignKey("users.id"),
+        nullable=False,
+        unique=True,
+    )
+    time_weighted_return = database.Column(database.Float)
+    money_weighted_return = database.Column(database.Float)
+    as_of = database.Column(database.Date, nullable=False)
+    updated_on = database.Column(database.DateTime, nullable=False)
+
+    def __init__(self, user_id: int, as_of: "date") -> None:
+        self.user_id = user_id
+        self.time_weighted_return = None
+        self.money_weighted_return = None
+        self.as_of = as_of
+        self.updated_on = datetime.now()
+
+    def __repr__(self) -> str:
+        return f"<PortfolioReturn: user {self.user_id} as of {self.as_of}>"
+
+
+class Transaction(database.Model):
+    """Class that represents a purchase or sale of shares of a stock.
+
+    Each purchased lot (Stock) is recorded as a buy, and the shares of
+    each sell are matched against the open shares of the buys (FIFO or
+    LIFO), so the realized gain of a sell is stored when it is recorded.
+
+    The following attributes of a transaction are stored in this table:
+        user_id (primary key of user that owns the transaction): int
+        stock_id (primary key of the purchased lot of a buy): int
+        stock_symbol: str
+        transaction_type ('buy' or 'sell'): str
+        number_of_shares: int
+        price (price of one share): int
+        transaction_date: datetime
+        remaining_shares (shares of a buy that were not sold yet): int
+        realized_gain (gain (or loss) of a sell): int
+        created_on: datetime
+
+    Note: the amounts are stored as integers (in cents), like in Stock.
+    """
+
+    __tablename__ = "transactions"
+    # index for matching the (open) buys of a user in a stock
+    __table_args__ = (
+        database.Index(
+            "ix_transactions_user_id_stock_symbol_transaction_date",
+            "user_id",
+            "stock_symbol",
+            "transaction_date",
+            "id",
+        ),
+    )
+
+    id = database.Column(database.Integer, primary_key=True)
+    user_id = database.Column(
+        database.Integer, database.ForeignKey("users.id"), nullable=False
+    )
+    stock_id = database.Column(
+        database.Integer, database.ForeignKey("stocks.id")
+    )
+    stock_symbol = database.Column(database.String, nullable=False)
+    transaction_type = database.Column(database.String, nullable=False)
+    number_of_shares = database.Column(database.Integer, nullable=False)
+    price = database.Column(database.Integer, nullable=False)
+    transaction_date = database.Column(database.DateTime, nullable=False)
+    remaining_shares = database.Column(database.Integer, nullable=False)
+    realized_gain = database.Column(database.Integer, nullable=False)
+    created_on = database.Column(database.DateTime, nullable=False)
+
+    stock = database.relationship("Stock")
+
+    def __init__(
+        self,
+        user_id: int,
+        stock_symbol: str,
+        transaction_type: str,
+        number_of_shares: int,
+        price: int,
+        transaction_date: datetime,
+    ) -> None:
+        self.user_id = user_id
+        self.stock_symbol = stock_symbol
+        self.transaction_type = transaction_type
+        self.number_of_shares = number_of_shares
+        self.price = price
+        self.transaction_date = transaction_date
+        self.remaining_shares = (
+            number_of_shares if transaction_type == "buy" else 0
+        )
+        self.realized_gain = 0
+        self.created_on = datetime.now()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.transaction_type} {self.number_of_shares} shares of "
+            f"{self.stock_symbol} at ${self.price / 100}"
+        )
+
+    @classmethod
+    def from_stock(cls, stock: Stock) -> "Transaction":
+        """Create the buy transaction of a purchased lot (Stock)."""
+        transaction = cls(
+            stock.user_id,
+            stock.stock_symbol,
+            "buy",
+            stock.number_of_shares,
+            stock.purchase_price,
+            stock.purchase_date,
+        )
+        transaction.stock = stock
+        return transaction
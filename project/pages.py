@@ -0,0 +1,101 @@
+"""
+Cache of the rendered pages that do not depend on the data of a user.
+
+The index, about and demo pages (and the error pages) only vary with
+the login state of the user, so each page is rendered once per variant
+(anonymous or authenticated) and stored in memory together with its
+compressed bodies (compressed once per encoding, at the configured
+level). A cached page is returned without calling the view, so no
+template is rendered.
+
+A page is not served from (or stored in) the cache if there are flashed
+messages to show, since they are rendered into the page.
+"""
+from dataclasses import dataclass, field
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+from project.cache import MemoryCache
+from project.compression import compress_body, get_content_encoding
+
+# cache of the rendered pages, keyed by view and variant
+page_cache = MemoryCache(max_entries=64)
+
+
+@dataclass
+class CachedPage:
+    """Rendered page, with its body and its compressed bodies."""
+
+    status: int
+    content_type: str
+    body: bytes
+    # compressed bodies, keyed by encoding
+    compressed_bodies: dict = field(default_factory=dict)
+
+
+def get_page_variant() -> str:
+    """Return the variant of the pages for the current user."""
+    if current_user.is_authenticated:
+        return "authenticated"
+    return "anonymous"
+
+
+def make_page_response(page: CachedPage):
+    """
+    Return a response of a cached page, compressed if accepted (like the
+    other responses, see compress_response()).
+    """
+    response = current_app.response_class(
+        page.body, status=page.status, content_type=page.content_type
+    )
+    response.vary.update(("Accept-Encoding", "Cookie"))
+    encoding = get_content_encoding()
+    if (
+        encoding is not None
+        and len(page.body) >= current_app.config["COMPRESSION_MIN_SIZE"]
+    ):
+        if encoding not in page.compressed_bodies:
+            page.compressed_bodies[encoding] = compress_body(
+                page.body, encoding
+            )
+        response.set_data(page.compressed_bodies[encoding])
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def cached_page(f):
+    """
+    Decorator of a view (or an error handler) whose page only depends
+    on the login state of the user, to serve the page from the cache.
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.method != "GET" or "_flashes" in session:
+            return f(*args, **kwargs)
+
+        key = ("page", f.__module__, f.__name__, get_page_variant())
+        page = page_cache.get(key)
+        if page is None:
+            response = make_response(f(*args, **kwargs))
+            # (a page that redirects or flashes for the next request is
+            # not cached)
+            if (
+                response.is_streamed
+                or 300 <= response.status_code < 400
+                or "_flashes" in session
+            ):
+                return response
+
+            body = response.get_data()
+            page = CachedPage(
+                status=response.status_code,
+                content_type=response.content_type,
+                body=body,
+            )
+            page_cache.set(key, page)
+        return make_page_response(page)
+
+    return decorated_function
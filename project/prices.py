@@ -0,0 +1,260 @@
+"""
+Refreshing of the current prices of the stocks in the portfolios.
+
+The current price of a symbol is retrieved from Alpha Vantage once a
+day and then written to the lots (Stock) and the Positions with that
+symbol, instead of retrieving the price separately for each lot. The
+prices of several symbols are retrieved concurrently. A request only
+writes the prices to the lots of its user (a price that was already
+retrieved today for another user is reused); the prices are written to
+the lots of the other users by the quote refresher. The refreshed
+prices are pushed to the live price streams only after they are
+committed, so a stream never shows a price that is rolled back.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, time
+
+from flask import current_app
+from sqlalchemy import or_
+
+from project import database
+from project.events import PriceUpdate, price_hub
+from project.models import (
+    DailyPrice,
+    PortfolioSnapshot,
+    Position,
+    Stock,
+    get_daily_stock_prices,
+)
+
+# maximum number of concurrent requests to Alpha Vantage
+FETCH_WORKERS = 4
+
+
+def is_price_current(stock: Stock) -> bool:
+    """Return True if the price of a stock was retrieved today."""
+    return (
+        stock.current_price_date is not None
+        and stock.current_price_date.date() == datetime.now().date()
+    )
+
+
+def update_stock_price(
+    stock_symbol: str, current_price: int, user_ids=None
+) -> None:
+    """
+    Write the current price (in cents) of a symbol to the lots and the
+    positions of the given users (or of every user).
+    """
+    query = Stock.query.filter_by(stock_symbol=stock_symbol)
+    if user_ids is not None:
+        query = query.filter(Stock.user_id.in_(user_ids))
+    query.update(
+        {
+            Stock.current_price: current_price,
+            Stock.current_price_date: datetime.now(),
+            Stock.position_value: Stock.number_of_shares * current_price,
+        },
+        synchronize_session="fetch",
+    )
+    Position.update_price(stock_symbol, current_price, user_ids)
+
+
+def load_prices_retrieved_today(symbols: list) -> dict:
+    """
+    Return the latest stored daily price (date, open, high, low, close)
+    of each of the symbols whose current price was already retrieved
+    today (for the lots of any user).
+    """
+    today = datetime.combine(date.today(), time.min)
+    retrieved_symbols = (
+        database.session.query(Stock.stock_symbol)
+        .filter(
+            Stock.stock_symbol.in_(symbols),
+            Stock.current_price_date >= today,
+        )
+        .distinct()
+    )
+    latest_prices = {}
+    for (symbol,) in retrieved_symbols:
+        daily_price = (
+            DailyPrice.query.filter_by(stock_symbol=symbol)
+            .order_by(DailyPrice.date.desc())
+            .first()
+        )
+        if daily_price is not None:
+            latest_prices[symbol] = (
+                daily_price.date,
+                daily_price.open,
+                daily_price.high,
+                daily_price.low,
+                daily_price.close,
+            )
+    return latest_prices
+
+
+def iter_daily_prices(symbols: list):
+    """
+    Retrieve the (compact) daily prices of the symbols from Alpha
+    Vantage, with up to FETCH_WORKERS concurrent requests.
+
+    Generates (symbol, daily prices) tuples in the order that the
+    requests complete (the daily prices are empty if they could not be
+    retrieved).
+    """
+    if len(symbols) <= 1:
+        for symbol in symbols:
+            yield symbol, get_daily_stock_prices(symbol)
+        return
+
+    app = current_app._get_current_object()
+
+    def fetch(symbol: str) -> tuple:
+        with app.app_context():
+            return symbol, get_daily_stock_prices(symbol)
+
+    with ThreadPoolExecutor(
+        max_workers=min(FETCH_WORKERS, len(symbols))
+    ) as executor:
+        futures = [executor.submit(fetch, symbol) for symbol in symbols]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def fetch_daily_prices(symbols: list) -> dict:
+    """
+    Retrieve the daily prices of the symbols (see iter_daily_prices()).
+
+    Returns a dict of symbol -> daily prices.
+    """
+    return dict(iter_daily_prices(symbols))
+
+
+def iter_refreshed_prices(symbols: list, user_ids=None):
+    """
+    Retrieve and store the daily prices of the symbols, and use the
+    latest close as the current price of each symbol in the lots of the
+    given users (or of every user). If user_ids is given, the prices of
+    the symbols that were already retrieved today are reused instead of
+    being retrieved again. The portfolio snapshots of the updated users
+    are recomputed at the end. The changes are added to the database
+    session, but not committed (the caller pushes the latest prices to
+    the live price streams with publish_prices() once they are
+    committed).
+
+    Generates (symbol, latest (date, open, high, low, close)) tuples as
+    the prices of each symbol are stored (the latest price is None if
+    the prices could not be retrieved).
+    """
+    reused_prices = {}
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        reused_prices = load_prices_retrieved_today(symbols)
+    updated_symbols = []
+    for symbol, latest_price in reused_prices.items():
+        update_stock_price(symbol, latest_price[4], user_ids)
+        updated_symbols.append(symbol)
+        yield symbol, latest_price
+
+    retrieved_symbols = [
+        symbol for symbol in symbols if symbol not in reused_prices
+    ]
+    for symbol, daily_prices in iter_daily_prices(retrieved_symbols):
+        if not daily_prices:
+            yield symbol, None
+            continue
+
+        DailyPrice.add_prices(symbol, daily_prices)
+        current_price = daily_prices[-1][4]
+        update_stock_price(symbol, current_price, user_ids)
+        updated_symbols.append(symbol)
+        current_app.logger.debug(
+            f"Retrieved current price {current_price / 100} "
+            f"for the stock data ({symbol})!"
+        )
+        yield symbol, daily_prices[-1]
+
+    if updated_symbols and user_ids is not None:
+        PortfolioSnapshot.update_for_users(user_ids)
+    elif updated_symbols:
+        holders = database.session.query(Position.user_id).filter(
+            Position.stock_symbol.in_(updated_symbols)
+        )
+        PortfolioSnapshot.update_for_users(
+            user_id for (user_id,) in holders.distinct()
+        )
+
+
+def refresh_symbol_prices(symbols: list, user_ids=None) -> dict:
+    """
+    Refresh the prices of the symbols for the lots of the given users
+    (see iter_refreshed_prices()).
+
+    Returns a dict of symbol -> latest (date, open, high, low, close)
+    for the symbols whose price was updated.
+    """
+    return {
+        symbol: latest_price
+        for symbol, latest_price in iter_refreshed_prices(symbols, user_ids)
+        if latest_price is not None
+    }
+
+
+def publish_prices(latest_prices: dict) -> None:
+    """
+    Push the latest prices (a dict of symbol -> latest (date, open,
+    high, low, close)) of refreshed symbols to the live price streams.
+    """
+    for symbol, latest_price in latest_prices.items():
+        price_hub.publish(
+            PriceUpdate(symbol, latest_price[4], latest_price[0])
+        )
+
+
+def get_outdated_symbols(stocks: list) -> list:
+    """Return the symbols of the stocks without a price from today."""
+    return sorted(
+        {stock.stock_symbol for stock in stocks if not is_price_current(stock)}
+    )
+
+
+def refresh_stock_prices(stocks: list, user_ids=None) -> dict:
+    """
+    Refresh the current prices of the symbols of the given stocks that
+    do not have a price from today, for the lots of the given users (see
+    refresh_symbol_prices()).
+
+    Returns a dict of symbol -> latest (date, open, high, low, close)
+    for the symbols whose price was updated.
+    """
+    return refresh_symbol_prices(get_outdated_symbols(stocks), user_ids)
+
+
+def propagate_prices(current_prices: dict) -> None:
+    """
+    Write the current prices (a dict of symbol -> price in cents,
+    retrieved today) to the lots and the positions of every user that
+    holds a symbol at an older price, and recompute the snapshots of
+    these users. The changes are not committed.
+    """
+    today = datetime.combine(date.today(), time.min)
+    updated_user_ids = set()
+    for symbol, current_price in current_prices.items():
+        user_ids = [
+            user_id
+            for (user_id,) in database.session.query(Stock.user_id)
+            .filter(
+                Stock.stock_symbol == symbol,
+                Stock.user_id.isnot(None),
+                or_(
+                    Stock.current_price_date.is_(None),
+                    Stock.current_price_date < today,
+                    Stock.current_price != current_price,
+                ),
+            )
+            .distinct()
+        ]
+        if user_ids:
+            update_stock_price(symbol, current_price, user_ids)
+            updated_user_ids.update(user_ids)
+    PortfolioSnapshot.update_for_users(updated_user_ids)
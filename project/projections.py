@@ -0,0 +1,317 @@
+"""
+Monte Carlo projection of the value of the portfolios.
+
+The mean and covariance of the daily log returns of the held symbols are
+estimated from the stored daily closes, and thousands of future price
+paths are simulated from them with NumPy. The paths are generated in
+batches by a (long-lived) pool of worker processes, one day at a time,
+and summarized as percentile bands of the value of the portfolio on
+each future trading day.
+
+A projection takes too long to compute in a request, so it runs as a
+background job (one at a time per application process): the request
+starts the job and the page polls until the result is cached. The
+results are cached per portfolio and trading day. A failed projection
+is not computed again for PROJECTION_RETRY_SECONDS.
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func
+
+from project import database
+from project.cache import MemoryCache
+from project.history import get_lots, load_close_prices
+from project.models import DailyPrice
+from project.queries import get_lots_version
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# number of paths simulated by each task of the process pool
+PATHS_PER_TASK = 500
+
+# cache of the projections, keyed by user, trading day and lots version
+projection_cache = MemoryCache(max_entries=256)
+
+# time (monotonic) at which a projection failed, keyed like the cache
+failed_projections = MemoryCache(max_entries=256)
+
+# background jobs computing a projection, keyed like the cache
+_jobs = {}
+_jobs_lock = threading.Lock()
+_job_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="projection"
+)
+
+# pool of worker processes simulating the paths, created on first use
+# and kept for the life of the process; the workers are spawned instead
+# of forked, since the pool is started by a background thread of a
+# multi-threaded server process
+_process_pool = None
+_process_pool_workers = None
+_process_pool_lock = threading.Lock()
+
+
+# --------------
+# Helper Classes
+# --------------
+
+
+@dataclass
+class Projection:
+    """Percentile bands of the simulated values of a portfolio."""
+
+    as_of: date
+    value: int
+    horizon_days: int
+    number_of_simulations: int
+    bands: dict
+
+
+# ----------------
+# Helper Functions
+# ----------------
+
+
+def get_holdings(lots: list) -> dict:
+    """
+    Return the number of shares held of each symbol (symbol -> shares)
+    from the lots and the sales of get_lots(), without the symbols whose
+    shares were all sold.
+    """
+    holdings = {}
+    for symbol, purchase_date, number_of_shares in lots:
+        holdings[symbol] = holdings.get(symbol, 0) + number_of_shares
+    return {
+        symbol: number_of_shares
+        for symbol, number_of_shares in holdings.items()
+        if number_of_shares > 0
+    }
+
+
+def estimate_return_statistics(closes) -> tuple:
+    """
+    Estimate the mean and covariance of the daily log returns of each
+    column of closes, only using the days on which every column has a
+    previous close.
+
+    Returns (None, None) if there are fewer than two daily returns.
+    """
+    prices = closes.astype(np.float64)
+    valid = (prices[:-1] > 0).all(axis=1) & (prices[1:] > 0).all(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_returns = np.log(prices[1:] / prices[:-1])[valid]
+    if len(log_returns) < 2:
+        return None, None
+    mean = log_returns.mean(axis=0)
+    covariance = np.atleast_2d(np.cov(log_returns, rowvar=False))
+    return mean, covariance
+
+
+def compute_shock_factor(covariance):
+    """
+    Compute a matrix F with F @ F.T == covariance, which turns
+    independent standard normal shocks into correlated ones. It is
+    computed with an eigendecomposition (instead of Cholesky), so that
+    singular covariance matrices also work.
+    """
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    return eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+
+
+def simulate_portfolio_values(
+    values, mean, shock_factor, horizon_days: int, number_of_paths: int, seed
+):
+    """
+    Simulate the value of a portfolio on each of the next horizon_days
+    trading days, starting from the current value of each holding.
+
+    The paths are advanced one day at a time, so only the (paths x
+    symbols) shocks of a day are in memory instead of the shocks of
+    every day.
+
+    Returns a (paths x days) array of values.
+    """
+    rng = np.random.default_rng(seed)
+    log_growth = np.zeros((number_of_paths, len(values)))
+    simulated_values = np.empty((number_of_paths, horizon_days))
+    for day in range(horizon_days):
+        shocks = rng.standard_normal((number_of_paths, len(values)))
+        log_growth += mean + shocks @ shock_factor.T
+        simulated_values[:, day] = np.exp(log_growth) @ values
+    return simulated_values
+
+
+def get_process_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the pool of worker processes (created if needed)."""
+    global _process_pool, _process_pool_workers
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_workers != workers:
+            if _process_pool is not None:
+                _process_pool.shutdown(wait=False)
+            _process_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _process_pool_workers = workers
+        return _process_pool
+
+
+def run_simulations(
+    values,
+    mean,
+    shock_factor,
+    horizon_days: int,
+    number_of_simulations: int,
+    workers: int,
+    seed,
+):
+    """
+    Simulate the values of a portfolio in batches of PATHS_PER_TASK
+    paths, using the pool of worker processes if workers > 1.
+
+    Returns a (simulations x days) array of values.
+    """
+    batch_sizes = [PATHS_PER_TASK] * (number_of_simulations // PATHS_PER_TASK)
+    if number_of_simulations % PATHS_PER_TASK:
+        batch_sizes.append(number_of_simulations % PATHS_PER_TASK)
+    seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+    arguments = (
+        [values] * len(batch_sizes),
+        [mean] * len(batch_sizes),
+        [shock_factor] * len(batch_sizes),
+        [horizon_days] * len(batch_sizes),
+        batch_sizes,
+        seeds,
+    )
+
+    if workers > 1 and len(batch_sizes) > 1:
+        executor = get_process_pool(workers)
+        batches = list(executor.map(simulate_portfolio_values, *arguments))
+    else:
+        batches = list(map(simulate_portfolio_values, *arguments))
+    return np.concatenate(batches)
+
+
+def compute_projection(user_id: int, latest_date: date) -> Projection:
+    """
+    Compute the projection of the current holdings of a user from the
+    daily closes up to latest_date (or None if the statistics of the
+    returns cannot be estimated).
+    """
+    config = current_app.config
+    holdings = get_holdings(get_lots(user_id))
+    symbols = sorted(holdings)
+    shares = np.array([holdings[symbol] for symbol in symbols], dtype=np.int64)
+
+    start_date = latest_date - timedelta(
+        days=config["PROJECTION_LOOKBACK_DAYS"]
+    )
+    dates, closes = load_close_prices(symbols, start_date, latest_date)
+    mean, covariance = estimate_return_statistics(closes)
+    if mean is None:
+        return None
+
+    values = (shares * closes[-1]).astype(np.float64)
+    simulated_values = run_simulations(
+        values,
+        mean,
+        compute_shock_factor(covariance),
+        config["PROJECTION_HORIZON_DAYS"],
+        config["PROJECTION_SIMULATIONS"],
+        config["PROJECTION_WORKERS"],
+        # the same paths are simulated for the same portfolio and day
+        seed=[user_id, latest_date.toordinal()],
+    )
+    bands = np.percentile(simulated_values, PERCENTILES, axis=0)
+    return Projection(
+        as_of=latest_date,
+        value=int(values.sum()),
+        horizon_days=config["PROJECTION_HORIZON_DAYS"],
+        number_of_simulations=config["PROJECTION_SIMULATIONS"],
+        bands={
+            percentile: [int(round(value)) for value in band]
+            for percentile, band in zip(PERCENTILES, bands)
+        },
+    )
+
+
+def _run_projection_job(app, user_id: int, latest_date: date, key) -> None:
+    """
+    Compute a projection in the background and cache it (or record the
+    time of the failure).
+    """
+    with app.app_context():
+        try:
+            projection_cache.set(key, compute_projection(user_id, latest_date))
+        except Exception:
+            failed_projections.set(key, time.monotonic())
+            app.logger.exception(
+                f"Error computing the projection (user {user_id})!"
+            )
+
+
+def _remove_job(key) -> None:
+    with _jobs_lock:
+        _jobs.pop(key, None)
+
+
+# -----------
+# Projections
+# -----------
+
+
+def get_projection(user_id: int) -> tuple:
+    """
+    Return the status and the projection of the portfolio of a user.
+
+    The status is 'done' if the projection is cached, 'pending' if it is
+    being computed by a background job (which is started if needed),
+    'error' if the job failed less than PROJECTION_RETRY_SECONDS ago, or
+    'unavailable' if there are no shares held, prices or return
+    statistics.
+    """
+    holdings = get_holdings(get_lots(user_id))
+    if not holdings:
+        return "unavailable", None
+    latest_date = (
+        database.session.query(func.max(DailyPrice.date))
+        .filter(DailyPrice.stock_symbol.in_(holdings))
+        .scalar()
+    )
+    if latest_date is None:
+        return "unavailable", None
+
+    key = ("projection", user_id, latest_date, get_lots_version(user_id))
+    if key in projection_cache:
+        projection = projection_cache.get(key)
+        return ("done" if projection else "unavailable"), projection
+    failed_at = failed_projections.get(key)
+    if (
+        failed_at is not None
+        and time.monotonic() - failed_at
+        < current_app.config["PROJECTION_RETRY_SECONDS"]
+    ):
+        return "error", None
+
+    future = None
+    with _jobs_lock:
+        if key not in _jobs:
+            future = _job_executor.submit(
+                _run_projection_job,
+                current_app._get_current_object(),
+                user_id,
+                latest_date,
+                key,
+            )
+            _jobs[key] = future
+    if future is not None:
+        # (outside of the lock, as a finished job calls it immediately)
+        future.add_done_callback(lambda future: _remove_job(key))
+    return "pending", None
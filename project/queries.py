@@ -0,0 +1,329 @@
+"""
+Query helpers for reading the portfolio data of a user.
+
+The filtering, sorting, paging and aggregation of the stocks is done
+in the database so that a route only loads the rows that it renders.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_
+
+from project.models import (
+    PortfolioReturn,
+    PortfolioSnapshot,
+    Position,
+    Stock,
+    Transaction,
+)
+
+# columns that the list of stocks can be sorted by
+SORT_COLUMNS = {
+    "symbol": Stock.stock_symbol,
+    "value": Stock.position_value,
+    "purchase_date": Stock.purchase_date,
+}
+SORT_ORDERS = ("asc", "desc")
+
+# amount paid (in cents) for the shares of a stock
+COST_BASIS = Stock.purchase_price * Stock.number_of_shares
+
+
+# --------------
+# Helper Classes
+# --------------
+
+
+@dataclass
+class PortfolioTotals:
+    """Totals of a set of stocks (all amounts are in cents)."""
+
+    value: int
+    cost_basis: int
+    number_of_lots: int
+
+    @property
+    def gain(self) -> int:
+        """Unrealized gain (or loss) in cents."""
+        return self.value - self.cost_basis
+
+
+@dataclass
+class HoldingSummary:
+    """Subtotals of the stocks of a user with the same symbol."""
+
+    stock_symbol: str
+    number_of_shares: int
+    value: int
+    cost_basis: int
+    number_of_lots: int
+
+    @property
+    def gain(self) -> int:
+        """Unrealized gain (or loss) in cents."""
+        return self.value - self.cost_basis
+
+
+@dataclass
+class PortfolioSummary:
+    """Totals and per-symbol subtotals of the stocks of a user."""
+
+    totals: PortfolioTotals
+    holdings: list
+
+
+# ----------------
+# Helper Functions
+# ----------------
+
+
+def encode_cursor(value, id: int) -> str:
+    """
+    Encode the sort value (which may be None) and id of the last row of
+    a page.
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    data = json.dumps([value, id]).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    """
+    Decode a cursor created by encode_cursor().
+
+    Raises a ValueError if the cursor is not valid for the sort column.
+    """
+    try:
+        value, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if sort == "purchase_date" and value is not None:
+            value = datetime.fromisoformat(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor ({cursor})!") from e
+
+    expected_type = {"symbol": str, "value": int, "purchase_date": datetime}
+    if not isinstance(id, int) or not (
+        value is None or isinstance(value, expected_type[sort])
+    ):
+        raise ValueError(f"Invalid cursor ({cursor})!")
+    return value, id
+
+
+def get_keyset_condition(column, order: str, last_value, last_id: int):
+    """
+    Return the condition selecting the rows after the (sort value, id)
+    of the last row of a page, in the order of get_stocks_page(): the
+    rows with a NULL sort value come last, in both orders.
+    """
+    if order == "desc":
+        after_id = Stock.id < last_id
+    else:
+        after_id = Stock.id > last_id
+    if last_value is None:
+        return and_(column.is_(None), after_id)
+
+    if order == "desc":
+        after_value = column < last_value
+    else:
+        after_value = column > last_value
+    return or_(
+        after_value,
+        and_(column == last_value, after_id),
+        column.is_(None),
+    )
+
+
+def filter_stocks(user_id: int, symbol: str = ""):
+    """
+    Return a query for the stocks of a user (filtered by symbol) with
+    shares that were not sold.
+    """
+    query = Stock.query.filter(
+        Stock.user_id == user_id, Stock.number_of_shares > 0
+    )
+    if symbol:
+        query = query.filter(
+            Stock.stock_symbol.startswith(symbol.upper(), autoescape=True)
+        )
+    return query
+
+
+# -------
+# Queries
+# -------
+
+
+def get_stocks_page(
+    user_id: int,
+    sort: str = "symbol",
+    order: str = "asc",
+    symbol: str = "",
+    cursor: tuple = None,
+    per_page: int = 25,
+) -> tuple:
+    """
+    Return one page of the stocks of a user using keyset pagination.
+
+    Instead of an OFFSET, the page starts right after the (sort value,
+    id) of the last row of the previous page (the cursor), so that every
+    page is a range scan on the (user_id, <sort column>, id) index.
+
+    The stocks without a sort value (e.g. the lots added before their
+    purchase date was stored) are listed last, in both orders.
+
+    Returns the list of stocks on the page and the cursor for the next
+    page (None if this is the last page).
+    """
+    column = SORT_COLUMNS[sort]
+    query = filter_stocks(user_id, symbol)
+
+    if cursor is not None:
+        query = query.filter(get_keyset_condition(column, order, *cursor))
+
+    if order == "desc":
+        query = query.order_by(column.desc().nulls_last(), Stock.id.desc())
+    else:
+        query = query.order_by(column.asc().nulls_last(), Stock.id.asc())
+
+    # fetch one extra row to determine if there is a next page
+    stocks = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(stocks) > per_page:
+        stocks = stocks[:per_page]
+        last_stock = stocks[-1]
+        next_cursor = encode_cursor(
+            getattr(last_stock, column.key), last_stock.id
+        )
+
+    return stocks, next_cursor
+
+
+def get_portfolio_totals(user_id: int, symbol: str = "") -> PortfolioTotals:
+    """
+    Return the totals of the stocks of a user (optionally filtered by
+    symbol) using a single aggregate query.
+    """
+    value, cost_basis, number_of_lots = (
+        filter_stocks(user_id, symbol)
+        .with_entities(
+            func.coalesce(func.sum(Stock.position_value), 0),
+            func.coalesce(func.sum(COST_BASIS), 0),
+            func.count(Stock.id),
+        )
+        .one()
+    )
+    return PortfolioTotals(value, cost_basis, number_of_lots)
+
+
+def get_cost_bases(user_id: int) -> dict:
+    """
+    Return the cost basis (in cents) of the shares held of each symbol
+    by a user, using a single aggregate query.
+    """
+    return dict(
+        filter_stocks(user_id)
+        .with_entities(Stock.stock_symbol, func.sum(COST_BASIS))
+        .group_by(Stock.stock_symbol)
+        .all()
+    )
+
+
+def get_held_symbols(user_id: int) -> set:
+    """Return the symbols of the stocks held by a user."""
+    return {
+        stock_symbol
+        for (stock_symbol,) in filter_stocks(user_id)
+        .with_entities(Stock.stock_symbol)
+        .distinct()
+    }
+
+
+def get_lots_version(user_id: int) -> tuple:
+    """
+    Return a version of the lots of a user that changes whenever a lot
+    is added or removed or shares are sold: (number of lots, highest
+    id, highest id of the transactions).
+    """
+    number_of_lots, last_id = (
+        filter_stocks(user_id)
+        .with_entities(func.count(Stock.id), func.max(Stock.id))
+        .one()
+    )
+    last_transaction_id = (
+        Transaction.query.filter(Transaction.user_id == user_id)
+        .with_entities(func.max(Transaction.id))
+        .scalar()
+    )
+    return number_of_lots, last_id, last_transaction_id
+
+
+def get_quotes_version(user_id: int) -> datetime:
+    """
+    Return a version of the current prices of the lots of a user that
+    changes whenever the price of a held symbol is updated: the latest
+    time that a price of the lots was retrieved.
+    """
+    return (
+        filter_stocks(user_id)
+        .with_entities(func.max(Stock.current_price_date))
+        .scalar()
+    )
+
+
+def get_portfolio_snapshot(user_id: int) -> PortfolioSnapshot:
+    """Return the latest snapshot of a user's portfolio (or None)."""
+    return PortfolioSnapshot.query.filter_by(user_id=user_id).first()
+
+
+def get_portfolio_summary(user_id: int) -> PortfolioSummary:
+    """
+    Return the totals and the per-symbol subtotals of the stocks of a
+    user, grouped by symbol in the database.
+    """
+    rows = (
+        filter_stocks(user_id)
+        .with_entities(
+            Stock.stock_symbol,
+            func.sum(Stock.number_of_shares),
+            func.coalesce(func.sum(Stock.position_value), 0),
+            func.sum(COST_BASIS),
+            func.count(Stock.id),
+        )
+        .group_by(Stock.stock_symbol)
+        .order_by(Stock.stock_symbol)
+        .all()
+    )
+    holdings = [
+        HoldingSummary(symbol, shares, value, cost_basis, number_of_lots)
+        for symbol, shares, value, cost_basis, number_of_lots in rows
+    ]
+
+    # the totals are the sum of the (few) per-symbol subtotals
+    totals = PortfolioTotals(
+        sum(holding.value for holding in holdings),
+        sum(holding.cost_basis for holding in holdings),
+        sum(holding.number_of_lots for holding in holdings),
+    )
+    return PortfolioSummary(totals, holdings)
+
+
+def get_positions(user_id: int) -> list:
+    """
+    Return the (precomputed) positions of a user with shares held or a
+    realized gain, ordered by symbol.
+    """
+    return (
+        Position.query.filter(
+            Position.user_id == user_id,
+            or_(Position.number_of_shares > 0, Position.realized_gain != 0),
+        )
+        .order_by(Position.stock_symbol)
+        .all()
+    )
+
+
+def get_portfolio_return(user_id: int) -> PortfolioReturn:
+    """Return the (precomputed) returns of the portfolio of a user."""
+    return PortfolioReturn.query.filter_by(user_id=user_id).first()
@@ -0,0 +1,256 @@
+"""
+Current quotes (latest daily closes) of the stocks, for the quotes API.
+
+A quote is answered from the in-memory cache, or else from the stored
+daily prices. Only the symbols without a quote retrieved today are
+retrieved from Alpha Vantage, together in one batched (concurrent)
+refresh per request, and only if they are held by the user (so that a
+client cannot spend the API quota on arbitrary symbols); the refreshed
+prices are then written to the lots of that user only. A symbol whose
+refresh failed is not retried for QUOTE_RETRY_SECONDS. Every quote
+carries the time that it was retrieved, so that the clients can tell
+how old it is.
+
+While there are live price streams open, a background thread refreshes
+the quotes of their symbols periodically, writes the current quotes to
+the lots of every user holding the symbols and pushes them to the hub.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import and_, func
+
+from project import database
+from project.cache import MemoryCache
+from project.events import PriceUpdate, price_hub
+from project.models import DailyPrice, Stock
+from project.prices import (
+    propagate_prices,
+    publish_prices,
+    refresh_symbol_prices,
+)
+
+# maximum number of symbols in one request for quotes
+MAX_QUOTE_SYMBOLS = 50
+
+# cache of the current quotes, keyed by symbol
+quote_cache = MemoryCache(max_entries=4096)
+
+# time (monotonic) of the last failed refresh, keyed by symbol
+failed_quotes = MemoryCache(max_entries=4096)
+
+# background thread refreshing the quotes of the live price streams
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+# --------------
+# Helper Classes
+# --------------
+
+
+@dataclass
+class Quote:
+    """Latest daily close (in cents) of a stock."""
+
+    stock_symbol: str
+    price: int
+    price_date: date
+    retrieved_at: datetime
+
+    def is_current(self, now: datetime) -> bool:
+        """Return True if the quote was retrieved on the day of now."""
+        return self.retrieved_at.date() == now.date()
+
+
+# ----------------
+# Helper Functions
+# ----------------
+
+
+def load_stored_quotes(symbols: list) -> dict:
+    """
+    Return the quotes (symbol -> Quote) of the symbols with stored daily
+    prices. A quote was retrieved when the current price of the lots
+    with the symbol was last updated (or at the start of the day of the
+    close, if nobody holds the symbol).
+    """
+    latest_dates = (
+        database.session.query(
+            DailyPrice.stock_symbol, func.max(DailyPrice.date).label("date")
+        )
+        .filter(DailyPrice.stock_symbol.in_(symbols))
+        .group_by(DailyPrice.stock_symbol)
+        .subquery()
+    )
+    rows = database.session.query(
+        DailyPrice.stock_symbol, DailyPrice.date, DailyPrice.close
+    ).join(
+        latest_dates,
+        and_(
+            DailyPrice.stock_symbol == latest_dates.c.stock_symbol,
+            DailyPrice.date == latest_dates.c.date,
+        ),
+    )
+    retrieved_at = dict(
+        database.session.query(
+            Stock.stock_symbol, func.max(Stock.current_price_date)
+        )
+        .filter(Stock.stock_symbol.in_(symbols))
+        .group_by(Stock.stock_symbol)
+    )
+    return {
+        symbol: Quote(
+            symbol,
+            close,
+            price_date,
+            retrieved_at.get(symbol)
+            or datetime.combine(price_date, datetime.min.time()),
+        )
+        for symbol, price_date, close in rows
+    }
+
+
+def is_refresh_failing(symbol: str) -> bool:
+    """
+    Return True if the refresh of a symbol failed less than
+    QUOTE_RETRY_SECONDS ago.
+    """
+    failed_at = failed_quotes.get(symbol)
+    return (
+        failed_at is not None
+        and time.monotonic() - failed_at
+        < current_app.config["QUOTE_RETRY_SECONDS"]
+    )
+
+
+# ------
+# Quotes
+# ------
+
+
+def get_quotes(
+    symbols: list,
+    now: datetime = None,
+    refreshable: set = None,
+    user_ids: list = None,
+) -> dict:
+    """
+    Return the quotes of the symbols: a dict of symbol -> (Quote,
+    source) where the source is 'cache', 'store' or 'upstream'.
+
+    The symbols without a quote retrieved today (in the cache or the
+    store) are refreshed together from Alpha Vantage, and the refreshed
+    prices are committed (to the lots of the given users, or of every
+    user; see refresh_symbol_prices()). Only the symbols in refreshable
+    (if given) are refreshed, and a symbol whose refresh failed is not
+    refreshed again for QUOTE_RETRY_SECONDS. If a symbol is not
+    refreshed, its last stored quote is returned (if any); symbols
+    without any quote are left out.
+    """
+    now = now or datetime.now()
+    quotes = {}
+    for symbol in symbols:
+        quote = quote_cache.get(symbol)
+        if quote is not None and quote.is_current(now):
+            quotes[symbol] = (quote, "cache")
+
+    misses = [symbol for symbol in symbols if symbol not in quotes]
+    stored_quotes = load_stored_quotes(misses) if misses else {}
+    for symbol, quote in stored_quotes.items():
+        if quote.is_current(now):
+            quote_cache.set(symbol, quote)
+            quotes[symbol] = (quote, "store")
+
+    # one batched refresh for all of the remaining symbols
+    misses = [symbol for symbol in symbols if symbol not in quotes]
+    refreshed_symbols = [
+        symbol
+        for symbol in misses
+        if (refreshable is None or symbol in refreshable)
+        and not is_refresh_failing(symbol)
+    ]
+    if refreshed_symbols:
+        latest_prices = refresh_symbol_prices(refreshed_symbols, user_ids)
+        # (the refreshed prices are stored even though the quotes are
+        # read with GET: they are the same prices that any later request
+        # would retrieve, so the request stays safe and idempotent)
+        database.session.commit()
+        publish_prices(latest_prices)
+        for symbol in refreshed_symbols:
+            latest_price = latest_prices.get(symbol)
+            if latest_price is None:
+                failed_quotes.set(symbol, time.monotonic())
+                continue
+            quote = Quote(symbol, latest_price[4], latest_price[0], now)
+            quote_cache.set(symbol, quote)
+            quotes[symbol] = (quote, "upstream")
+
+    for symbol in misses:
+        if symbol not in quotes and symbol in stored_quotes:
+            quotes[symbol] = (stored_quotes[symbol], "store")
+    return quotes
+
+
+def _run_quote_refresher(app, interval: float) -> None:
+    """
+    Refresh the quotes of the subscribed symbols every interval seconds,
+    write them to the lots of every holder and push them to the hub,
+    until there are no subscriptions left.
+    """
+    global _refresher
+    while True:
+        time.sleep(interval)
+        with _refresher_lock:
+            symbols = sorted(price_hub.get_symbols())
+            if not symbols:
+                _refresher = None
+                return
+
+        with app.app_context():
+            try:
+                for start in range(0, len(symbols), MAX_QUOTE_SYMBOLS):
+                    end = start + MAX_QUOTE_SYMBOLS
+                    quotes = get_quotes(symbols[start:end])
+                    # (the requests only update the lots of their user)
+                    now = datetime.now()
+                    propagate_prices(
+                        {
+                            symbol: quote.price
+                            for symbol, (quote, source) in quotes.items()
+                            if quote.is_current(now)
+                        }
+                    )
+                    database.session.commit()
+                    for symbol, (quote, source) in quotes.items():
+                        price_hub.publish(
+                            PriceUpdate(symbol, quote.price, quote.price_date)
+                        )
+            except Exception:
+                app.logger.exception(
+                    "Error refreshing the quotes of the price streams!"
+                )
+
+
+def start_quote_refresher(app) -> None:
+    """
+    Start the background refresher of the quotes of the live price
+    streams (if it is not running), unless PRICE_STREAM_REFRESH_SECONDS
+    is 0.
+    """
+    global _refresher
+    interval = app.config["PRICE_STREAM_REFRESH_SECONDS"]
+    if interval <= 0:
+        return
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = threading.Thread(
+                target=_run_quote_refresher,
+                args=(app, interval),
+                name="quote-refresher",
+                daemon=True,
+            )
+            _refresher.start()
@@ -0,0 +1,282 @@
+"""
+Time-weighted (TWR) and money-weighted (IRR) returns of the portfolios.
+
+The returns are computed by a nightly batch, in chunks of users. For
+each chunk, the lots and the stored daily closes of all of its users are
+loaded with one query each, the daily values of every portfolio are
+computed at once, and the IRR of every portfolio is solved together
+with a vectorized Newton iteration (with bisection as the fallback).
+The chunks can be processed in parallel by a pool of worker processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from itertools import repeat
+
+import numpy as np
+from flask import Flask, current_app
+
+from project import database
+from project.analytics import to_float
+from project.history import (
+    compute_shares_held,
+    get_lots_of_users,
+    load_close_prices,
+)
+from project.models import PortfolioReturn
+
+DAYS_PER_YEAR = 365.0
+
+# Flask application of a worker process of the batch
+_worker_app = None
+
+
+# ----------------
+# Helper Functions
+# ----------------
+
+
+def compute_npv(rates, amounts, times):
+    """
+    Compute the net present value of each row of cash flows (amounts at
+    times in years) discounted at the rate of the row.
+    """
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        discount = (1.0 + rates[:, np.newaxis]) ** -times
+        return (amounts * discount).sum(axis=1)
+
+
+def compute_irr(
+    amounts,
+    times,
+    tolerance: float = 1e-10,
+    max_iterations: int = 50,
+    bisection_iterations: int = 200,
+):
+    """
+    Compute the internal rate of return (annualized) of each row of cash
+    flows, where amounts and times (in years) are (rows x flows) arrays
+    (padded with zero amounts).
+
+    All of the rows are solved together with Newton's method. The rows
+    that do not converge are solved with bisection, and the rate of a
+    row without a sign change of the net present value is NaN.
+    """
+    rates = np.full(len(amounts), 0.1)
+    converged = np.zeros(len(amounts), dtype=bool)
+
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        for _ in range(max_iterations):
+            growth = 1.0 + rates[:, np.newaxis]
+            npv = (amounts * growth**-times).sum(axis=1)
+            derivative = (-times * amounts * growth ** (-times - 1.0)).sum(
+                axis=1
+            )
+            step = npv / derivative
+            new_rates = rates - step
+            valid = np.isfinite(new_rates) & (new_rates > -1.0) & ~converged
+            rates = np.where(valid, new_rates, rates)
+            converged |= valid & (np.abs(step) < tolerance)
+            if converged.all():
+                return rates
+
+    # bisection over (-100%, +10000%) for the remaining rows
+    remaining = ~converged
+    amounts, times = amounts[remaining], times[remaining]
+    low = np.full(len(amounts), -0.9999)
+    high = np.full(len(amounts), 100.0)
+    npv_low = compute_npv(low, amounts, times)
+    bracketed = np.sign(npv_low) != np.sign(compute_npv(high, amounts, times))
+    for _ in range(bisection_iterations):
+        middle = (low + high) / 2.0
+        npv_middle = compute_npv(middle, amounts, times)
+        same_sign = np.sign(npv_middle) == np.sign(npv_low)
+        low = np.where(same_sign, middle, low)
+        npv_low = np.where(same_sign, npv_middle, npv_low)
+        high = np.where(same_sign, high, middle)
+    rates[remaining] = np.where(bracketed, (low + high) / 2.0, np.nan)
+    return rates
+
+
+def compute_portfolio_returns(user_ids: list, end_date: date) -> list:
+    """
+    Compute the returns of the portfolios of the users up to end_date.
+
+    Returns a list of (user_id, time_weighted_return,
+    money_weighted_return, as_of) tuples, for the users with lots.
+    """
+    lots = get_lots_of_users(user_ids, with_price=True, purchased_by=end_date)
+    if not lots:
+        return []
+
+    symbols = sorted({lot[1] for lot in lots})
+    start_date = min(lot[2] for lot in lots).date()
+    dates, closes = load_close_prices(symbols, start_date, end_date)
+    if len(dates) == 0:
+        return []
+
+    # the returns are computed up to the last trading day
+    as_of = dates[-1]
+    lots = [lot for lot in lots if lot[2].date() <= as_of.item()]
+    users = sorted({lot[0] for lot in lots})
+
+    # one column per (user, symbol) holding
+    holdings = sorted({(lot[0], lot[1]) for lot in lots})
+    user_indexes = {user_id: index for index, user_id in enumerate(users)}
+    symbol_indexes = {symbol: index for index, symbol in enumerate(symbols)}
+    holding_users = np.array([user_indexes[user] for user, _ in holdings])
+    holding_symbols = np.array([symbol_indexes[sym] for _, sym in holdings])
+
+    shares_held = compute_shares_held(
+        [((lot[0], lot[1]), lot[2], lot[3]) for lot in lots], holdings, dates
+    )
+    values = np.zeros((len(users), len(dates)), dtype=np.int64)
+    np.add.at(
+        values, holding_users, (shares_held * closes[:, holding_symbols]).T
+    )
+
+    # cash flows: the cost of each lot (or the proceeds of each sale) on
+    # the first trading day on or after its purchase date
+    lot_users = np.array([user_indexes[lot[0]] for lot in lots])
+    lot_dates = np.array(
+        [lot[2].date() for lot in lots], dtype="datetime64[D]"
+    )
+    lot_costs = np.array([lot[3] * lot[4] for lot in lots], dtype=np.int64)
+    flows = np.zeros((len(users), len(dates)), dtype=np.int64)
+    np.add.at(flows, (lot_users, np.searchsorted(dates, lot_dates)), lot_costs)
+
+    # time-weighted: chain the daily returns, where the cash flows of a
+    # day are invested at its close (or at its start for the first one)
+    previous_values = np.zeros(values.shape, dtype=np.int64)
+    previous_values[:, 1:] = values[:, :-1]
+    invested = np.where(previous_values > 0, previous_values, flows)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_returns = np.where(
+            invested > 0,
+            (values - flows - previous_values) / invested,
+            0.0,
+        )
+    time_weighted_returns = np.prod(1.0 + daily_returns, axis=1) - 1.0
+
+    # money-weighted: one row of cash flows per user (the purchases and
+    # the sales, followed by the final value of the portfolio)
+    order = np.argsort(lot_users, kind="stable")
+    counts = np.bincount(lot_users, minlength=len(users))
+    slots = np.arange(len(lots)) - np.repeat(
+        np.cumsum(counts) - counts, counts
+    )
+    first_dates = np.full(len(users), as_of)
+    np.minimum.at(first_dates, lot_users, lot_dates)
+
+    amounts = np.zeros((len(users), counts.max() + 1))
+    times = np.zeros(amounts.shape)
+    amounts[lot_users[order], slots] = -lot_costs[order]
+    times[lot_users[order], slots] = (
+        lot_dates[order] - first_dates[lot_users[order]]
+    ).astype(np.float64) / DAYS_PER_YEAR
+    amounts[:, -1] = values[:, -1]
+    times[:, -1] = (as_of - first_dates).astype(np.float64) / DAYS_PER_YEAR
+    money_weighted_returns = compute_irr(amounts, times)
+
+    return [
+        (
+            user_id,
+            to_float(time_weighted_returns[index]),
+            to_float(money_weighted_returns[index]),
+            as_of.item(),
+        )
+        for index, user_id in enumerate(users)
+    ]
+
+
+def store_portfolio_returns(results: list) -> None:
+    """Add (or update) the computed returns of the portfolios."""
+    if not results:
+        return
+
+    portfolio_returns = {
+        portfolio_return.user_id: portfolio_return
+        for portfolio_return in PortfolioReturn.query.filter(
+            PortfolioReturn.user_id.in_([result[0] for result in results])
+        )
+    }
+    for user_id, time_weighted, money_weighted, as_of in results:
+        portfolio_return = portfolio_returns.get(user_id)
+        if portfolio_return is None:
+            portfolio_return = PortfolioReturn(user_id, as_of)
+            database.session.add(portfolio_return)
+        portfolio_return.time_weighted_return = time_weighted
+        portfolio_return.money_weighted_return = money_weighted
+        portfolio_return.as_of = as_of
+        portfolio_return.updated_on = datetime.now()
+
+
+def _initialize_worker(config: dict) -> None:
+    """
+    Create the Flask application of a worker process, with the same
+    configuration as the application that started the batch.
+
+    The worker only needs the database, so the application is created
+    without the blueprints, the logging (which would add another handler
+    of the log file in each process) or the static files.
+    """
+    global _worker_app
+    _worker_app = Flask(__name__)
+    _worker_app.config.update(config)
+    database.init_app(_worker_app)
+
+
+def _compute_portfolio_returns_in_worker(
+    user_ids: list, end_date: date
+) -> list:
+    """Compute the returns of a chunk of users in a worker process."""
+    with _worker_app.app_context():
+        return compute_portfolio_returns(user_ids, end_date)
+
+
+# -----------
+# Batch Tasks
+# -----------
+
+
+def update_portfolio_returns(
+    user_ids: list,
+    end_date: date = None,
+    chunk_size: int = 1000,
+    workers: int = 1,
+) -> int:
+    """
+    Compute and store the returns of the portfolios of the users up to
+    end_date (default: today), in chunks of chunk_size users.
+
+    With more than one worker, the chunks are computed by a pool of
+    worker processes and the results are stored by this process, one
+    commit per chunk.
+
+    Returns the number of portfolios whose returns were stored.
+    """
+    end_date = end_date or date.today()
+    chunks = []
+    for start in range(0, len(user_ids), chunk_size):
+        end = start + chunk_size
+        chunks.append(user_ids[start:end])
+
+    number_of_portfolios = 0
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_initialize_worker,
+            initargs=(dict(current_app.config),),
+        ) as executor:
+            for results in executor.map(
+                _compute_portfolio_returns_in_worker, chunks, repeat(end_date)
+            ):
+                store_portfolio_returns(results)
+                database.session.commit()
+                number_of_portfolios += len(results)
+    else:
+        for chunk in chunks:
+            results = compute_portfolio_returns(chunk, end_date)
+            store_portfolio_returns(results)
+            database.session.commit()
+            number_of_portfolios += len(results)
+    return number_of_portfolios
@@ -0,0 +1,35 @@
+// Decoders of the series returned by the JSON endpoints in the compact
+// format (?format=compact): the dates are the number of days since the
+// previous date (starting from a base date), and the values are integer
+// cents, each one as the difference from the previous value.
+
+// decode the values (null values are kept), divided by the scale
+function decodeDeltas(deltas, scale = 100) {
+    var previous = 0;
+    return deltas.map(delta => {
+        if (delta === null) {
+            return null;
+        }
+        previous += delta;
+        return previous / scale;
+    });
+}
+
+// decode the dates (as ISO strings)
+function decodeDates(baseDate, deltas) {
+    if (baseDate === null) {
+        return [];
+    }
+    var base = Date.parse(baseDate + "T00:00:00Z");
+    return decodeDeltas(deltas, 1).map(
+        days => new Date(base + days * 86400000).toISOString().slice(0, 10)
+    );
+}
+
+// decode the dates and the values of a series in the compact format
+function decodeSeries(data) {
+    return {
+        dates: decodeDates(data.base_date, data.days),
+        values: decodeDeltas(data.values)
+    };
+}
@@ -1,4 +1,4 @@
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from functools import wraps
 
 import click
@@ -6,36 +6,105 @@ from flask import (
     abort,
     current_app,
     flash,
+    get_flashed_messages,
+    get_template_attribute,
+    jsonify,
     redirect,
     render_template,
     request,
     session,
+    stream_template,
     url_for,
 )
 from flask_login import current_user, login_required
+from markupsafe import Markup
 from pydantic import BaseModel, ValidationError, validator
 
 from project import database
-from project.models import Stock
+from project.analytics import get_correlation_matrix, get_portfolio_analytics
+from project.cache import MemoryCache
+from project.charts import (
+    CHART_RANGES,
+    DEFAULT_CHART_POINTS,
+    DEFAULT_CHART_RANGE,
+    MAX_CHART_POINTS,
+    MAX_COMPARISON_SYMBOLS,
+    MIN_CHART_POINTS,
+    downsample_chart,
+    get_chart_series,
+    get_comparison_chart,
+    get_last_bar,
+)
+from project.conditional import conditional
+from project.encoding import (
+    COMPACT_FORMAT,
+    encode_dates,
+    encode_deltas,
+    encode_series,
+    is_compact_format_requested,
+    json_response,
+    to_cents,
+)
+from project.events import price_hub, stream_price_updates
+from project.history import (
+    get_portfolio_history,
+    get_portfolio_value_as_of,
+    invalidate_portfolio_history,
+    update_portfolio_history,
+)
+from project.indicators import INDICATORS, get_indicator_overlays
+from project.ledger import LOT_MATCHING_METHODS, record_buy, record_sell
+from project.models import (
+    DailyPrice,
+    PortfolioSnapshot,
+    Stock,
+    get_daily_stock_prices,
+)
+from project.pages import cached_page
+from project.prices import (
+    get_outdated_symbols,
+    iter_refreshed_prices,
+    publish_prices,
+)
+from project.projections import get_projection
+from project.queries import (
+    SORT_COLUMNS,
+    SORT_ORDERS,
+    decode_cursor,
+    get_lots_version,
+    get_portfolio_snapshot,
+    get_portfolio_totals,
+    get_positions,
+    get_quotes_version,
+    get_stocks_page,
+)
+from project.quotes import start_quote_refresher
+from project.returns import update_portfolio_returns
 
 from . import stocks_blueprint
 
+# cache of the rendered rows of the pages of the list of stocks, keyed
+# by user, page, version of the lots and version of their prices
+stock_rows_cache = MemoryCache(max_entries=1024)
+
 # ------------
 # CLI Commands
 # ------------
 
 
 @stocks_blueprint.cli.command("create_default_set")
-def create_default_set():
+@click.argument("user_id", type=int, required=False)
+def create_default_set(user_id):
     """
-    Create three new stocks and add them to the database
+    Create three new stocks (for a user, if given) and add them to the
+    database
     """
-    stock1 = Stock("HD", "25", "247.29")
-    stock2 = Stock("TWTR", "230", "31.89")
-    stock3 = Stock("DIS", "65", "118.77")
-    database.session.add(stock1)
-    database.session.add(stock2)
-    database.session.add(stock3)
+    for symbol, number_of_shares, purchase_price in (
+        ("HD", "25", "247.29"),
+        ("TWTR", "230", "31.89"),
+        ("DIS", "65", "118.77"),
+    ):
+        add_lot(Stock(symbol, number_of_shares, purchase_price, user_id))
     database.session.commit()
 
 
@@ -43,15 +112,94 @@ def create_default_set():
 @click.argument("symbol")
 @click.argument("number_of_shares")
 @click.argument("purchase_price")
-def create(symbol, number_of_shares, purchase_price):
+@click.argument("user_id", type=int, required=False)
+def create(symbol, number_of_shares, purchase_price, user_id):
     """
-    Create a new stock and add it to the database
+    Create a new stock (for a user, if given) and add it to the database
     """
-    stock = Stock(symbol, number_of_shares, purchase_price)
-    database.session.add(stock)
+    add_lot(Stock(symbol, number_of_shares, purchase_price, user_id))
     database.session.commit()
 
 
+@stocks_blueprint.cli.command("fetch_daily_prices")
+@click.option("--full", is_flag=True, help="Retrieve the full price history.")
+def fetch_daily_prices(full):
+    """
+    Retrieve and store the daily prices of every stock in the portfolios
+    (and of the benchmark)
+    """
+    symbols = {
+        symbol
+        for (symbol,) in database.session.query(Stock.stock_symbol).distinct()
+    }
+    symbols.add(current_app.config["BENCHMARK_SYMBOL"])
+    for symbol in sorted(symbols):
+        daily_prices = get_daily_stock_prices(symbol, full=full)
+        DailyPrice.add_prices(symbol, daily_prices)
+        database.session.commit()
+        click.echo(f"Stored {len(daily_prices)} daily prices ({symbol})")
+
+
+@stocks_blueprint.cli.command("update_portfolio_history")
+def update_portfolio_histories():
+    """
+    Extend the daily value history of every portfolio
+    """
+    user_ids = [
+        user_id
+        for (user_id,) in database.session.query(Stock.user_id)
+        .filter(Stock.user_id.isnot(None))
+        .distinct()
+    ]
+    for user_id in user_ids:
+        number_of_values = update_portfolio_history(user_id)
+        database.session.commit()
+        click.echo(f"Added {number_of_values} daily values (user {user_id})")
+
+
+@stocks_blueprint.cli.command("value_as_of")
+@click.argument("user_id", type=int)
+@click.argument("as_of", type=click.DateTime(formats=["%Y-%m-%d"]))
+def value_as_of(user_id, as_of):
+    """
+    Print the value of the portfolio of a user on a date (YYYY-MM-DD)
+    """
+    valuation = get_portfolio_value_as_of(user_id, as_of.date())
+    for holding in valuation.holdings:
+        click.echo(
+            f"{holding.stock_symbol}: {holding.number_of_shares} shares, "
+            f"${holding.value / 100:.2f} (close of {holding.close_date})"
+        )
+    click.echo(
+        f"Portfolio value on {as_of.date()}: ${valuation.value / 100:.2f}"
+    )
+
+
+@stocks_blueprint.cli.command("update_portfolio_returns")
+@click.option(
+    "--chunk-size", default=1000, help="Number of users computed together."
+)
+@click.option(
+    "--workers", default=1, help="Number of worker processes to use."
+)
+def update_all_portfolio_returns(chunk_size, workers):
+    """
+    Compute the time-weighted and money-weighted returns of the
+    portfolios
+    """
+    user_ids = [
+        user_id
+        for (user_id,) in database.session.query(Stock.user_id)
+        .filter(Stock.user_id.isnot(None))
+        .distinct()
+        .order_by(Stock.user_id)
+    ]
+    number_of_portfolios = update_portfolio_returns(
+        user_ids, chunk_size=chunk_size, workers=workers
+    )
+    click.echo(f"Stored the returns of {number_of_portfolios} portfolios")
+
+
 # -----------------
 # Request Callbacks
 # -----------------
@@ -94,6 +242,49 @@ class StockModel(BaseModel):
         return value.upper()
 
 
+class SaleModel(BaseModel):
+    """Class for parsing the data of a sale of shares from a form."""
+
+    stock_symbol: str
+    number_of_shares: int
+    sale_price: float
+    lot_matching_method: str
+
+    @validator("stock_symbol")
+    def stock_symbol_check(cls, value):
+        if not value.isalpha() or len(value) > 5:
+            raise ValueError("Stock symbol must be 1-5 characters")
+        return value.upper()
+
+    @validator("number_of_shares")
+    def number_of_shares_check(cls, value):
+        if value <= 0:
+            raise ValueError("Number of shares must be positive")
+        return value
+
+    @validator("lot_matching_method")
+    def lot_matching_method_check(cls, value):
+        if value not in LOT_MATCHING_METHODS:
+            raise ValueError("Lot matching method must be FIFO or LIFO")
+        return value
+
+
+def add_lot(stock: Stock) -> None:
+    """
+    Add a purchased lot (purchased today if no date is given) to the
+    database, with its buy transaction, position and snapshot (a lot
+    without a user is not in any portfolio, so only the lot is added).
+    """
+    if stock.purchase_date is None:
+        stock.purchase_date = datetime.now()
+    database.session.add(stock)
+    if stock.user_id is None:
+        return
+    record_buy(stock)
+    PortfolioSnapshot.update_for_users([stock.user_id])
+    invalidate_portfolio_history(stock.user_id, stock.purchase_date)
+
+
 def email_confirmation_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -108,10 +299,171 @@ def email_confirmation_required(f):
     return decorated_function
 
 
+def get_chart_arguments() -> tuple:
+    """
+    Return the range and the indicators of a stock chart from the
+    arguments of the request (400 if not valid).
+    """
+    chart_range = request.args.get("range", DEFAULT_CHART_RANGE)
+    indicators = request.args.getlist("indicator")
+    if chart_range not in CHART_RANGES or any(
+        indicator not in INDICATORS for indicator in indicators
+    ):
+        abort(400)
+    return chart_range, indicators
+
+
+def get_stocks_list_arguments() -> tuple:
+    """
+    Return the sort column, the order, the symbol filter and the cursor
+    (decoded) of the list of stocks from the arguments of the request
+    (400 if not valid).
+    """
+    sort = request.args.get("sort", "symbol")
+    order = request.args.get("order", "asc")
+    symbol = request.args.get("symbol", "").strip().upper()
+    if sort not in SORT_COLUMNS or order not in SORT_ORDERS:
+        abort(400)
+
+    cursor = None
+    if request.args.get("cursor"):
+        try:
+            cursor = decode_cursor(request.args["cursor"], sort)
+        except ValueError:
+            current_app.logger.info(
+                "Invalid cursor in list stocks request: "
+                f"{request.args['cursor']}"
+            )
+            abort(400)
+
+    return sort, order, symbol, cursor
+
+
+def get_stocks_list_page(sort: str, order: str, symbol: str, cursor) -> tuple:
+    """
+    Return the stocks of the current user on a page of the list of
+    stocks, and the cursor of the next page.
+    """
+    # (sorting by value uses the stored values; the outdated prices of
+    # the stocks on the page are refreshed by the view)
+    return get_stocks_page(
+        current_user.id,
+        sort=sort,
+        order=order,
+        symbol=symbol,
+        cursor=cursor,
+        per_page=current_app.config["STOCKS_PER_PAGE"],
+    )
+
+
+def get_owned_stock(id) -> Stock:
+    """Return a stock of the current user (or None)."""
+    stock = Stock.query.filter_by(id=id).first()
+    if stock is None or stock.user_id != current_user.id:
+        return None
+    return stock
+
+
+def get_stocks_validators() -> tuple:
+    """
+    Return the validators of the list of stocks of the current user,
+    from the versions of the lots and of their prices, and the day (the
+    outdated prices of a new day are refreshed by the view). The
+    arguments of the list are part of the URL of the entity tag.
+    """
+    get_stocks_list_arguments()
+    quotes_version = get_quotes_version(current_user.id)
+    today = datetime.combine(date.today(), datetime.min.time())
+    parts = (
+        current_user.id,
+        current_app.config["STOCKS_PER_PAGE"],
+        get_lots_version(current_user.id),
+        quotes_version,
+        today,
+    )
+    return parts, max(quotes_version or today, today)
+
+
+def get_stock_details_validators(id) -> tuple:
+    """Return the validators of the details of a stock (a lot)."""
+    stock = get_owned_stock(id)
+    if stock is None:
+        return None
+    parts = (
+        current_user.id,
+        stock.stock_symbol,
+        stock.number_of_shares,
+        stock.purchase_price,
+        stock.purchase_date,
+    )
+    return parts, None
+
+
+def get_stock_chart_validators(id) -> tuple:
+    """
+    Return the validators of the chart of a stock, from the last stored
+    bar (date and close) and the day, or None if no bars are stored for
+    the range (the chart is then retrieved from Alpha Vantage).
+    """
+    stock = get_owned_stock(id)
+    chart_range = request.args.get("range", DEFAULT_CHART_RANGE)
+    if stock is None or chart_range not in CHART_RANGES:
+        return None
+
+    days, resolution = CHART_RANGES[chart_range]
+    last_bar = get_last_bar(stock.stock_symbol, resolution)
+    if last_bar is None or (
+        days is not None and last_bar[0] < date.today() - timedelta(days=days)
+    ):
+        return None
+    parts = (
+        current_user.id,
+        stock.stock_symbol,
+        *last_bar,
+        date.today(),
+    )
+    return parts, None
+
+
+def get_comparison_arguments() -> tuple:
+    """
+    Return the symbols that can be compared (the held stocks and the
+    benchmark), the selected symbols and the start date of a comparison
+    chart from the arguments of the request (400 if not valid).
+    """
+    symbols = sorted(
+        {
+            position.stock_symbol
+            for position in get_positions(current_user.id)
+            if position.number_of_shares > 0
+        }
+        | {current_app.config["BENCHMARK_SYMBOL"]}
+    )
+    selected_symbols = (
+        request.args.getlist("symbol") or symbols[:MAX_COMPARISON_SYMBOLS]
+    )
+    default_start_date = date.today() - timedelta(days=365)
+    try:
+        start_date = date.fromisoformat(
+            request.args.get("start", default_start_date.isoformat())
+        )
+    except ValueError:
+        abort(400)
+
+    if (
+        len(selected_symbols) > MAX_COMPARISON_SYMBOLS
+        or any(symbol not in symbols for symbol in selected_symbols)
+        or start_date > date.today()
+    ):
+        abort(400)
+    return symbols, selected_symbols, start_date
+
+
 # ------
 # Routes
 # ------
 @stocks_blueprint.route("/")
+@cached_page
 def index():
     current_app.logger.info("Calling the index() function.")
     return render_template("stocks/index.html")
@@ -142,7 +494,7 @@ def add_stock():
                 current_user.id,
                 datetime.fromisoformat(request.form["purchase_date"]),
             )
-            database.session.add(new_stock)
+            add_lot(new_stock)
             database.session.commit()
 
             flash(
@@ -160,41 +512,195 @@ def add_stock():
     return render_template("stocks/add_stock.html")
 
 
-@stocks_blueprint.route("/stocks/")
+@stocks_blueprint.route("/sell_stock", methods=["GET", "POST"])
 @login_required
 @email_confirmation_required
-def list_stocks():
-    stocks = (
-        Stock.query.order_by(Stock.id).filter_by(user_id=current_user.id).all()
-    )
-    current_account_value = 0.0
-    for stock in stocks:
-        stock.get_stock_data()
-        if stock.current_price == 0.0:
+def sell_stock():
+    if request.method == "POST":
+        try:
+            sale_data = SaleModel(
+                stock_symbol=request.form["stock_symbol"],
+                number_of_shares=request.form["number_of_shares"],
+                sale_price=request.form["sale_price"],
+                lot_matching_method=request.form.get(
+                    "lot_matching_method", "fifo"
+                ),
+            )
+            sale = record_sell(
+                current_user.id,
+                sale_data.stock_symbol,
+                sale_data.number_of_shares,
+                round(sale_data.sale_price * 100),
+                datetime.fromisoformat(request.form["sale_date"]),
+                method=sale_data.lot_matching_method,
+            )
+            PortfolioSnapshot.update_for_users([current_user.id])
+            invalidate_portfolio_history(
+                current_user.id, sale.transaction_date
+            )
+            database.session.commit()
+
             flash(
                 (
-                    f"API communication issue with retrieving "
-                    f"the current stock price ({stock.stock_symbol})!"
+                    f"Sold {sale.number_of_shares} shares of "
+                    f"{sale.stock_symbol} (realized gain: "
+                    f"${sale.realized_gain / 100:.2f})!"
                 ),
-                "error",
+                category="success",
+            )
+            current_app.logger.info(
+                f"Sold {sale.number_of_shares} shares of {sale.stock_symbol}!"
             )
-        database.session.add(stock)
-        current_account_value += stock.get_stock_position_value()
+            return redirect(url_for("stocks.list_stocks"))
+        except ValidationError as e:
+            print(e)
+        except ValueError as e:
+            database.session.rollback()
+            flash(str(e), "error")
 
-    database.session.commit()
     return render_template(
+        "stocks/sell_stock.html", lot_matching_methods=LOT_MATCHING_METHODS
+    )
+
+
+@stocks_blueprint.route("/stocks/")
+@login_required
+@email_confirmation_required
+@conditional(get_stocks_validators)
+def list_stocks():
+    sort, order, symbol, cursor = get_stocks_list_arguments()
+    # only the stocks on the current page are loaded (and refreshed)
+    stocks, next_cursor = get_stocks_list_page(sort, order, symbol, cursor)
+    # the flashed messages are read before the response is streamed,
+    # since the session is saved before the body is generated
+    get_flashed_messages()
+    outdated_symbols = get_outdated_symbols(stocks)
+    refreshed_prices = iter_refreshed_prices(
+        outdated_symbols, [current_user.id]
+    )
+    latest_prices = {}
+    failed_symbols = []
+
+    # if every price is current, the rows are rendered once until a lot
+    # is added or the price of a held symbol is updated
+    stock_rows = None
+    if not outdated_symbols:
+        stock_row = get_template_attribute(
+            "stocks/stock_row.html", "stock_row"
+        )
+        key = (
+            "stock_rows",
+            current_user.id,
+            sort,
+            order,
+            symbol,
+            request.args.get("cursor"),
+            current_app.config["STOCKS_PER_PAGE"],
+            get_lots_version(current_user.id),
+            get_quotes_version(current_user.id),
+        )
+        stock_rows = stock_rows_cache.get_or_compute(
+            key, lambda: Markup("".join(stock_row(stock) for stock in stocks))
+        )
+
+    def generate_rows():
+        # each row is sent (in the sort order) once the price of its
+        # symbol is refreshed, instead of after every price is refreshed
+        pending_symbols = set(outdated_symbols)
+        for stock in stocks:
+            while stock.stock_symbol in pending_symbols:
+                refreshed_symbol, latest_price = next(refreshed_prices)
+                pending_symbols.discard(refreshed_symbol)
+                if latest_price is not None:
+                    latest_prices[refreshed_symbol] = latest_price
+            if (
+                stock.current_price == 0
+                and stock.stock_symbol not in failed_symbols
+            ):
+                failed_symbols.append(stock.stock_symbol)
+            yield stock
+        for refreshed_symbol, latest_price in refreshed_prices:
+            if latest_price is not None:
+                latest_prices[refreshed_symbol] = latest_price
+        database.session.commit()
+        # (the prices are pushed to the live streams once committed)
+        publish_prices(latest_prices)
+
+    def get_totals():
+        # the totals cover every stock (matching the filter), not just
+        # the stocks on the current page; without a filter they are
+        # read from the snapshot of the portfolio
+        totals = None
+        if not symbol:
+            totals = get_portfolio_snapshot(current_user.id)
+        if totals is None:
+            totals = get_portfolio_totals(current_user.id, symbol)
+        return totals
+
+    return stream_template(
         "stocks/stocks.html",
-        stocks=stocks,
-        value=round(current_account_value, 2),
+        stocks=generate_rows(),
+        stock_rows=stock_rows,
+        get_totals=get_totals,
+        failed_symbols=failed_symbols,
+        sort=sort,
+        order=order,
+        symbol=symbol,
+        cursor=request.args.get("cursor"),
+        next_cursor=next_cursor,
     )
 
 
+@stocks_blueprint.route("/stocks/prices/stream")
+@login_required
+@email_confirmation_required
+def stream_prices():
+    config = current_app.config
+    # the price updates of the held symbols are pushed by the hub of
+    # this process, and the stream does not use the database
+    symbols = {
+        position.stock_symbol
+        for position in get_positions(current_user.id)
+        if position.number_of_shares > 0
+    }
+    # each stream holds a worker thread, so the streams of a process
+    # are capped; a refused page polls the quotes API instead
+    subscription = price_hub.subscribe(
+        symbols,
+        config["PRICE_STREAM_QUEUE_SIZE"],
+        config["PRICE_STREAM_MAX_STREAMS"],
+    )
+    if subscription is None:
+        return current_app.response_class(
+            status=503,
+            headers={
+                "Retry-After": str(int(config["PRICE_STREAM_MAX_SECONDS"]))
+            },
+        )
+
+    start_quote_refresher(current_app._get_current_object())
+    response = current_app.response_class(
+        stream_price_updates(
+            subscription,
+            config["PRICE_STREAM_HEARTBEAT_SECONDS"],
+            config["PRICE_STREAM_MAX_SECONDS"],
+        ),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # (a stream that is closed before it starts never runs its cleanup)
+    response.call_on_close(lambda: price_hub.unsubscribe(subscription))
+    return response
+
+
 @stocks_blueprint.route("/chartjs_demo1")
+@cached_page
 def chartjs_demo1():
     return render_template("stocks/chartjs_demo1.html")
 
 
 @stocks_blueprint.route("/chartjs_demo2")
+@cached_page
 def chartjs_demo2():
     title = "Monthly Data"
     labels = [
@@ -214,6 +720,7 @@ def chartjs_demo2():
 
 
 @stocks_blueprint.route("/chartjs_demo3")
+@cached_page
 def chartjs_demo3():
     title = "Daily Prices"
     labels = [
@@ -235,17 +742,218 @@ def chartjs_demo3():
 @stocks_blueprint.route("/stocks/<id>")
 @login_required
 @email_confirmation_required
+@conditional(get_stock_details_validators)
 def stock_details(id):
     stock = Stock.query.filter_by(id=id).first_or_404()
 
     if stock.user_id != current_user.id:
         abort(403)
 
-    title, labels, values = stock.get_weekly_stock_data()
+    chart_range, indicators = get_chart_arguments()
     return render_template(
         "stocks/stock_details.html",
         stock=stock,
-        title=title,
-        labels=labels,
-        values=values,
+        chart_range=chart_range,
+        chart_ranges=CHART_RANGES,
+        indicators=indicators,
+        all_indicators=INDICATORS,
+    )
+
+
+@stocks_blueprint.route("/stocks/<id>/chart.json")
+@login_required
+@email_confirmation_required
+@conditional(get_stock_chart_validators)
+def stock_chart_data(id):
+    stock = Stock.query.filter_by(id=id).first_or_404()
+
+    if stock.user_id != current_user.id:
+        abort(403)
+
+    chart_range, indicators = get_chart_arguments()
+    points = request.args.get("points", DEFAULT_CHART_POINTS, type=int)
+    if not MIN_CHART_POINTS <= points <= MAX_CHART_POINTS:
+        abort(400)
+
+    # the chart (and its overlays) is read from the stored prices, or
+    # retrieved from Alpha Vantage if no prices are stored for the range
+    overlays = []
+    series = get_chart_series(stock.stock_symbol, chart_range, points)
+    if series is not None:
+        overlays = get_indicator_overlays(
+            stock.stock_symbol,
+            CHART_RANGES[chart_range][1],
+            indicators,
+            series.number_of_bars,
+            series.indexes,
+        )
+    else:
+        series = downsample_chart(*stock.get_weekly_stock_data(), points)
+
+    if is_compact_format_requested():
+        return json_response(
+            {
+                "title": series.title,
+                **encode_series(series.dates, to_cents(series.values)),
+                "overlays": [
+                    {
+                        **overlay,
+                        "values": encode_deltas(to_cents(overlay["values"])),
+                    }
+                    for overlay in overlays
+                ],
+            }
+        )
+    return jsonify(
+        title=series.title,
+        dates=series.dates,
+        values=series.values,
+        overlays=overlays,
+    )
+
+
+@stocks_blueprint.route("/stocks/history")
+@login_required
+@email_confirmation_required
+def portfolio_history():
+    return render_template("stocks/portfolio_history.html")
+
+
+@stocks_blueprint.route("/stocks/history.json")
+@login_required
+@email_confirmation_required
+def portfolio_history_data():
+    # the daily values are precomputed by the CLI command
+    # 'flask stocks update_portfolio_history'
+    dates, values = get_portfolio_history(current_user.id)
+    if is_compact_format_requested():
+        return json_response(
+            {
+                "title": "Portfolio Value",
+                **encode_series([day.isoformat() for day in dates], values),
+            }
+        )
+    return jsonify(
+        title="Portfolio Value",
+        dates=[day.isoformat() for day in dates],
+        values=[value / 100 for value in values],
+    )
+
+
+@stocks_blueprint.route("/stocks/value")
+@login_required
+@email_confirmation_required
+def portfolio_value_as_of():
+    try:
+        as_of = date.fromisoformat(
+            request.args.get("date", date.today().isoformat())
+        )
+    except ValueError:
+        abort(400)
+
+    valuation = get_portfolio_value_as_of(current_user.id, as_of)
+    return render_template("stocks/value_as_of.html", valuation=valuation)
+
+
+@stocks_blueprint.route("/stocks/analytics")
+@login_required
+@email_confirmation_required
+def portfolio_analytics():
+    analytics = get_portfolio_analytics(current_user.id)
+    return render_template("stocks/analytics.html", analytics=analytics)
+
+
+@stocks_blueprint.route("/stocks/diversification")
+@login_required
+@email_confirmation_required
+def portfolio_diversification():
+    symbols = [
+        position.stock_symbol
+        for position in get_positions(current_user.id)
+        if position.number_of_shares > 0
+    ]
+    correlation_matrix = None
+    if len(symbols) > 1:
+        correlation_matrix = get_correlation_matrix(symbols)
+    return render_template(
+        "stocks/diversification.html", correlation_matrix=correlation_matrix
+    )
+
+
+@stocks_blueprint.route("/stocks/compare")
+@login_required
+@email_confirmation_required
+def portfolio_comparison():
+    symbols, selected_symbols, start_date = get_comparison_arguments()
+    return render_template(
+        "stocks/comparison.html",
+        symbols=symbols,
+        selected_symbols=selected_symbols,
+        start_date=start_date,
+    )
+
+
+@stocks_blueprint.route("/stocks/compare.json")
+@login_required
+@email_confirmation_required
+def portfolio_comparison_data():
+    # all of the series are read from the stored daily prices at once
+    symbols, selected_symbols, start_date = get_comparison_arguments()
+    comparison = get_comparison_chart(selected_symbols, start_date)
+    dates, series = [], {}
+    if comparison is not None:
+        dates, series = comparison.dates, comparison.series
+
+    if is_compact_format_requested():
+        base_date, days = encode_dates(dates)
+        return json_response(
+            {
+                "format": COMPACT_FORMAT,
+                "title": "Comparison (normalized to 100)",
+                "start": start_date.isoformat(),
+                "base_date": base_date,
+                "days": days,
+                "series": {
+                    symbol: encode_deltas(to_cents(values))
+                    for symbol, values in series.items()
+                },
+            }
+        )
+    return jsonify(
+        title="Comparison (normalized to 100)",
+        start=start_date.isoformat(),
+        dates=dates,
+        series=series,
+    )
+
+
+@stocks_blueprint.route("/stocks/projection")
+@login_required
+@email_confirmation_required
+def portfolio_projection():
+    return render_template("stocks/projection.html")
+
+
+@stocks_blueprint.route("/stocks/projection.json")
+@login_required
+@email_confirmation_required
+def portfolio_projection_data():
+    # the projection is computed by a background job, so the page polls
+    # this endpoint until the status is no longer 'pending'
+    status, projection = get_projection(current_user.id)
+    if status == "pending":
+        return jsonify(status=status), 202
+    if projection is None:
+        return jsonify(status=status)
+    return jsonify(
+        status=status,
+        title="Projected Portfolio Value",
+        as_of=projection.as_of.isoformat(),
+        value=projection.value / 100,
+        number_of_simulations=projection.number_of_simulations,
+        days=list(range(1, projection.horizon_days + 1)),
+        bands={
+            str(percentile): [value / 100 for value in band]
+            for percentile, band in projection.bands.items()
+        },
     )
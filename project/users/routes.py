@@ -27,6 +27,12 @@ from sqlalchemy.exc import IntegrityError
 
 from project import database, mail
 from project.models import User
+from project.pages import cached_page
+from project.queries import (
+    get_portfolio_return,
+    get_portfolio_snapshot,
+    get_positions,
+)
 from project.users.forms import (
     ChangeEmailForm,
     ChangePasswordForm,
@@ -94,6 +100,7 @@ def generate_password_reset_email(user_email):
 
 
 @users_blueprint.route("/about")
+@cached_page
 def about():
     flash("Thanks for learning about this site!", category="info")
     return render_template("users/about.html", company_name="TestDriven.io")
@@ -220,7 +227,12 @@ def register():
 @users_blueprint.route("/profile")
 @login_required
 def user_profile():
-    return render_template("users/profile.html")
+    return render_template(
+        "users/profile.html",
+        snapshot=get_portfolio_snapshot(current_user.id),
+        positions=get_positions(current_user.id),
+        portfolio_return=get_portfolio_return(current_user.id),
+    )
 
 
 @users_blueprint.route("/confirm/<token>")
@@ -3,6 +3,7 @@ from datetime import datetime
 import flask
 import pytest
 import requests
+from flask.testing import FlaskClient
 
 from project import create_app, database
 from project.models import Stock, User
@@ -12,6 +13,20 @@ from project.models import Stock, User
 # --------------
 
 
+class BufferedRedirectsClient(FlaskClient):
+    """
+    Test client that reads the responses of the requests that follow
+    redirects before returning them: the contexts of the redirected
+    requests are preserved in a nested order, so the context of a
+    streamed response could not be popped once they are pushed again.
+    """
+
+    def open(self, *args, **kwargs):
+        if kwargs.get("follow_redirects"):
+            kwargs.setdefault("buffered", True)
+        return super().open(*args, **kwargs)
+
+
 class MockSuccessResponseWeekly(object):
     def __init__(self, url: str) -> None:
         self.status_code = 200
@@ -133,6 +148,7 @@ def test_client():
     flask_app = create_app()
     flask_app.config.from_object("config.TestingConfig")
     flask_app.extensions["mail"].suppress = True
+    flask_app.test_client_class = BufferedRedirectsClient
 
     # create a test client using the Flask app configured for testing
     with flask_app.test_client() as testing_client:
@@ -353,3 +369,36 @@ def confirm_email_second_user_logged_in(test_client, log_in_second_user):
 #     user.email_confirmed_on = None
 #     database.session.add(user)
 #     database.session.commit()
+
+
+@pytest.fixture(scope="module")
+def add_stocks_for_paging(test_client):
+    # establish an application context for accessing the database
+    app_context = test_client.application.app_context()
+    app_context.push()
+
+    # Add stocks (with a current value) for a user that is not logged in
+    stocks = [
+        ("MSFT", "10", "250.00", datetime(2021, 3, 1), 2800000),
+        ("AAPL", "20", "120.00", datetime(2020, 6, 15), 3000000),
+        ("AMZN", "5", "3100.00", datetime(2021, 11, 2), 1650000),
+        ("AAPL", "8", "150.00", datetime(2022, 1, 10), 1200000),
+        ("SBUX", "40", "90.00", datetime(2019, 8, 22), 400000),
+    ]
+    for symbol, shares, price, purchase_date, position_value in stocks:
+        stock = Stock(symbol, shares, price, 99, purchase_date)
+        stock.position_value = position_value
+        database.session.add(stock)
+    database.session.commit()
+
+    # this is where testing happens
+    yield
+
+    app_context.pop()
+
+
+@pytest.fixture(scope="function")
+def app_context(test_client):
+    # establish an application context for accessing the database
+    with test_client.application.app_context():
+        yield
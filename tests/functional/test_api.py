@@ -0,0 +1,183 @@
+"""
+This file contains the functional tests for the api blueprint.
+"""
+
+
+def test_get_api_stocks(
+    test_client, add_stocks_for_default_user, mock_requests_get_success_daily
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+    WHEN the '/api/v1/stocks' data is requested (GET)
+    THEN check that the stocks are returned with the amounts in cents
+    """
+    response = test_client.get("/api/v1/stocks?symbol=SAM")
+    assert response.status_code == 200
+    assert response.content_type == "application/json"
+    stock = response.json["stocks"][0]
+    assert stock["stock_symbol"] == "SAM"
+    assert stock["number_of_shares"] == 27
+    assert stock["purchase_price"] == 30123
+    assert stock["purchase_date"] == "2020-07-01T00:00:00"
+    assert isinstance(stock["current_price"], int)
+    assert response.json["next_cursor"] is None
+
+
+def test_get_api_stocks_paginated_sparse_fields(
+    test_client, add_stocks_for_default_user, mock_requests_get_success_daily
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+    WHEN the '/api/v1/stocks' data is requested (GET) one stock at a
+        time with only some of the fields
+    THEN check that the pages follow each other and only the selected
+        fields are returned
+    """
+    response = test_client.get("/api/v1/stocks?limit=1&fields=id,stock_symbol")
+    assert response.status_code == 200
+    first_stock = response.json["stocks"][0]
+    assert list(first_stock) == ["id", "stock_symbol"]
+    assert first_stock["stock_symbol"] == "COST"
+
+    next_cursor = response.json["next_cursor"]
+    response = test_client.get(
+        f"/api/v1/stocks?limit=1&fields=stock_symbol&cursor={next_cursor}"
+    )
+    assert response.status_code == 200
+    assert response.json["stocks"][0]["stock_symbol"] in ("COST", "SAM")
+    assert response.json["next_cursor"] is not None
+
+
+def test_get_api_stocks_invalid_arguments(
+    test_client, confirm_email_default_user_logged_in
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+    WHEN the '/api/v1/stocks' data is requested (GET) with an invalid
+        field, limit or cursor
+    THEN check that a 400 (Bad Request) error is returned as JSON
+    """
+    response = test_client.get("/api/v1/stocks?fields=id,password")
+    assert response.status_code == 400
+    assert response.json["error"] == "Invalid fields: password."
+    response = test_client.get("/api/v1/stocks?limit=1000")
+    assert response.status_code == 400
+    response = test_client.get("/api/v1/stocks?cursor=abc")
+    assert response.status_code == 400
+
+
+def test_get_api_stock(
+    test_client, add_stocks_for_default_user, mock_requests_get_success_daily
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+    WHEN the '/api/v1/stocks/<id>' data is requested (GET)
+    THEN check that the stock is returned (404 for an invalid id)
+    """
+    response = test_client.get("/api/v1/stocks/3?fields=stock_symbol")
+    assert response.status_code == 200
+    assert response.json == {"stock_symbol": "TWTR"}
+    response = test_client.get("/api/v1/stocks/234")
+    assert response.status_code == 404
+    assert response.json["error"] == "Stock not found."
+
+
+def test_get_api_portfolio(test_client, add_stocks_for_default_user):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+    WHEN the '/api/v1/portfolio' data is requested (GET)
+    THEN check that the totals and holdings are returned in cents
+    """
+    response = test_client.get("/api/v1/portfolio")
+    assert response.status_code == 200
+    assert response.json["cost_basis"] >= 27 * 30123
+    holdings = {
+        holding["stock_symbol"]: holding
+        for holding in response.json["holdings"]
+    }
+    assert holdings["SAM"]["cost_basis"] % (27 * 30123) == 0
+
+    response = test_client.get("/api/v1/portfolio?fields=value,gain")
+    assert list(response.json) == ["value", "gain"]
+
+
+def test_get_api_not_logged_in(test_client):
+    """
+    GIVEN a Flask application configured for testing
+        and user is NOT logged in
+    WHEN the '/api/v1/portfolio' data is requested (GET)
+    THEN check that a 401 (Unauthorized) error is returned as JSON
+    """
+    response = test_client.get("/api/v1/portfolio")
+    assert response.status_code == 401
+    assert "error" in response.json
+
+
+def test_get_api_stock_incorrect_user(
+    test_client, confirm_email_second_user_logged_in
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the second user signed in (confirmed)
+    WHEN the '/api/v1/stocks/3' data is requested (GET)
+    THEN check that a 403 (Forbidden) error is returned
+    """
+    response = test_client.get("/api/v1/stocks/3")
+    assert response.status_code == 403
+
+
+def test_get_api_quotes(
+    test_client,
+    add_stocks_for_default_user,
+    mock_requests_get_success_daily,
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and default set of stocks in the database
+        and a monkeypatched version of requests.get()
+    WHEN the '/api/v1/quotes' data is requested (GET) for a held symbol
+        and a symbol that is not held
+    THEN check that the quote of the held symbol is returned with its
+        age, and that the other symbol is not retrieved from upstream
+    """
+    response = test_client.get("/api/v1/quotes?symbols=sam,QTG,sam")
+    assert response.status_code == 200
+    assert list(response.json["quotes"]) == ["SAM"]
+    quote = response.json["quotes"]["SAM"]
+    assert quote["price"] == 14834
+    assert quote["age"] >= 0
+    assert quote["source"] in ("store", "upstream")
+    assert response.json["missing"] == ["QTG"]
+    assert response.json["max_age"] >= 0
+
+
+def test_get_api_quotes_invalid_symbols(
+    test_client, confirm_email_default_user_logged_in
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+    WHEN the '/api/v1/quotes' data is requested (GET) without symbols,
+        with too many symbols or with an invalid symbol
+    THEN check that a 400 (Bad Request) error is returned
+    """
+    response = test_client.get("/api/v1/quotes")
+    assert response.status_code == 400
+    symbols = ",".join(
+        f"Q{chr(65 + i // 26)}{chr(65 + i % 26)}" for i in range(51)
+    )
+    response = test_client.get(f"/api/v1/quotes?symbols={symbols}")
+    assert response.status_code == 400
+    response = test_client.get("/api/v1/quotes?symbols=AAPL,BRK.B")
+    assert response.status_code == 400
+    assert response.json["error"] == "Invalid symbols: BRK.B."
@@ -3,11 +3,21 @@ This file contains the functional tests for the stocks blueprint.
 """
 
 
-from datetime import datetime
+import gzip
+from dataclasses import replace
+from datetime import date, datetime
 
 import pytest
 import requests
 
+from project import database
+from project.encoding import decode_dates, decode_deltas, to_cents
+from project.events import price_hub
+from project.models import DailyPrice, Stock
+from project.pages import page_cache
+from project.projections import Projection
+from project.stocks.routes import stock_rows_cache
+
 # --------------
 # Helper Classes
 # --------------
@@ -77,6 +87,30 @@ def test_about_page(test_client):
     assert b"Course developed by TestDriven.io" in response.data
 
 
+def test_index_page_cached(test_client):
+    """
+    GIVEN a Flask application
+    WHEN the "/" page is requested (GET) repeatedly, with and without
+        accepting gzip-compressed responses
+    THEN check that the page is rendered once and served from the cache
+        (compressed once if accepted)
+    """
+    response = test_client.get("/")
+    key = ("page", "project.stocks.routes", "index", "anonymous")
+    assert key in page_cache
+    page = replace(page_cache.get(key), body=b"Cached" * 100)
+    page_cache.set(key, page)
+
+    response = test_client.get("/")
+    assert response.status_code == 200
+    assert response.data == b"Cached" * 100
+    response = test_client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data) == b"Cached" * 100
+    assert list(page.compressed_bodies) == ["gzip"]
+    page_cache.clear()
+
+
 def test_get_add_stock_page_logged_in_confirmed(
     test_client, confirm_email_default_user_logged_in
 ):
@@ -336,6 +370,43 @@ def test_monkeypatch_get_failure(monkeypatch):
     assert "bad" in r.json()["error"]
 
 
+def test_get_price_stream(test_client, add_stocks_for_default_user):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+    WHEN the '/stocks/prices/stream' events are requested (GET)
+    THEN check that a stream of events (with heartbeats) is returned,
+        and that its slot is released once the stream is closed
+    """
+    response = test_client.get("/stocks/prices/stream")
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert response.data.startswith(b"retry: 5000\n\n: heartbeat\n\n")
+    response.close()
+    assert price_hub.count_subscriptions() == 0
+
+
+def test_get_price_stream_busy(
+    test_client, add_stocks_for_default_user, monkeypatch
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and every price stream of the process in use
+    WHEN the '/stocks/prices/stream' events are requested (GET)
+    THEN check that a 503 (Service Unavailable) error is returned, so
+        that the page polls the quotes instead
+    """
+    monkeypatch.setitem(
+        test_client.application.config, "PRICE_STREAM_MAX_STREAMS", 0
+    )
+    response = test_client.get("/stocks/prices/stream")
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+
 def test_get_stock_detail_page(
     test_client, add_stocks_for_default_user, mock_requests_get_success_weekly
 ):
@@ -351,6 +422,7 @@ def test_get_stock_detail_page(
     assert response.status_code == 200
     assert b"Stock Details" in response.data
     assert b"canvas id='stockChart'" in response.data
+    assert b"/stocks/3/chart.json?range=3M" in response.data
 
 
 def test_get_stock_detail_page_failed_response(
@@ -362,12 +434,15 @@ def test_get_stock_detail_page_failed_response(
         and the default set of stocks in the database
         and a monkeypatched version of requests.get()
     WHEN the '/stocks/3' page is requested (GET) and the response from Alpha Vantage failed
-    THEN check that the response is valid but the chart is not displayed
+    THEN check that the response is valid but the chart is unavailable
     """
     response = test_client.get("/stocks/3", follow_redirects=True)
     assert response.status_code == 200
     assert b"Stock Details" in response.data
-    assert b"canvas id='stockChart'" not in response.data
+    response = test_client.get("/stocks/3/chart.json")
+    assert response.status_code == 200
+    assert response.json["title"] == "Stock chart is unavailable."
+    assert response.json["dates"] == []
 
 
 def test_get_stock_detail_page_incorrect_user(
@@ -397,3 +472,735 @@ def test_get_stock_detail_page_invalid_stock(
     response = test_client.get("/stocks/234")
     assert response.status_code == 404
     assert b"Stock Details" not in response.data
+
+
+def test_get_stock_list_paginated(
+    test_client,
+    add_stocks_for_default_user,
+    mock_requests_get_success_daily,
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+        and default set of stocks in the database
+    WHEN the '/stocks' page is requested (GET) with one stock per page
+    THEN check that a single stock is displayed with a link to the next
+        page
+    """
+    test_client.application.config["STOCKS_PER_PAGE"] = 1
+    response = test_client.get("/stocks/?sort=symbol&order=desc")
+    test_client.application.config["STOCKS_PER_PAGE"] = 25
+    assert response.status_code == 200
+    assert b"List of Stocks" in response.data
+    assert b">TWTR</a>" in response.data
+    assert b">SAM</a>" not in response.data
+    assert b">COST</a>" not in response.data
+    assert b"Next Page" in response.data
+    assert b"TOTAL VALUE" in response.data
+    assert b"UNREALIZED GAIN" in response.data
+
+
+def test_get_stock_list_filtered_by_symbol(
+    test_client,
+    add_stocks_for_default_user,
+    mock_requests_get_success_daily,
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+        and default set of stocks in the database
+    WHEN the '/stocks' page is requested (GET) filtered by symbol
+    THEN check that only the matching stocks are displayed
+    """
+    response = test_client.get("/stocks/?symbol=co")
+    assert response.status_code == 200
+    assert b">COST</a>" in response.data
+    assert b">TWTR</a>" not in response.data
+    assert b"Next Page" not in response.data
+
+
+def test_get_stock_list_streamed(
+    test_client,
+    add_stocks_for_default_user,
+    mock_requests_get_success_daily,
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+        and default set of stocks in the database
+    WHEN the '/stocks' page is requested (GET)
+    THEN check that the page is streamed with the rows in the sort
+        order, followed by the totals
+    """
+    response = test_client.get("/stocks/?sort=symbol&order=asc")
+    assert response.status_code == 200
+    assert response.is_streamed
+    data = response.get_data()
+    positions = [
+        data.index(b">COST</a>"),
+        data.index(b">SAM</a>"),
+        data.index(b">TWTR</a>"),
+        data.index(b"TOTAL VALUE"),
+    ]
+    assert positions == sorted(positions)
+
+
+def test_get_stock_list_cached_rows(
+    test_client,
+    add_stocks_for_default_user,
+    mock_requests_get_success_daily,
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+        and default set of stocks in the database
+    WHEN the '/stocks' page is requested (GET) repeatedly, before and
+        after a stock is added
+    THEN check that the rows are rendered once while the lots and the
+        prices do not change, and again after the stock is added
+    """
+    # the prices are refreshed by the first request
+    test_client.get("/stocks/?sort=symbol&order=desc").get_data()
+    response = test_client.get("/stocks/?sort=symbol&order=desc")
+    rows = response.get_data().count(b"<tr data-symbol=")
+    number_of_entries = len(stock_rows_cache)
+    response = test_client.get("/stocks/?sort=symbol&order=desc")
+    assert response.get_data().count(b"<tr data-symbol=") == rows
+    assert len(stock_rows_cache) == number_of_entries
+
+    test_client.post(
+        "/add_stock",
+        data={
+            "stock_symbol": "NVDA",
+            "number_of_shares": "12",
+            "purchase_price": "150.25",
+            "purchase_date": "2021-03-04",
+        },
+        follow_redirects=True,
+    )
+    response = test_client.get("/stocks/?sort=symbol&order=desc")
+    assert b">NVDA</a>" in response.get_data()
+    assert len(stock_rows_cache) == number_of_entries + 1
+
+
+def test_get_stock_list_not_modified(
+    test_client,
+    add_stocks_for_default_user,
+    mock_requests_get_success_daily,
+    monkeypatch,
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+        and default set of stocks in the database
+    WHEN the '/stocks' page is requested (GET) again with the ETag or
+        the Last-Modified time of the previous response
+    THEN check that a 304 (Not Modified) response is returned without
+        the page, and without selecting the stocks of the page
+    """
+    # the prices are refreshed by the first request
+    test_client.get("/stocks/").get_data()
+    response = test_client.get("/stocks/")
+    assert response.status_code == 200
+    assert b"List of Stocks" in response.data
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    def get_stocks_page(*args, **kwargs):
+        raise AssertionError("The stocks of the page are selected!")
+
+    with monkeypatch.context() as m:
+        m.setattr("project.stocks.routes.get_stocks_page", get_stocks_page)
+        response = test_client.get("/stocks/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.data == b""
+        response = test_client.get(
+            "/stocks/", headers={"If-Modified-Since": last_modified}
+        )
+        assert response.status_code == 304
+
+    # a different page has a different ETag
+    response = test_client.get(
+        "/stocks/?order=desc", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert b"List of Stocks" in response.data
+
+
+def test_get_stock_list_not_modified_compressed(
+    test_client,
+    add_stocks_for_default_user,
+    mock_requests_get_success_daily,
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+        and default set of stocks in the database
+    WHEN the '/stocks' page is requested (GET) by a client that accepts
+        gzip, and again with the ETag of the compressed response
+    THEN check that a 304 (Not Modified) response is returned with the
+        same (weak) ETag
+    """
+    headers = {"Accept-Encoding": "gzip"}
+    test_client.get("/stocks/", headers=headers).get_data()
+    response = test_client.get("/stocks/", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert b"List of Stocks" in gzip.decompress(response.get_data())
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    response = test_client.get(
+        "/stocks/", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_get_stock_chart_data_not_modified(
+    test_client,
+    add_stocks_for_default_user,
+    mock_requests_get_success_daily,
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+        and default set of stocks (with stored prices) in the database
+    WHEN the '/stocks/3/chart.json' data and the '/stocks/3' page are
+        requested (GET) again with the ETag of the previous response
+    THEN check that 304 (Not Modified) responses are returned
+    """
+    test_client.get("/stocks/").get_data()
+    for url in ("/stocks/3/chart.json?range=Max", "/stocks/3"):
+        response = test_client.get(url)
+        assert response.status_code == 200
+        response = test_client.get(
+            url, headers={"If-None-Match": response.headers["ETag"]}
+        )
+        assert response.status_code == 304
+        assert response.data == b""
+
+
+def test_get_stock_chart_data_revised_close(
+    test_client,
+    add_stocks_for_default_user,
+    mock_requests_get_success_daily,
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+        and default set of stocks (with stored prices) in the database
+    WHEN the '/stocks/3/chart.json' data is requested (GET) again with
+        the ETag of the previous response, after the last close of the
+        stock is revised
+    THEN check that the revised chart is returned
+    """
+    test_client.get("/stocks/").get_data()
+    url = "/stocks/3/chart.json?range=Max"
+    response = test_client.get(url)
+    assert response.status_code == 200
+
+    with test_client.application.app_context():
+        symbol = database.session.get(Stock, 3).stock_symbol
+        last_price = (
+            DailyPrice.query.filter_by(stock_symbol=symbol)
+            .order_by(DailyPrice.date.desc())
+            .first()
+        )
+        DailyPrice.add_prices(
+            symbol,
+            [
+                (
+                    last_price.date,
+                    last_price.open,
+                    last_price.high,
+                    last_price.low,
+                    last_price.close + 1,
+                )
+            ],
+        )
+        database.session.commit()
+
+    response = test_client.get(
+        url, headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert response.status_code == 200
+
+
+def test_get_stock_list_compressed(
+    test_client,
+    add_stocks_for_default_user,
+    mock_requests_get_success_daily,
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+        and default set of stocks in the database
+    WHEN the '/stocks' page, the stocks API and the index page are
+        requested (GET) by a client that accepts gzip
+    THEN check that the streamed page, the JSON data and the (cached)
+        index page are compressed
+    """
+    headers = {"Accept-Encoding": "gzip"}
+    response = test_client.get("/stocks/", headers=headers)
+    assert response.is_streamed
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    page = gzip.decompress(response.get_data())
+    assert b"List of Stocks" in page
+    assert b"TOTAL VALUE" in page
+
+    response = test_client.get("/api/v1/stocks", headers=headers)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert b'"stocks"' in gzip.decompress(response.data)
+
+    response = test_client.get("/", headers=headers)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert b"Flask Stock Portfolio App" in gzip.decompress(response.data)
+
+
+def test_get_stock_list_invalid_sort(
+    test_client, confirm_email_default_user_logged_in
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+    WHEN the '/stocks' page is requested (GET) with an invalid sort or
+        cursor
+    THEN check that a 400 error is returned
+    """
+    response = test_client.get("/stocks/?sort=number_of_shares")
+    assert response.status_code == 400
+    response = test_client.get("/stocks/?cursor=invalid")
+    assert response.status_code == 400
+
+
+def test_get_user_profile_portfolio_summary(
+    test_client, add_stocks_for_default_user
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+        and default set of stocks in the database
+    WHEN the '/users/profile' page is requested (GET)
+    THEN check that the portfolio summary is displayed per symbol
+    """
+    response = test_client.get("/users/profile")
+    assert response.status_code == 200
+    assert b"Portfolio Summary" in response.data
+    assert b"Portfolio value: $" in response.data
+    assert b"Cost basis: $" in response.data
+    assert b"Unrealized gain: $" in response.data
+    assert b"As of" in response.data
+    assert b"<td>COST</td>" in response.data
+    assert b"<td>SAM</td>" in response.data
+    assert b"<td>TWTR</td>" in response.data
+
+
+def test_get_user_profile_positions(
+    test_client, add_stocks_for_default_user, mock_requests_get_success_daily
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+        and default set of stocks in the database (purchased repeatedly)
+    WHEN the '/users/profile' page is requested (GET)
+    THEN check that the lots are combined into one position per symbol
+    """
+    response = test_client.get("/users/profile")
+    assert response.status_code == 200
+    assert b"Average Cost" in response.data
+    assert response.data.count(b"<td>SAM</td>") == 1
+    assert b"<td>$301.23</td>" in response.data
+
+
+def test_get_portfolio_history_page(
+    test_client, confirm_email_default_user_logged_in
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+    WHEN the '/stocks/history' page is requested (GET)
+    THEN check that the chart of the portfolio history is displayed
+    """
+    response = test_client.get("/stocks/history")
+    assert response.status_code == 200
+    assert b"Portfolio Value History" in response.data
+    assert b"canvas id='historyChart'" in response.data
+
+
+def test_get_portfolio_history_data(
+    test_client, confirm_email_default_user_logged_in
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+    WHEN the '/stocks/history.json' data is requested (GET)
+    THEN check that the stored daily values are returned
+    """
+    response = test_client.get("/stocks/history.json")
+    assert response.status_code == 200
+    assert response.json["title"] == "Portfolio Value"
+    assert response.json["dates"] == []
+    assert response.json["values"] == []
+    response = test_client.get("/stocks/history.json?format=compact")
+    assert response.status_code == 200
+    assert response.json["base_date"] is None
+    assert response.json["days"] == []
+
+
+def test_get_portfolio_analytics_page(
+    test_client, confirm_email_default_user_logged_in
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+    WHEN the '/stocks/analytics' page is requested (GET)
+    THEN check that the response is valid
+    """
+    response = test_client.get("/stocks/analytics")
+    assert response.status_code == 200
+    assert b"Portfolio Analytics" in response.data
+
+
+def test_get_portfolio_diversification_page(
+    test_client, confirm_email_default_user_logged_in
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+    WHEN the '/stocks/diversification' page is requested (GET)
+    THEN check that the response is valid
+    """
+    response = test_client.get("/stocks/diversification")
+    assert response.status_code == 200
+    assert b"Portfolio Diversification" in response.data
+
+
+def test_get_portfolio_comparison_page(
+    test_client, add_stocks_for_default_user
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+    WHEN the '/stocks/compare' page is requested (GET)
+    THEN check that the held stocks and the benchmark can be selected
+    """
+    response = test_client.get("/stocks/compare?symbol=SAM&start=2022-01-03")
+    assert response.status_code == 200
+    assert b"Stock Comparison" in response.data
+    assert b'value="SAM" checked' in response.data
+    assert b'value="SPY">' in response.data
+    assert b'value="2022-01-03"' in response.data
+    assert b"/stocks/compare.json" in response.data
+
+
+def test_get_portfolio_comparison_data(
+    test_client, add_stocks_for_default_user
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+    WHEN the '/stocks/compare.json' data is requested (GET)
+    THEN check that the series are returned for the selected symbols
+    """
+    response = test_client.get("/stocks/compare.json?start=2022-01-03")
+    assert response.status_code == 200
+    assert response.json["start"] == "2022-01-03"
+    assert len(response.json["dates"]) == len(
+        next(iter(response.json["series"].values()), [])
+    )
+
+
+def test_get_portfolio_comparison_data_invalid(
+    test_client, add_stocks_for_default_user
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+    WHEN the '/stocks/compare.json' data is requested (GET) with a
+        symbol that is not held or an invalid start date
+    THEN check that a 400 (Bad Request) error is returned
+    """
+    response = test_client.get("/stocks/compare.json?symbol=MSFT")
+    assert response.status_code == 400
+    response = test_client.get("/stocks/compare.json?start=2022-13-01")
+    assert response.status_code == 400
+
+
+def test_get_portfolio_projection_page(
+    test_client, confirm_email_default_user_logged_in
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+    WHEN the '/stocks/projection' page is requested (GET)
+    THEN check that the page polls for the projection
+    """
+    response = test_client.get("/stocks/projection")
+    assert response.status_code == 200
+    assert b"Portfolio Projection" in response.data
+    assert b"/stocks/projection.json" in response.data
+
+
+def test_get_portfolio_projection_data(
+    test_client, confirm_email_default_user_logged_in, monkeypatch
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+        and a monkeypatched projection that is computed after one poll
+    WHEN the '/stocks/projection.json' data is requested (GET) twice
+    THEN check that a 202 (Accepted) status is returned while the
+        projection is pending, and then the bands of the projection
+    """
+    projection = Projection(
+        as_of=date(2022, 10, 6),
+        value=104000,
+        horizon_days=2,
+        number_of_simulations=400,
+        bands={5: [98000, 97000], 50: [104100, 104200], 95: [110000, 111000]},
+    )
+    statuses = iter([("pending", None), ("done", projection)])
+    monkeypatch.setattr(
+        "project.stocks.routes.get_projection", lambda user_id: next(statuses)
+    )
+
+    response = test_client.get("/stocks/projection.json")
+    assert response.status_code == 202
+    assert response.json == {"status": "pending"}
+
+    response = test_client.get("/stocks/projection.json")
+    assert response.status_code == 200
+    assert response.json == {
+        "status": "done",
+        "title": "Projected Portfolio Value",
+        "as_of": "2022-10-06",
+        "value": 1040.0,
+        "number_of_simulations": 400,
+        "days": [1, 2],
+        "bands": {
+            "5": [980.0, 970.0],
+            "50": [1041.0, 1042.0],
+            "95": [1100.0, 1110.0],
+        },
+    }
+
+
+def test_get_portfolio_projection_data_unavailable(
+    test_client, confirm_email_default_user_logged_in, monkeypatch
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+        and a monkeypatched projection that cannot be computed
+    WHEN the '/stocks/projection.json' data is requested (GET)
+    THEN check that the status is returned without a projection
+    """
+    monkeypatch.setattr(
+        "project.stocks.routes.get_projection",
+        lambda user_id: ("unavailable", None),
+    )
+    response = test_client.get("/stocks/projection.json")
+    assert response.status_code == 200
+    assert response.json == {"status": "unavailable"}
+
+
+def test_get_portfolio_value_as_of_page(
+    test_client, confirm_email_default_user_logged_in
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+    WHEN the '/stocks/value' page is requested (GET) for a past date
+    THEN check that the value of the portfolio on that date is displayed
+    """
+    response = test_client.get("/stocks/value?date=2000-01-03")
+    assert response.status_code == 200
+    assert b"Portfolio Value on January 03, 2000" in response.data
+    assert b"No stocks were held on this date!" in response.data
+
+
+def test_get_portfolio_value_as_of_invalid_date(
+    test_client, confirm_email_default_user_logged_in
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+    WHEN the '/stocks/value' page is requested (GET) with an invalid
+        date
+    THEN check that a 400 (Bad Request) error is returned
+    """
+    response = test_client.get("/stocks/value?date=yesterday")
+    assert response.status_code == 400
+
+
+def test_post_sell_stock_page(
+    test_client,
+    confirm_email_default_user_logged_in,
+    mock_requests_get_success_daily,
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+    WHEN the "/sell_stock" page is posted to (POST) after adding a stock
+    THEN check that the sale and its realized gain are displayed
+    """
+    test_client.post(
+        "/add_stock",
+        data={
+            "stock_symbol": "ZSEL",
+            "number_of_shares": "10",
+            "purchase_price": "10.00",
+            "purchase_date": "2022-01-03",
+        },
+    )
+    response = test_client.post(
+        "/sell_stock",
+        data={
+            "stock_symbol": "ZSEL",
+            "number_of_shares": "4",
+            "sale_price": "12.00",
+            "sale_date": "2022-02-01",
+            "lot_matching_method": "fifo",
+        },
+        follow_redirects=True,
+    )
+    assert response.status_code == 200
+    assert b"List of Stocks" in response.data
+    assert b"Sold 4 shares of ZSEL (realized gain: $8.00)!" in response.data
+
+
+def test_post_sell_stock_page_too_many_shares(
+    test_client, confirm_email_default_user_logged_in
+):
+    """
+    GIVEN a Flask application configured for testing
+        and user (confirmed) is logged in
+    WHEN the "/sell_stock" page is posted to (POST) with more shares
+        than are held
+    THEN check that an error message is displayed
+    """
+    response = test_client.post(
+        "/sell_stock",
+        data={
+            "stock_symbol": "ZNONE",
+            "number_of_shares": "4",
+            "sale_price": "12.00",
+            "sale_date": "2022-02-01",
+        },
+    )
+    assert response.status_code == 200
+    assert b"Sell a Stock" in response.data
+    assert b"Only 0 shares of ZNONE are held!" in response.data
+
+
+def test_get_stock_detail_page_ranges(
+    test_client, add_stocks_for_default_user, mock_requests_get_success_weekly
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+    WHEN the '/stocks/3' page is requested (GET) for a range
+    THEN check that the range is selected and the other ranges are links
+    """
+    response = test_client.get("/stocks/3?range=1Y&indicator=sma20")
+    assert response.status_code == 200
+    assert b"<strong>1Y</strong>" in response.data
+    assert b"/stocks/3?range=Max&amp;indicator=sma20" in response.data
+    assert b'value="sma20" checked' in response.data
+
+
+def test_get_stock_chart_data(
+    test_client, add_stocks_for_default_user, mock_requests_get_success_weekly
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+        and a monkeypatched version of requests.get()
+    WHEN the '/stocks/3/chart.json' data is requested (GET)
+    THEN check that the dates and the prices of the chart are returned
+    """
+    response = test_client.get("/stocks/3/chart.json?points=3")
+    assert response.status_code == 200
+    assert response.json["title"].startswith("Weekly Prices")
+    assert len(response.json["dates"]) == len(response.json["values"]) <= 3
+    assert response.json["overlays"] == []
+
+
+def test_get_stock_chart_data_compact(
+    test_client, add_stocks_for_default_user, mock_requests_get_success_weekly
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+        and a monkeypatched version of requests.get()
+    WHEN the '/stocks/3/chart.json' data is requested (GET) in the
+        compact format
+    THEN check that the same dates and prices are returned encoded
+    """
+    response = test_client.get("/stocks/3/chart.json")
+    compact_response = test_client.get("/stocks/3/chart.json?format=compact")
+    assert compact_response.status_code == 200
+    assert compact_response.json["format"] == "compact"
+    assert (
+        decode_dates(
+            compact_response.json["base_date"], compact_response.json["days"]
+        )
+        == response.json["dates"]
+    )
+    assert decode_deltas(compact_response.json["values"]) == to_cents(
+        response.json["values"]
+    )
+
+
+def test_get_stock_chart_data_invalid_points(
+    test_client, add_stocks_for_default_user
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+    WHEN the '/stocks/3/chart.json' data is requested (GET) with too few
+        points
+    THEN check that a 400 (Bad Request) error is returned
+    """
+    response = test_client.get("/stocks/3/chart.json?points=2")
+    assert response.status_code == 400
+
+
+def test_get_stock_detail_page_invalid_range(
+    test_client, add_stocks_for_default_user
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+    WHEN the '/stocks/3' page is requested (GET) with an invalid range
+    THEN check that a 400 (Bad Request) error is returned
+    """
+    response = test_client.get("/stocks/3?range=2W")
+    assert response.status_code == 400
+
+
+def test_get_stock_detail_page_invalid_indicator(
+    test_client, add_stocks_for_default_user
+):
+    """
+    GIVEN a Flask application configured for testing
+        with the default user signed in (confirmed)
+        and the default set of stocks in the database
+    WHEN the '/stocks/3' page is requested (GET) with an invalid
+        indicator
+    THEN check that a 400 (Bad Request) error is returned
+    """
+    response = test_client.get("/stocks/3?indicator=macd")
+    assert response.status_code == 400
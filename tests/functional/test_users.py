@@ -258,6 +258,8 @@ def test_user_profile_logged_in(test_client, log_in_default_user):
     assert b"Joined on" in response.data
     assert b"Email address has not been confirmed!" in response.data
     assert b"Email address confirmed on" not in response.data
+    assert b"Portfolio Summary" in response.data
+    assert b"No stocks have been added to the portfolio!" in response.data
     assert b"Account Actions" in response.data
     assert b"Change Password" in response.data
     assert b"Resend Email Confirmation" in response.data
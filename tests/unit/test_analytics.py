@@ -0,0 +1,202 @@
+"""
+This file contains the unit tests for analytics.py.
+"""
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from project import database
+from project.analytics import (
+    compute_beta,
+    compute_correlation_matrix,
+    compute_max_drawdown,
+    compute_portfolio_analytics,
+    compute_returns,
+    compute_volatility,
+    get_correlation_matrix,
+    get_portfolio_analytics,
+)
+from project.models import DailyPrice, Stock
+
+
+def test_compute_returns():
+    """
+    GIVEN the daily prices of two stocks (one without a price at first)
+    WHEN the daily returns are computed
+    THEN check the returns of each stock
+    """
+    prices = np.array([[100.0, 0.0], [110.0, 50.0], [99.0, 55.0]])
+    returns = compute_returns(prices)
+    assert returns[:, 0] == pytest.approx([0.1, -0.1])
+    assert returns[:, 1] == pytest.approx([0.0, 0.1])
+
+
+def test_compute_max_drawdown():
+    """
+    GIVEN the daily prices of two stocks
+    WHEN the maximum drawdown is computed
+    THEN check the largest fall from a previous peak of each stock
+    """
+    prices = np.array([[100.0, 10.0], [120.0, 11.0], [90.0, 12.0]])
+    assert compute_max_drawdown(prices) == pytest.approx([0.25, 0.0])
+
+
+def test_compute_volatility_and_beta():
+    """
+    GIVEN the daily returns of two stocks and a benchmark
+    WHEN the volatility and beta are computed
+    THEN check that the stock moving twice as much has twice the beta
+    """
+    benchmark_returns = np.array([0.01, -0.02, 0.015, 0.0, -0.005])
+    returns = np.column_stack([benchmark_returns, 2 * benchmark_returns])
+    valid = np.ones(returns.shape, dtype=bool)
+
+    volatilities = compute_volatility(returns, valid)
+    assert volatilities[0] == pytest.approx(
+        np.std(benchmark_returns, ddof=1) * np.sqrt(252)
+    )
+    assert volatilities[1] == pytest.approx(2 * volatilities[0])
+    assert compute_beta(returns, benchmark_returns, valid) == pytest.approx(
+        [1.0, 2.0]
+    )
+
+
+def test_compute_portfolio_analytics():
+    """
+    GIVEN the lots of a portfolio and the daily closes of its stocks
+    WHEN the analytics of the portfolio are computed
+    THEN check the statistics of each holding and of the portfolio
+    """
+    dates = np.array(
+        ["2022-03-01", "2022-03-02", "2022-03-03"], dtype="datetime64[D]"
+    )
+    # closes of AAA, BBB and the benchmark (last column)
+    closes = np.array([[100, 200, 1000], [110, 200, 1100], [132, 180, 1320]])
+    lots = [
+        ("AAA", datetime(2022, 3, 1), 10),
+        ("BBB", datetime(2022, 3, 2), 5),
+    ]
+    cost_bases = {"AAA": 10 * 100, "BBB": 5 * 200}
+    analytics = compute_portfolio_analytics(
+        lots, cost_bases, ["AAA", "BBB"], "SPY", dates, closes
+    )
+    assert analytics.as_of == date(2022, 3, 3)
+    assert analytics.value == 10 * 132 + 5 * 180
+    assert analytics.cost_basis == 10 * 100 + 5 * 200
+    assert analytics.total_return == pytest.approx(2220 / 2000 - 1)
+    assert analytics.max_drawdown == pytest.approx(0.0)
+
+    aaa, bbb = analytics.holdings
+    assert aaa.total_return == pytest.approx(0.32)
+    assert aaa.beta == pytest.approx(1.0)
+    assert aaa.max_drawdown == pytest.approx(0.0)
+    assert bbb.total_return == pytest.approx(-0.1)
+    assert bbb.max_drawdown == pytest.approx(0.1)
+    # a single daily return is not enough for the volatility or beta
+    assert bbb.volatility is None
+    assert bbb.beta is None
+
+
+def test_get_portfolio_analytics_cached(test_client, app_context):
+    """
+    GIVEN the lots of a user and the daily prices stored in the database
+    WHEN the analytics of the portfolio are requested twice
+    THEN check that they are computed once, and again after a purchase
+    """
+    database.session.add(Stock("AAX", "10", "1.00", 91, datetime(2022, 7, 1)))
+    for day, close in [(1, 100), (5, 110), (6, 105), (7, 120)]:
+        prices = [(date(2022, 7, day), close, close, close, close)]
+        DailyPrice.add_prices("AAX", prices)
+        DailyPrice.add_prices("SPY", prices)
+    database.session.commit()
+
+    analytics = get_portfolio_analytics(91)
+    assert analytics.value == 1200
+    assert analytics.beta == pytest.approx(1.0)
+    assert get_portfolio_analytics(91) is analytics
+
+    database.session.add(Stock("AAX", "5", "1.00", 91, datetime(2022, 7, 6)))
+    database.session.commit()
+    assert get_portfolio_analytics(91).value == 1800
+    assert get_portfolio_analytics(12345) is None
+
+
+def test_get_portfolio_analytics_benchmark_held(test_client, app_context):
+    """
+    GIVEN the lots of a user holding the benchmark (SPY) and another
+        stock, and the daily prices stored in the database
+    WHEN the analytics of the portfolio are requested
+    THEN check that the benchmark is valued like any other holding and
+        that it has a beta of 1
+    """
+    database.session.add(Stock("SPY", "2", "1.00", 79, datetime(2022, 9, 1)))
+    database.session.add(Stock("ABH", "1", "1.00", 79, datetime(2022, 9, 1)))
+    for day, close in [(1, 100), (2, 110), (6, 105), (7, 120)]:
+        prices = [(date(2022, 9, day), close, close, close, close)]
+        DailyPrice.add_prices("SPY", prices)
+        prices = [(date(2022, 9, day), 2 * close, 0, 0, 2 * close)]
+        DailyPrice.add_prices("ABH", prices)
+    database.session.commit()
+
+    analytics = get_portfolio_analytics(79)
+    abh, spy = analytics.holdings
+    assert spy.value == 240
+    assert spy.total_return == pytest.approx(0.2)
+    assert spy.beta == pytest.approx(1.0)
+    assert abh.beta == pytest.approx(1.0)
+    assert analytics.value == 240 + 240
+    assert analytics.beta == pytest.approx(1.0)
+
+
+def test_compute_correlation_matrix():
+    """
+    GIVEN the daily closes of three stocks (two without a close at
+        first)
+    WHEN the correlation matrix is computed
+    THEN check that each pair of stocks uses the days on which both
+        stocks have a close
+    """
+    closes = np.array(
+        [
+            [100, 200, 0, 0],
+            [110, 180, 50, 0],
+            [99, 198, 55, 0],
+            [108, 180, 60, 30],
+            [102, 190, 54, 33],
+        ]
+    )
+    correlations = compute_correlation_matrix(closes)
+    assert correlations.shape == (4, 4)
+    assert np.diag(correlations)[:3] == pytest.approx([1.0, 1.0, 1.0])
+    assert correlations[0, 1] == pytest.approx(-1.0)
+    assert correlations == pytest.approx(correlations.T, nan_ok=True)
+    assert correlations[0, 2] == pytest.approx(
+        np.corrcoef(
+            compute_returns(closes[1:, 0].astype(float)),
+            compute_returns(closes[1:, 2].astype(float)),
+        )[0, 1]
+    )
+    # a single common daily return is not enough for a correlation
+    assert np.isnan(correlations[:, 3]).all()
+
+
+def test_get_correlation_matrix_shared(test_client, app_context):
+    """
+    GIVEN the daily prices of two stocks stored in the database
+    WHEN the correlation matrix is requested for the same symbols twice
+    THEN check that it is computed once and shared
+    """
+    for day, close in [(1, 100), (2, 110), (3, 99), (4, 120)]:
+        prices = [(date(2022, 8, day), close, close, close, close)]
+        DailyPrice.add_prices("CRA", prices)
+        prices = [(date(2022, 8, day), 2 * close, 0, 0, 2 * close)]
+        DailyPrice.add_prices("CRB", prices)
+    database.session.commit()
+
+    correlation_matrix = get_correlation_matrix(["CRB", "CRA"])
+    assert correlation_matrix.as_of == date(2022, 8, 4)
+    assert correlation_matrix.symbols == ["CRA", "CRB"]
+    assert correlation_matrix.correlations[0][1] == pytest.approx(1.0)
+    assert get_correlation_matrix(["CRA", "CRB"]) is correlation_matrix
+    assert get_correlation_matrix(["CRX", "CRY"]) is None
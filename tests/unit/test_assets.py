@@ -0,0 +1,53 @@
+"""
+This file contains the unit tests for assets.py.
+"""
+import gzip
+
+from flask import url_for
+
+from project.assets import fingerprint_filename
+
+
+def test_fingerprint_filename():
+    """
+    GIVEN the name of a static file and its digest
+    WHEN the fingerprinted name is created
+    THEN check that the digest is added before the extension
+    """
+    assert (
+        fingerprint_filename("css/base_style.css", "0123456789")
+        == "css/base_style.0123456789.css"
+    )
+    assert fingerprint_filename("vendor/Chart.min.js", "abc") == (
+        "vendor/Chart.min.abc.js"
+    )
+
+
+def test_static_asset_response(test_client):
+    """
+    GIVEN a Flask application configured for testing
+    WHEN the fingerprinted URL of a stylesheet is requested (GET)
+    THEN check that the precompressed stylesheet is returned as
+        immutable, and that the original name is still served
+    """
+    with test_client.application.test_request_context():
+        url = url_for("static", filename="css/base_style.css")
+    assert url.startswith("/static/css/base_style.")
+    assert url != "/static/css/base_style.css"
+
+    response = test_client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "immutable" in response.headers["Cache-Control"]
+    original = test_client.get("/static/css/base_style.css")
+    assert gzip.decompress(response.data) == original.data
+    original.close()
+
+    response = test_client.get(
+        url,
+        headers={
+            "Accept-Encoding": "gzip",
+            "If-None-Match": response.headers["ETag"],
+        },
+    )
+    assert response.status_code == 304
@@ -0,0 +1,207 @@
+"""
+This file contains the unit tests for charts.py (and the price rollups).
+"""
+from datetime import date
+
+import numpy as np
+
+from project import database
+from project.charts import (
+    downsample_lttb,
+    get_chart_series,
+    get_comparison_chart,
+    get_price_bars,
+    get_price_chart_data,
+    normalize_closes,
+)
+from project.models import DailyPrice, MonthlyPrice, WeeklyPrice
+
+
+def test_price_rollups_updated_incrementally(test_client, app_context):
+    """
+    GIVEN daily prices stored for a stock over two weeks
+    WHEN new (and changed) daily prices are added
+    THEN check that only the weekly and monthly rollups of their periods
+        are updated
+    """
+    DailyPrice.add_prices(
+        "RLA",
+        [
+            (date(2022, 8, 29), 100, 110, 95, 105),
+            (date(2022, 8, 31), 105, 120, 100, 115),
+            (date(2022, 9, 1), 115, 116, 90, 92),
+        ],
+    )
+    database.session.commit()
+
+    week = WeeklyPrice.query.filter_by(stock_symbol="RLA").one()
+    assert week.period_start == date(2022, 8, 29)
+    assert (week.open, week.high, week.low, week.close) == (100, 120, 90, 92)
+    assert week.last_date == date(2022, 9, 1)
+    august, september = MonthlyPrice.query.filter_by(
+        stock_symbol="RLA"
+    ).order_by(MonthlyPrice.period_start)
+    assert (august.open, august.high, august.low, august.close) == (
+        100,
+        120,
+        95,
+        115,
+    )
+    assert september.period_start == date(2022, 9, 1)
+
+    # the close of Sep 1 changes and a bar of the next week arrives
+    DailyPrice.add_prices(
+        "RLA",
+        [
+            (date(2022, 9, 1), 115, 116, 90, 95),
+            (date(2022, 9, 6), 95, 99, 94, 98),
+        ],
+    )
+    database.session.commit()
+
+    weeks = WeeklyPrice.query.filter_by(stock_symbol="RLA").order_by(
+        WeeklyPrice.period_start
+    )
+    assert [(week.period_start, week.close) for week in weeks] == [
+        (date(2022, 8, 29), 95),
+        (date(2022, 9, 5), 98),
+    ]
+    database.session.refresh(september)
+    assert (september.open, september.close) == (115, 98)
+    assert september.last_date == date(2022, 9, 6)
+
+
+def test_get_price_chart_data(test_client, app_context):
+    """
+    GIVEN daily prices stored for a stock over two years
+    WHEN the chart data is requested for several ranges
+    THEN check that the daily, weekly or monthly bars of the range are
+        used
+    """
+    DailyPrice.add_prices(
+        "RLB",
+        [
+            (date(2021, 1, 4), 100, 100, 100, 100),
+            (date(2022, 6, 1), 200, 200, 200, 200),
+            (date(2022, 12, 1), 250, 250, 250, 250),
+            (date(2022, 12, 14), 300, 300, 300, 300),
+            (date(2022, 12, 15), 310, 310, 310, 310),
+        ],
+    )
+    database.session.commit()
+    today = date(2022, 12, 31)
+
+    title, labels, values = get_price_chart_data("RLB", "1M", today)
+    assert title == "RLB (1M, daily closes)"
+    assert labels == [
+        date(2022, 12, 1),
+        date(2022, 12, 14),
+        date(2022, 12, 15),
+    ]
+    assert values == [2.5, 3.0, 3.1]
+
+    title, labels, values = get_price_chart_data("RLB", "1Y", today)
+    assert title == "RLB (1Y, weekly closes)"
+    assert labels == [date(2022, 6, 1), date(2022, 12, 1), date(2022, 12, 15)]
+    assert values == [2.0, 2.5, 3.1]
+
+    assert len(get_price_bars("RLB", "Max", today)) == 3
+    assert get_price_chart_data("RLB", "1M", date(2023, 6, 1)) is None
+
+
+def test_normalize_closes():
+    """
+    GIVEN closes of two symbols, one without a close on the first day
+    WHEN the closes are normalized
+    THEN check that each symbol starts at 100 on its first close
+    """
+    normalized = normalize_closes(np.array([[200, 0], [300, 50], [100, 75]]))
+    assert np.isnan(normalized[0, 1])
+    assert normalized[:, 0].tolist() == [100.0, 150.0, 50.0]
+    assert normalized[1:, 1].tolist() == [100.0, 150.0]
+
+
+def test_get_comparison_chart(test_client, app_context):
+    """
+    GIVEN daily prices stored for two stocks on different days
+    WHEN the comparison chart of the stocks is requested from a date
+    THEN check that the series are aligned (with the previous close on
+        the missing days) and normalized to 100 at the start date
+    """
+    DailyPrice.add_prices(
+        "CMA",
+        [
+            (date(2022, 3, 1), 100, 100, 100, 100),
+            (date(2022, 3, 2), 110, 110, 110, 110),
+            (date(2022, 3, 4), 120, 120, 120, 120),
+        ],
+    )
+    DailyPrice.add_prices(
+        "CMB",
+        [
+            (date(2022, 3, 2), 40, 40, 40, 40),
+            (date(2022, 3, 3), 50, 50, 50, 50),
+        ],
+    )
+    database.session.commit()
+
+    comparison = get_comparison_chart(["CMB", "CMA"], date(2022, 3, 2))
+    assert comparison.dates == ["2022-03-02", "2022-03-03", "2022-03-04"]
+    assert comparison.series == {
+        "CMA": [100.0, 100.0, 109.09],
+        "CMB": [100.0, 125.0, 125.0],
+    }
+    assert get_comparison_chart(["CMA", "CMB"], date(2022, 3, 2)) is (
+        comparison
+    )
+    assert get_comparison_chart(["CMA"], date(2022, 3, 5)) is None
+
+
+def test_downsample_lttb():
+    """
+    GIVEN a long series of values with a spike
+    WHEN the series is downsampled with LTTB
+    THEN check that the first and last values and the spike are kept
+    """
+    values = np.zeros(1000)
+    values[500] = 10.0
+    indexes = downsample_lttb(values, 20)
+    assert len(indexes) == 20
+    assert indexes[0] == 0 and indexes[-1] == 999
+    assert 500 in indexes
+    assert (np.diff(indexes) > 0).all()
+    assert downsample_lttb(values[:10], 20).tolist() == list(range(10))
+
+
+def test_get_chart_series(test_client, app_context):
+    """
+    GIVEN daily prices stored for a stock
+    WHEN the chart of the stock is requested with fewer points than bars
+    THEN check that the chart is downsampled and cached until the last
+        bar is revised or a new bar is stored
+    """
+    DailyPrice.add_prices(
+        "CSA",
+        [
+            (date(2022, 5, day), 100 * day, 100 * day, 100 * day, 100 * day)
+            for day in range(2, 30)
+        ],
+    )
+    database.session.commit()
+
+    today = date(2022, 5, 31)
+    series = get_chart_series("CSA", "1M", 5, today)
+    assert series.number_of_bars == 28
+    assert series.dates[0] == "2022-05-02" and series.dates[-1] == "2022-05-29"
+    assert series.values[-1] == 29.0
+    assert len(series.values) == len(series.indexes) == 5
+    assert get_chart_series("CSA", "1M", 5, today) is series
+
+    DailyPrice.add_prices("CSA", [(date(2022, 5, 29), 2, 2, 2, 2)])
+    database.session.commit()
+    assert get_chart_series("CSA", "1M", 5, today).values[-1] == 0.02
+
+    DailyPrice.add_prices("CSA", [(date(2022, 5, 30), 1, 1, 1, 1)])
+    database.session.commit()
+    assert get_chart_series("CSA", "1M", 5, today).values[-1] == 0.01
+    assert get_chart_series("CSB", "1M", 5, today) is None
@@ -0,0 +1,25 @@
+"""
+This file contains the unit tests for compression.py.
+"""
+import gzip
+
+from project.compression import GzipCompressor, compress_chunks
+
+
+def test_compress_chunks():
+    """
+    GIVEN the chunks of a streamed body
+    WHEN the chunks are compressed with gzip
+    THEN check that each chunk can be decompressed as soon as it is
+        sent, and that the whole body is a valid gzip stream
+    """
+    chunks = ["<tr>" + "<td>SAM</td>" * 20 + "</tr>", b"", b"</table>"]
+    compressed = list(compress_chunks(chunks, GzipCompressor(6)))
+    assert len(compressed) == 3
+
+    # the first chunk is flushed (complete) before the next one is sent
+    decompressor = gzip.zlib.decompressobj(31)
+    assert decompressor.decompress(compressed[0]) == chunks[0].encode()
+    assert gzip.decompress(b"".join(compressed)) == (
+        chunks[0].encode() + b"</table>"
+    )
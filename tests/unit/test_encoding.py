@@ -0,0 +1,69 @@
+"""
+This file contains the unit tests for encoding.py.
+"""
+import gzip
+import json
+from datetime import date, timedelta
+
+from flask import current_app
+
+from project.compression import compress_response
+from project.encoding import (
+    decode_dates,
+    decode_deltas,
+    encode_dates,
+    encode_deltas,
+    encode_series,
+    json_response,
+    to_cents,
+)
+
+
+def test_encode_deltas():
+    """
+    GIVEN integer values (with a missing value)
+    WHEN the values are delta-encoded and decoded
+    THEN check that each delta is relative to the previous value
+    """
+    values = [10023, 10011, None, 10150, 10150]
+    assert encode_deltas(values) == [10023, -12, None, 139, 0]
+    assert decode_deltas(encode_deltas(values)) == values
+    assert to_cents([100.23, None, 0.1]) == [10023, None, 10]
+
+
+def test_encode_dates():
+    """
+    GIVEN trading days (as ISO dates)
+    WHEN the dates are encoded and decoded
+    THEN check that they are encoded as the days since the previous date
+    """
+    dates = ["2022-12-29", "2022-12-30", "2023-01-03"]
+    assert encode_dates(dates) == ("2022-12-29", [0, 1, 4])
+    assert decode_dates(*encode_dates(dates)) == dates
+    assert encode_dates([]) == (None, [])
+    assert decode_dates(None, []) == []
+
+
+def test_compact_json_response_compressed(test_client, app_context):
+    """
+    GIVEN a long series encoded in the compact format
+    WHEN the JSON response is created (and compressed) for a client
+        accepting gzip
+    THEN check that the body is gzip-compressed and much smaller than
+        the regular JSON
+    """
+    # five years of weekdays, with a close that moves a few cents a day
+    days = [date(2018, 1, 1) + timedelta(days=day) for day in range(1826)]
+    dates = [day.isoformat() for day in days if day.weekday() < 5]
+    values = [100.0 + (index % 7) * 0.03 for index in range(len(dates))]
+    payload = encode_series(dates, to_cents(values))
+    with current_app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = compress_response(json_response(payload))
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    body = gzip.decompress(response.get_data())
+    assert json.loads(body) == payload
+    assert len(response.get_data()) * 5 < len(
+        json.dumps({"dates": dates, "values": values})
+    )
@@ -0,0 +1,111 @@
+"""
+This file contains the unit tests for events.py.
+"""
+from datetime import date
+
+from project import database
+from project.events import (
+    PriceHub,
+    PriceUpdate,
+    price_hub,
+    stream_price_updates,
+)
+from project.prices import publish_prices, refresh_symbol_prices
+
+
+def test_price_hub_publish():
+    """
+    GIVEN a hub with subscriptions to different symbols
+    WHEN price updates are published
+    THEN check that each update is pushed once to the subscriptions of
+        its symbol, and the oldest update is dropped from a full queue
+    """
+    hub = PriceHub()
+    first = hub.subscribe({"EVA", "EVB"}, max_queued_updates=2)
+    second = hub.subscribe({"EVA"}, max_queued_updates=2)
+    assert hub.get_symbols() == {"EVA", "EVB"}
+
+    assert hub.publish(PriceUpdate("EVA", 100, date(2022, 1, 3))) == 2
+    assert hub.publish(PriceUpdate("EVA", 100, date(2022, 1, 3))) == 0
+    assert hub.publish(PriceUpdate("EVB", 200, date(2022, 1, 3))) == 1
+    assert hub.publish(PriceUpdate("EVB", 201, date(2022, 1, 4))) == 1
+    assert [first.updates.get_nowait().price for _ in range(2)] == [200, 201]
+    assert second.updates.get_nowait().price == 100
+
+    hub.unsubscribe(first)
+    hub.unsubscribe(second)
+    assert hub.get_symbols() == set()
+
+
+def test_price_hub_max_subscriptions():
+    """
+    GIVEN a hub with a maximum number of subscriptions
+    WHEN more subscriptions are requested than the maximum, and one is
+        removed twice
+    THEN check that the extra subscriptions are refused until one is
+        removed, and that it is only counted once
+    """
+    hub = PriceHub()
+    first = hub.subscribe({"EVE"}, max_subscriptions=2)
+    second = hub.subscribe({"EVF"}, max_subscriptions=2)
+    assert hub.subscribe({"EVG"}, max_subscriptions=2) is None
+    assert hub.count_subscriptions() == 2
+    assert hub.get_symbols() == {"EVE", "EVF"}
+
+    hub.unsubscribe(first)
+    hub.unsubscribe(first)
+    assert hub.count_subscriptions() == 1
+    third = hub.subscribe({"EVG"}, max_subscriptions=2)
+    assert third is not None
+    assert hub.subscribe({"EVG"}, max_subscriptions=2) is None
+    hub.unsubscribe(second)
+    hub.unsubscribe(third)
+    assert hub.count_subscriptions() == 0
+
+
+def test_stream_price_updates():
+    """
+    GIVEN a stream of the price updates of a symbol
+    WHEN an update is published, and when no update is published
+    THEN check that the update is sent as an event, followed by a
+        heartbeat, and the subscription is removed when the stream is
+        closed
+    """
+    hub = PriceHub()
+    subscription = hub.subscribe({"EVC"}, max_queued_updates=10)
+    stream = stream_price_updates(subscription, 0.01, 60, hub)
+    assert next(stream) == "retry: 5000\n\n"
+    assert hub.count_subscriptions() == 1
+    hub.publish(PriceUpdate("EVC", 12345, date(2022, 1, 3)))
+    assert next(stream) == (
+        "event: price\n"
+        'data: {"stock_symbol": "EVC", "price": 12345, '
+        '"price_date": "2022-01-03"}\n\n'
+    )
+    assert next(stream) == ": heartbeat\n\n"
+    stream.close()
+    assert hub.get_symbols() == set()
+    assert hub.count_subscriptions() == 0
+
+
+def test_publish_prices(
+    test_client, app_context, mock_requests_get_success_daily
+):
+    """
+    GIVEN a subscription to the price updates of a symbol
+        and a monkeypatched version of requests.get()
+    WHEN the price of the symbol is refreshed, and then published once
+        it is committed
+    THEN check that the new price is only pushed to the subscription
+        when it is published
+    """
+    subscription = price_hub.subscribe({"EVD"})
+    try:
+        latest_prices = refresh_symbol_prices(["EVD"])
+        assert subscription.updates.empty()
+        database.session.commit()
+        publish_prices(latest_prices)
+        update = subscription.updates.get_nowait()
+        assert (update.stock_symbol, update.price) == ("EVD", 14834)
+    finally:
+        price_hub.unsubscribe(subscription)
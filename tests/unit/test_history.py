@@ -0,0 +1,191 @@
+"""
+This file contains the unit tests for history.py.
+"""
+from datetime import date, datetime
+
+import numpy as np
+
+from project import database
+from project.history import (
+    compute_portfolio_values,
+    get_portfolio_history,
+    get_portfolio_value_as_of,
+    invalidate_portfolio_history,
+    load_close_prices,
+    update_portfolio_history,
+)
+from project.ledger import record_buy, record_sell
+from project.models import DailyPrice, Stock
+
+
+def add_daily_prices(symbol, closes):
+    # helper to store daily prices (as {date: close in cents})
+    DailyPrice.add_prices(
+        symbol,
+        [(day, close, close, close, close) for day, close in closes.items()],
+    )
+    database.session.commit()
+
+
+def test_compute_portfolio_values():
+    """
+    GIVEN the daily closes of two stocks
+    WHEN the values of a portfolio with three lots are computed
+    THEN check that each lot counts from its purchase date onwards
+    """
+    dates = np.array(
+        ["2022-03-01", "2022-03-02", "2022-03-03", "2022-03-04"],
+        dtype="datetime64[D]",
+    )
+    closes = np.array([[100, 1000], [110, 1000], [120, 900], [130, 950]])
+    lots = [
+        ("AAA", datetime(2022, 2, 20), 10),
+        ("BBB", datetime(2022, 3, 3), 2),
+        ("AAA", datetime(2022, 3, 4), 5),
+        ("BBB", datetime(2022, 3, 8), 100),  # purchased after the last date
+    ]
+    values = compute_portfolio_values(lots, ["AAA", "BBB"], dates, closes)
+    assert values.tolist() == [1000, 1100, 1200 + 1800, 15 * 130 + 1900]
+
+
+def test_load_close_prices(test_client, app_context):
+    """
+    GIVEN daily prices with gaps stored in the database
+    WHEN the closes are loaded from a start date
+    THEN check that the gaps are filled with the previous close
+    """
+    add_daily_prices("FFA", {date(2022, 4, 1): 500, date(2022, 4, 5): 520})
+    add_daily_prices("FFB", {date(2022, 4, 4): 70, date(2022, 4, 6): 75})
+
+    dates, closes = load_close_prices(
+        ["FFA", "FFB"], date(2022, 4, 4), date(2022, 4, 30)
+    )
+    assert dates.tolist() == [
+        date(2022, 4, 4),
+        date(2022, 4, 5),
+        date(2022, 4, 6),
+    ]
+    assert closes.tolist() == [[500, 70], [520, 70], [520, 75]]
+
+
+def test_update_portfolio_history_incremental(test_client, app_context):
+    """
+    GIVEN lots of a user and the daily prices stored in the database
+    WHEN the portfolio history is updated, and updated again after
+        new daily prices are stored
+    THEN check that only the new days are added to the history
+    """
+    database.session.add(Stock("HHA", "10", "1.00", 93, datetime(2022, 5, 2)))
+    database.session.add(Stock("HHB", "4", "2.00", 93, datetime(2022, 5, 3)))
+    database.session.commit()
+    add_daily_prices("HHA", {date(2022, 5, 2): 100, date(2022, 5, 3): 110})
+    add_daily_prices("HHB", {date(2022, 5, 3): 200})
+
+    assert update_portfolio_history(93, date(2022, 5, 3)) == 2
+    database.session.commit()
+    assert get_portfolio_history(93) == (
+        [date(2022, 5, 2), date(2022, 5, 3)],
+        [1000, 1100 + 800],
+    )
+
+    add_daily_prices("HHA", {date(2022, 5, 4): 120})
+    add_daily_prices("HHB", {date(2022, 5, 5): 250})
+    assert update_portfolio_history(93, date(2022, 5, 5)) == 2
+    assert update_portfolio_history(93, date(2022, 5, 5)) == 0
+    database.session.commit()
+    dates, values = get_portfolio_history(93)
+    assert dates[2:] == [date(2022, 5, 4), date(2022, 5, 5)]
+    assert values[2:] == [1200 + 800, 1200 + 1000]
+
+
+def test_update_portfolio_history_late_close(test_client, app_context):
+    """
+    GIVEN a stored portfolio history with a forward-filled close
+    WHEN the missing close arrives (late) and the history is updated
+    THEN check that the values from that day onwards are computed again
+    """
+    database.session.add(Stock("LCA", "2", "1.00", 80, datetime(2022, 8, 1)))
+    database.session.add(Stock("LCB", "1", "1.00", 80, datetime(2022, 8, 1)))
+    add_daily_prices("LCA", {date(2022, 8, 1): 10, date(2022, 8, 2): 20})
+    add_daily_prices("LCB", {date(2022, 8, 1): 5, date(2022, 8, 3): 7})
+    assert update_portfolio_history(80, date(2022, 8, 3)) == 3
+    database.session.commit()
+    assert get_portfolio_history(80)[1] == [25, 45, 47]
+
+    add_daily_prices("LCA", {date(2022, 8, 3): 30})
+    assert update_portfolio_history(80, date(2022, 8, 3)) == 1
+    add_daily_prices("LCB", {date(2022, 8, 2): 6})
+    assert update_portfolio_history(80, date(2022, 8, 3)) == 2
+    database.session.commit()
+    assert get_portfolio_history(80)[1] == [25, 46, 67]
+
+
+def test_invalidate_portfolio_history(test_client, app_context):
+    """
+    GIVEN a stored portfolio history
+    WHEN a lot purchased in the past is added
+    THEN check that the history is computed again from its purchase date
+    """
+    database.session.add(Stock("IIA", "1", "1.00", 92, datetime(2022, 6, 1)))
+    add_daily_prices("IIA", {date(2022, 6, 1): 10, date(2022, 6, 2): 20})
+    assert update_portfolio_history(92, date(2022, 6, 2)) == 2
+
+    database.session.add(Stock("IIA", "1", "1.00", 92, datetime(2022, 6, 2)))
+    invalidate_portfolio_history(92, datetime(2022, 6, 2))
+    assert update_portfolio_history(92, date(2022, 6, 2)) == 1
+    database.session.commit()
+    assert get_portfolio_history(92)[1] == [10, 40]
+
+
+def test_update_portfolio_history_sale(test_client, app_context):
+    """
+    GIVEN a lot recorded as a buy and a later sale of some of its shares
+    WHEN the history of the portfolio is computed
+    THEN check that the purchased shares are held until the sale date
+        and that only the remaining shares are held afterwards
+    """
+    record_buy(Stock("SLA", "10", "1.00", 77, datetime(2022, 10, 3)))
+    add_daily_prices(
+        "SLA",
+        {
+            date(2022, 10, 3): 100,
+            date(2022, 10, 4): 100,
+            date(2022, 10, 5): 120,
+        },
+    )
+    record_sell(77, "SLA", 4, 100, datetime(2022, 10, 4))
+    database.session.commit()
+
+    assert update_portfolio_history(77, date(2022, 10, 5)) == 3
+    assert get_portfolio_history(77)[1] == [1000, 600, 720]
+    assert get_portfolio_value_as_of(77, date(2022, 10, 3)).value == 1000
+    assert get_portfolio_value_as_of(77, date(2022, 10, 5)).value == 720
+
+
+def test_get_portfolio_value_as_of(test_client, app_context):
+    """
+    GIVEN the lots of a user and the daily prices stored in the database
+    WHEN the value of the portfolio on past dates is requested
+    THEN check that the last close on or before each date is used and
+        that the lots purchased after the date are excluded
+    """
+    database.session.add(Stock("VAA", "2", "1.00", 86, datetime(2022, 7, 1)))
+    database.session.add(Stock("VAB", "3", "1.00", 86, datetime(2022, 7, 5)))
+    add_daily_prices("VAA", {date(2022, 7, 1): 100, date(2022, 7, 5): 120})
+    add_daily_prices("VAB", {date(2022, 7, 6): 50})
+
+    valuation = get_portfolio_value_as_of(86, date(2022, 7, 4))
+    assert valuation.value == 200
+    assert [holding.stock_symbol for holding in valuation.holdings] == ["VAA"]
+    assert valuation.holdings[0].close_date == date(2022, 7, 1)
+
+    # VAB was purchased, but has no close on or before the date
+    valuation = get_portfolio_value_as_of(86, date(2022, 7, 5))
+    assert valuation.value == 240
+    assert valuation.holdings[1].close_date is None
+
+    # the cached closes are reloaded after a close changes
+    add_daily_prices("VAB", {date(2022, 7, 6): 60})
+    valuation = get_portfolio_value_as_of(86, date(2022, 7, 31))
+    assert valuation.value == 240 + 180
+    assert get_portfolio_value_as_of(12345, date(2022, 7, 31)).holdings == []
@@ -0,0 +1,122 @@
+"""
+This file contains the unit tests for indicators.py.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from project import database
+from project.indicators import (
+    compute_bollinger_bands,
+    compute_ema,
+    compute_rsi,
+    compute_sma,
+    get_indicator,
+    get_indicator_overlays,
+)
+from project.models import DailyPrice
+
+# random walk of closes used by the tests
+VALUES = 100.0 + np.cumsum(np.random.default_rng(38).normal(0, 1, 1000))
+
+
+def test_compute_sma():
+    """
+    GIVEN a series of closes
+    WHEN the simple moving average is computed
+    THEN check it against the mean of each window
+    """
+    sma = compute_sma(VALUES, 20)
+    assert np.isnan(sma[:19]).all()
+    windows = np.lib.stride_tricks.sliding_window_view(VALUES, 20)
+    expected = windows.mean(axis=1)
+    assert sma[19:] == pytest.approx(expected)
+    assert np.isnan(compute_sma(VALUES[:5], 20)).all()
+
+
+def test_compute_ema():
+    """
+    GIVEN a series of closes (longer than a block of the computation)
+    WHEN the exponential moving average is computed
+    THEN check it against the recurrence, one value at a time
+    """
+    for span in (2, 20):
+        alpha = 2.0 / (span + 1)
+        expected = [VALUES[0]]
+        for value in VALUES[1:]:
+            expected.append((1 - alpha) * expected[-1] + alpha * value)
+        assert compute_ema(VALUES, span) == pytest.approx(expected)
+
+
+def test_compute_rsi():
+    """
+    GIVEN a series of closes
+    WHEN the relative strength index is computed
+    THEN check it against Wilder's smoothing, one value at a time
+    """
+    changes = np.diff(VALUES[:100])
+    average_gain = np.clip(changes[:14], 0, None).mean()
+    average_loss = np.clip(-changes[:14], 0, None).mean()
+    expected = [100 - 100 / (1 + average_gain / average_loss)]
+    for change in changes[14:]:
+        average_gain = (average_gain * 13 + max(change, 0)) / 14
+        average_loss = (average_loss * 13 + max(-change, 0)) / 14
+        expected.append(100 - 100 / (1 + average_gain / average_loss))
+
+    rsi = compute_rsi(VALUES[:100], 14)
+    assert np.isnan(rsi[:14]).all()
+    assert rsi[14:] == pytest.approx(expected)
+    assert compute_rsi(np.arange(30.0), 14)[-1] == 100.0
+
+
+def test_compute_bollinger_bands():
+    """
+    GIVEN a series of closes
+    WHEN the Bollinger bands are computed
+    THEN check them against the mean and std deviation of each window
+    """
+    upper, lower = compute_bollinger_bands(VALUES, 20, 2.0)
+    window = VALUES[80:100]
+    assert upper[99] == pytest.approx(window.mean() + 2 * window.std())
+    assert lower[99] == pytest.approx(window.mean() - 2 * window.std())
+
+
+def test_get_indicator_cached(test_client, app_context):
+    """
+    GIVEN daily prices stored for a stock
+    WHEN an indicator is requested twice, and after the last bar is
+        revised or a new bar is added
+    THEN check that it is computed once per last bar (date and close)
+    """
+    first_day = date(2022, 1, 3)
+    DailyPrice.add_prices(
+        "INA",
+        [
+            (first_day + timedelta(days=day), close, close, close, close)
+            for day, close in enumerate(range(100, 130))
+        ],
+    )
+    database.session.commit()
+
+    (sma,) = get_indicator("INA", "daily", "sma20")
+    assert sma[-1] == pytest.approx(np.mean(np.arange(110, 130)) / 100)
+    assert get_indicator("INA", "daily", "sma20")[0] is sma
+
+    DailyPrice.add_prices("INA", [(date(2022, 2, 1), 149, 149, 149, 149)])
+    database.session.commit()
+    (revised_sma,) = get_indicator("INA", "daily", "sma20")
+    assert revised_sma[-1] == pytest.approx(sma[-1] + 0.01)
+
+    DailyPrice.add_prices("INA", [(date(2022, 2, 2), 200, 200, 200, 200)])
+    database.session.commit()
+    assert get_indicator("INA", "daily", "sma20")[0] is not revised_sma
+    assert get_indicator("INB", "daily", "sma20") is None
+
+    overlays = get_indicator_overlays("INA", "daily", ["bollinger20"], 25)
+    assert [overlay["label"] for overlay in overlays] == [
+        "Bollinger Upper (20, 2)",
+        "Bollinger Lower (20, 2)",
+    ]
+    assert len(overlays[0]["values"]) == 25
+    assert overlays[0]["values"][0] is None
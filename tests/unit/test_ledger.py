@@ -0,0 +1,82 @@
+"""
+This file contains the unit tests for ledger.py.
+"""
+from datetime import datetime
+
+import pytest
+
+from project import database, ledger
+from project.ledger import record_buy, record_sell
+from project.models import Position, Stock, Transaction
+
+
+def add_buys(symbol, user_id):
+    # helper to record the purchase of two lots (10 @ $1.00, 10 @ $2.00)
+    buys = [
+        record_buy(Stock(symbol, "10", "1.00", user_id, datetime(2022, 1, 3))),
+        record_buy(Stock(symbol, "10", "2.00", user_id, datetime(2022, 2, 1))),
+    ]
+    database.session.commit()
+    return buys
+
+
+def test_record_sell_fifo(test_client, app_context, monkeypatch):
+    """
+    GIVEN two buys of a stock
+    WHEN 15 shares are sold using FIFO (matching one buy at a time)
+    THEN check that the oldest shares are sold first
+    """
+    monkeypatch.setattr(ledger, "MATCH_BATCH_SIZE", 1)
+    buys = add_buys("LFA", 85)
+
+    sell = record_sell(85, "LFA", 15, 300, datetime(2022, 3, 1))
+    database.session.commit()
+    assert sell.realized_gain == 10 * 200 + 5 * 100
+    assert [buy.remaining_shares for buy in buys] == [0, 5]
+    assert [buy.stock.number_of_shares for buy in buys] == [0, 5]
+    assert buys[0].stock.stock_symbol == "LFA"
+
+    position = Position.query.filter_by(user_id=85, stock_symbol="LFA").one()
+    assert position.number_of_shares == 5
+    assert position.cost_basis == 5 * 200
+    assert position.realized_gain == 2500
+
+
+def test_record_sell_lifo(test_client, app_context):
+    """
+    GIVEN two buys of a stock
+    WHEN 15 shares are sold using LIFO, and then the remaining shares
+    THEN check that the newest shares are sold first
+    """
+    buys = add_buys("LFB", 84)
+
+    sell = record_sell(84, "LFB", 15, 300, datetime(2022, 3, 1), "lifo")
+    assert sell.realized_gain == 10 * 100 + 5 * 200
+    assert [buy.remaining_shares for buy in buys] == [5, 0]
+
+    sell = record_sell(84, "LFB", 5, 50, datetime(2022, 3, 2), "lifo")
+    database.session.commit()
+    assert sell.realized_gain == 5 * -50
+
+    position = Position.query.filter_by(user_id=84, stock_symbol="LFB").one()
+    assert position.number_of_shares == 0
+    assert position.cost_basis == 0
+    assert position.realized_gain == 2000 - 250
+    assert Transaction.query.filter_by(user_id=84).count() == 4
+
+
+def test_record_sell_invalid(test_client, app_context):
+    """
+    GIVEN two buys of a stock
+    WHEN more shares are sold than held on the sale date,
+        or an invalid lot matching method is used
+    THEN check that a ValueError is raised
+    """
+    add_buys("LFC", 83)
+
+    with pytest.raises(ValueError, match="Only 10 shares"):
+        record_sell(83, "LFC", 11, 300, datetime(2022, 1, 31))
+    with pytest.raises(ValueError, match="Only 0 shares"):
+        record_sell(83, "LFD", 1, 300, datetime(2022, 3, 1))
+    with pytest.raises(ValueError, match="Invalid lot matching method"):
+        record_sell(83, "LFC", 1, 300, datetime(2022, 3, 1), "hifo")
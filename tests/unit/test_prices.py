@@ -0,0 +1,229 @@
+"""
+This file contains the unit tests for prices.py.
+"""
+from datetime import datetime
+
+import requests
+
+from project import database
+from project.models import DailyPrice, PortfolioSnapshot, Position, Stock
+from project.prices import (
+    iter_refreshed_prices,
+    propagate_prices,
+    refresh_stock_prices,
+)
+
+
+def add_lot(symbol, number_of_shares, purchase_price, user_id=98):
+    # helper to add a lot (and its position) like the add_stock route
+    stock = Stock(
+        symbol, number_of_shares, purchase_price, user_id, datetime(2022, 1, 3)
+    )
+    database.session.add(stock)
+    Position.add_lot(stock)
+    PortfolioSnapshot.update_for_users([user_id])
+    database.session.commit()
+    return stock
+
+
+def test_position_add_lot(test_client, app_context):
+    """
+    GIVEN a Position model
+    WHEN two lots of the same stock are purchased
+    THEN check that the position combines the lots
+    """
+    add_lot("ORCL", "10", "100.00")
+    add_lot("ORCL", "30", "120.00")
+    position = Position.query.filter_by(user_id=98, stock_symbol="ORCL").one()
+    assert position.number_of_shares == 40
+    assert position.cost_basis == 10 * 10000 + 30 * 12000
+    assert position.average_cost == 11500
+    assert position.market_value == 0
+
+
+def test_create_command(test_client, app_context):
+    """
+    GIVEN a Flask application configured for testing
+    WHEN a lot is created with the 'flask stocks create' command, with
+        and without a user
+    THEN check that the position and the snapshot of the user are added,
+        and that a lot without a user is added alone
+    """
+    runner = test_client.application.test_cli_runner()
+    result = runner.invoke(args=["stocks", "create", "IBM", "4", "125", "81"])
+    assert result.exit_code == 0
+    position = Position.query.filter_by(user_id=81, stock_symbol="IBM").one()
+    assert position.number_of_shares == 4
+    snapshot = PortfolioSnapshot.query.filter_by(user_id=81).one()
+    assert snapshot.cost_basis == 4 * 12500
+
+    result = runner.invoke(args=["stocks", "create", "ACN", "3", "250"])
+    assert result.exit_code == 0
+    stock = Stock.query.filter_by(stock_symbol="ACN").one()
+    assert stock.user_id is None
+    assert Position.query.filter_by(stock_symbol="ACN").count() == 0
+
+
+def test_refresh_stock_prices(
+    test_client, app_context, monkeypatch, mock_requests_get_success_daily
+):
+    """
+    GIVEN lots of the same stock for two users
+        and a monkeypatched version of requests.get()
+    WHEN the current prices are refreshed for the lots of one user
+    THEN check that the price is retrieved once and written to every lot
+        and position with that symbol
+    """
+    add_lot("INTC", "10", "30.00", user_id=97)
+    lots = [add_lot("INTC", "5", "35.00"), add_lot("INTC", "7", "32.00")]
+
+    urls = []
+    mock_get = requests.get
+    monkeypatch.setattr(
+        requests, "get", lambda url: urls.append(url) or mock_get(url)
+    )
+
+    assert refresh_stock_prices(lots).keys() == {"INTC"}
+    database.session.commit()
+    assert len(urls) == 1
+    for stock in Stock.query.filter_by(stock_symbol="INTC").all():
+        assert stock.current_price == 14834
+        assert stock.position_value == 14834 * stock.number_of_shares
+    for position in Position.query.filter_by(stock_symbol="INTC").all():
+        assert position.current_price == 14834
+        assert position.market_value == 14834 * position.number_of_shares
+
+    # the prices are already current, so they are not retrieved again
+    assert refresh_stock_prices(lots) == {}
+    assert len(urls) == 1
+
+
+def test_portfolio_snapshot_add_lot(test_client, app_context):
+    """
+    GIVEN a PortfolioSnapshot model
+    WHEN lots are purchased by a user
+    THEN check that the snapshot holds the totals of the portfolio
+    """
+    add_lot("CSCO", "10", "40.00", user_id=96)
+    add_lot("QCOM", "4", "150.00", user_id=96)
+    snapshot = PortfolioSnapshot.query.filter_by(user_id=96).one()
+    assert snapshot.value == 0
+    assert snapshot.cost_basis == 10 * 4000 + 4 * 15000
+    assert snapshot.gain == -snapshot.cost_basis
+
+
+def test_refresh_stock_prices_updates_snapshots(
+    test_client, app_context, mock_requests_get_success_daily
+):
+    """
+    GIVEN lots of the same stock for two users
+        and a monkeypatched version of requests.get()
+    WHEN the current prices are refreshed for the lots of one user
+    THEN check that the snapshots of both users are updated
+    """
+    add_lot("AMD", "10", "80.00", user_id=95)
+    lots = [add_lot("AMD", "3", "90.00", user_id=94)]
+
+    refresh_stock_prices(lots)
+    database.session.commit()
+    snapshot = PortfolioSnapshot.query.filter_by(user_id=95).one()
+    assert snapshot.value == 10 * 14834
+    assert snapshot.gain == 10 * 14834 - 10 * 8000
+    snapshot = PortfolioSnapshot.query.filter_by(user_id=94).one()
+    assert snapshot.value == 3 * 14834
+
+
+def test_iter_refreshed_prices(
+    test_client, app_context, monkeypatch, mock_requests_get_success_daily
+):
+    """
+    GIVEN a monkeypatched version of requests.get() that fails for one
+        of the symbols
+    WHEN the prices of the symbols are refreshed one at a time
+    THEN check that each symbol is generated once, with its latest price
+        (or None if it could not be retrieved), after its prices are
+        stored
+    """
+    mock_get = requests.get
+
+    def get(url):
+        if "PRB" in url:
+            raise requests.exceptions.ConnectionError()
+        return mock_get(url)
+
+    monkeypatch.setattr(requests, "get", get)
+    latest_prices = {}
+    for symbol, latest_price in iter_refreshed_prices(["PRA", "PRB", "PRC"]):
+        assert symbol not in latest_prices
+        latest_prices[symbol] = latest_price
+        if latest_price is not None:
+            assert DailyPrice.query.filter_by(stock_symbol=symbol).count()
+
+    assert latest_prices["PRB"] is None
+    assert latest_prices["PRA"][4] == 14834
+    assert latest_prices["PRC"][4] == 14834
+
+
+def test_refresh_stock_prices_of_one_user(
+    test_client, app_context, monkeypatch, mock_requests_get_success_daily
+):
+    """
+    GIVEN lots of the same stock for two users
+        and a monkeypatched version of requests.get()
+    WHEN the current prices are refreshed for the lots of each user in
+        turn
+    THEN check that only the lots, the position and the snapshot of that
+        user are updated, and that the price is retrieved once
+    """
+    other_lot = add_lot("MU", "8", "60.00", user_id=76)
+    lot = add_lot("MU", "2", "70.00", user_id=75)
+
+    urls = []
+    mock_get = requests.get
+    monkeypatch.setattr(
+        requests, "get", lambda url: urls.append(url) or mock_get(url)
+    )
+
+    assert refresh_stock_prices([lot], [75]).keys() == {"MU"}
+    database.session.commit()
+    assert lot.current_price == 14834
+    assert other_lot.current_price == 0
+    position = Position.query.filter_by(user_id=76, stock_symbol="MU").one()
+    assert position.market_value == 0
+    assert PortfolioSnapshot.query.filter_by(user_id=76).one().value == 0
+    assert PortfolioSnapshot.query.filter_by(user_id=75).one().value == (
+        2 * 14834
+    )
+
+    # (the price retrieved today for the other user is reused)
+    assert refresh_stock_prices([other_lot], [76])["MU"][4] == 14834
+    database.session.commit()
+    assert other_lot.current_price == 14834
+    assert len(urls) == 1
+
+
+def test_propagate_prices(
+    test_client, app_context, mock_requests_get_success_daily
+):
+    """
+    GIVEN lots of the same stock for two users, with the price refreshed
+        for the lots of one user
+    WHEN the current price is propagated
+    THEN check that the lots, the position and the snapshot of the other
+        user are updated
+    """
+    other_lot = add_lot("TXN", "5", "150.00", user_id=74)
+    lot = add_lot("TXN", "1", "160.00", user_id=73)
+    refresh_stock_prices([lot], [73])
+    database.session.commit()
+    assert other_lot.current_price == 0
+
+    propagate_prices({"TXN": 14834})
+    database.session.commit()
+    assert other_lot.current_price == 14834
+    assert other_lot.position_value == 5 * 14834
+    position = Position.query.filter_by(user_id=74, stock_symbol="TXN").one()
+    assert position.market_value == 5 * 14834
+    assert PortfolioSnapshot.query.filter_by(user_id=74).one().value == (
+        5 * 14834
+    )
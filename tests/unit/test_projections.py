@@ -0,0 +1,155 @@
+"""
+This file contains the unit tests for projections.py.
+"""
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from project import database, projections
+from project.models import DailyPrice, Stock
+from project.projections import (
+    compute_shock_factor,
+    estimate_return_statistics,
+    get_holdings,
+    get_projection,
+    run_simulations,
+    simulate_portfolio_values,
+)
+
+
+def test_get_holdings():
+    """
+    GIVEN the lots and the sales of a user
+    WHEN the holdings are summed
+    THEN check that the symbols whose shares were all sold are left out
+    """
+    lots = [
+        ("PJC", date(2022, 1, 3), 10),
+        ("PJD", date(2022, 1, 3), 5),
+        ("PJC", date(2022, 2, 1), 4),
+        ("PJD", date(2022, 3, 1), -5),
+    ]
+    assert get_holdings(lots) == {"PJC": 14}
+    assert get_holdings([]) == {}
+
+
+def test_estimate_return_statistics():
+    """
+    GIVEN the daily closes of two stocks (one without a close at first)
+    WHEN the statistics of the daily log returns are estimated
+    THEN check the mean and covariance of the days with every close
+    """
+    closes = np.array([[100, 0], [110, 200], [121, 220], [110, 200]])
+    mean, covariance = estimate_return_statistics(closes)
+    log_returns = np.log([1.1, 1 / 1.1])
+    assert mean == pytest.approx([log_returns.mean()] * 2)
+    assert covariance == pytest.approx(
+        np.full((2, 2), np.var(log_returns, ddof=1))
+    )
+    assert estimate_return_statistics(closes[:2]) == (None, None)
+
+
+def test_simulate_portfolio_values_without_volatility():
+    """
+    GIVEN the holdings of a portfolio and returns without volatility
+    WHEN the values of the portfolio are simulated
+    THEN check that every path grows at the mean return
+    """
+    mean = np.array([0.01, -0.01])
+    shock_factor = compute_shock_factor(np.zeros((2, 2)))
+    values = simulate_portfolio_values(
+        np.array([1000.0, 500.0]), mean, shock_factor, 3, 4, seed=1
+    )
+    days = np.arange(1, 4)
+    expected = 1000.0 * np.exp(0.01 * days) + 500.0 * np.exp(-0.01 * days)
+    assert values.shape == (4, 3)
+    assert values == pytest.approx(np.tile(expected, (4, 1)))
+
+
+def test_run_simulations_with_workers():
+    """
+    GIVEN the statistics of the returns of a portfolio
+    WHEN the simulations are run with and without a pool of processes
+    THEN check that the same (seeded) paths are simulated
+    """
+    covariance = np.array([[0.0004, 0.0001], [0.0001, 0.0009]])
+    arguments = (
+        np.array([1000.0, 500.0]),
+        np.array([0.0005, 0.0002]),
+        compute_shock_factor(covariance),
+        5,
+        1200,
+    )
+    values = run_simulations(*arguments, workers=1, seed=7)
+    assert values.shape == (1200, 5)
+    assert run_simulations(*arguments, workers=2, seed=7) == pytest.approx(
+        values
+    )
+
+
+def test_get_projection(test_client, app_context):
+    """
+    GIVEN the lots of a user and the daily prices stored in the database
+    WHEN the projection of the portfolio is requested
+    THEN check that it is computed by a background job and then cached
+    """
+    for day, close in enumerate([100, 102, 99, 103, 105, 104], start=1):
+        prices = [(date(2022, 10, day), close, close, close, close)]
+        DailyPrice.add_prices("PJA", prices)
+    database.session.add(Stock("PJA", "10", "1.00", 87, datetime(2022, 10, 1)))
+    database.session.commit()
+
+    status, projection = get_projection(87)
+    assert status == "pending"
+    for _ in range(100):
+        status, projection = get_projection(87)
+        if status != "pending":
+            break
+        time.sleep(0.05)
+
+    assert status == "done"
+    assert projection.as_of == date(2022, 10, 6)
+    assert projection.value == 1040
+    assert projection.number_of_simulations == 400
+    assert len(projection.bands[50]) == projection.horizon_days == 20
+    bands = np.array(
+        [projection.bands[percentile] for percentile in (5, 50, 95)]
+    )
+    assert (np.diff(bands, axis=0) >= 0).all()
+    assert get_projection(87) == ("done", projection)
+    assert get_projection(12345) == ("unavailable", None)
+
+
+def test_get_projection_failed(test_client, app_context, monkeypatch):
+    """
+    GIVEN the lots of a user and the daily prices stored in the database
+    WHEN the projection of the portfolio fails
+    THEN check that the error is returned without starting another job
+    """
+    for day, close in enumerate([100, 102, 99, 103], start=1):
+        prices = [(date(2022, 11, day), close, close, close, close)]
+        DailyPrice.add_prices("PJB", prices)
+    database.session.add(Stock("PJB", "10", "1.00", 78, datetime(2022, 11, 1)))
+    database.session.commit()
+
+    calls = []
+
+    def failing_compute_projection(user_id, latest_date):
+        calls.append(user_id)
+        raise ValueError("Simulation failed!")
+
+    monkeypatch.setattr(
+        projections, "compute_projection", failing_compute_projection
+    )
+    status, _ = get_projection(78)
+    for _ in range(100):
+        status, projection = get_projection(78)
+        if status != "pending":
+            break
+        time.sleep(0.05)
+
+    assert (status, projection) == ("error", None)
+    assert get_projection(78) == ("error", None)
+    assert calls == [78]
@@ -0,0 +1,185 @@
+"""
+This file contains the unit tests for queries.py.
+"""
+from datetime import datetime
+
+import pytest
+
+from project import database
+from project.models import Stock
+from project.queries import (
+    decode_cursor,
+    encode_cursor,
+    get_portfolio_summary,
+    get_portfolio_totals,
+    get_stocks_page,
+)
+
+
+def get_all_pages(sort, order, symbol="", per_page=2, user_id=99):
+    # helper to page through all the stocks of the paging user
+    stocks, cursor = get_stocks_page(
+        user_id, sort=sort, order=order, symbol=symbol, per_page=per_page
+    )
+    pages = [stocks]
+    while cursor is not None:
+        stocks, cursor = get_stocks_page(
+            user_id,
+            sort=sort,
+            order=order,
+            symbol=symbol,
+            cursor=decode_cursor(cursor, sort),
+            per_page=per_page,
+        )
+        pages.append(stocks)
+    return pages
+
+
+def test_get_stocks_page_sort_by_symbol(test_client, add_stocks_for_paging):
+    """
+    GIVEN a set of stocks in the database
+    WHEN the stocks are paged through sorted by symbol
+    THEN check that each stock is returned once in the correct order
+    """
+    pages = get_all_pages("symbol", "asc")
+    assert [len(page) for page in pages] == [2, 2, 1]
+    symbols = [stock.stock_symbol for page in pages for stock in page]
+    assert symbols == ["AAPL", "AAPL", "AMZN", "MSFT", "SBUX"]
+
+
+def test_get_stocks_page_sort_by_value_descending(
+    test_client, add_stocks_for_paging
+):
+    """
+    GIVEN a set of stocks in the database
+    WHEN the stocks are paged through sorted by value (descending)
+    THEN check that each stock is returned once in the correct order
+    """
+    pages = get_all_pages("value", "desc")
+    values = [stock.position_value for page in pages for stock in page]
+    assert values == [3000000, 2800000, 1650000, 1200000, 400000]
+
+
+def test_get_stocks_page_sort_by_purchase_date(
+    test_client, add_stocks_for_paging
+):
+    """
+    GIVEN a set of stocks in the database
+    WHEN the stocks are paged through sorted by purchase date
+    THEN check that each stock is returned once in the correct order
+    """
+    pages = get_all_pages("purchase_date", "asc", per_page=3)
+    assert [len(page) for page in pages] == [3, 2]
+    symbols = [stock.stock_symbol for page in pages for stock in page]
+    assert symbols == ["SBUX", "AAPL", "MSFT", "AMZN", "AAPL"]
+
+
+def test_get_stocks_page_null_purchase_date(
+    test_client, add_stocks_for_paging
+):
+    """
+    GIVEN a set of stocks in the database, including stocks without a
+        purchase date
+    WHEN the stocks are paged through sorted by purchase date, with a
+        page ending on a stock without a purchase date
+    THEN check that each stock is returned once, with the stocks without
+        a purchase date last
+    """
+    stocks = [
+        Stock("NUL", "1", "10.00", 82),
+        Stock("DTA", "1", "10.00", 82, datetime(2022, 1, 3)),
+        Stock("NIL", "1", "10.00", 82),
+        Stock("DTB", "1", "10.00", 82, datetime(2022, 2, 1)),
+    ]
+    database.session.add_all(stocks)
+    database.session.commit()
+
+    pages = get_all_pages("purchase_date", "asc", per_page=3, user_id=82)
+    assert [len(page) for page in pages] == [3, 1]
+    symbols = [stock.stock_symbol for page in pages for stock in page]
+    assert symbols == ["DTA", "DTB", "NUL", "NIL"]
+    pages = get_all_pages("purchase_date", "desc", per_page=3, user_id=82)
+    symbols = [stock.stock_symbol for page in pages for stock in page]
+    assert symbols == ["DTB", "DTA", "NIL", "NUL"]
+
+    assert decode_cursor(encode_cursor(None, 7), "purchase_date") == (None, 7)
+
+
+def test_get_stocks_page_filter_by_symbol(test_client, add_stocks_for_paging):
+    """
+    GIVEN a set of stocks in the database
+    WHEN the stocks are filtered by a symbol prefix
+    THEN check that only the matching stocks are returned
+    """
+    pages = get_all_pages("symbol", "asc", symbol="a")
+    symbols = [stock.stock_symbol for page in pages for stock in page]
+    assert symbols == ["AAPL", "AAPL", "AMZN"]
+
+
+def test_get_portfolio_totals(test_client, add_stocks_for_paging):
+    """
+    GIVEN a set of stocks in the database
+    WHEN the totals of the portfolio are requested
+    THEN check that the totals cover all (matching) stocks in cents
+    """
+    totals = get_portfolio_totals(99)
+    assert totals.value == 9050000
+    assert totals.cost_basis == 250000 + 240000 + 1550000 + 120000 + 360000
+    assert totals.gain == totals.value - totals.cost_basis
+    assert totals.number_of_lots == 5
+
+    totals = get_portfolio_totals(99, "AAPL")
+    assert totals.value == 4200000
+    assert totals.cost_basis == 360000
+    assert totals.number_of_lots == 2
+
+
+def test_get_portfolio_totals_no_stocks(test_client, add_stocks_for_paging):
+    """
+    GIVEN a set of stocks in the database
+    WHEN the totals of a portfolio without any stocks are requested
+    THEN check that the totals are zero
+    """
+    totals = get_portfolio_totals(12345)
+    assert totals.value == 0
+    assert totals.cost_basis == 0
+    assert totals.gain == 0
+    assert totals.number_of_lots == 0
+
+
+def test_get_portfolio_summary(test_client, add_stocks_for_paging):
+    """
+    GIVEN a set of stocks in the database
+    WHEN the summary of the portfolio is requested
+    THEN check that the stocks are grouped by symbol
+    """
+    summary = get_portfolio_summary(99)
+    assert [holding.stock_symbol for holding in summary.holdings] == [
+        "AAPL",
+        "AMZN",
+        "MSFT",
+        "SBUX",
+    ]
+    aapl = summary.holdings[0]
+    assert aapl.number_of_shares == 28
+    assert aapl.number_of_lots == 2
+    assert aapl.value == 4200000
+    assert aapl.cost_basis == 360000
+    assert aapl.gain == 3840000
+    assert summary.totals == get_portfolio_totals(99)
+
+
+def test_decode_cursor_invalid():
+    """
+    GIVEN a helper function to decode a cursor
+    WHEN an invalid cursor is passed in
+    THEN check that a ValueError is raised
+    """
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", "symbol")
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("AAPL", 1), "value")
+    with pytest.raises(ValueError):
+        decode_cursor(
+            encode_cursor(datetime(2022, 1, 3), None), "purchase_date"
+        )
@@ -0,0 +1,105 @@
+"""
+This file contains the unit tests for quotes.py.
+"""
+from datetime import date, datetime
+
+import requests
+from flask import current_app
+
+from project import database
+from project.models import DailyPrice, Stock
+from project.quotes import get_quotes, quote_cache
+
+
+def test_get_quotes(
+    test_client, app_context, monkeypatch, mock_requests_get_success_daily
+):
+    """
+    GIVEN a lot of a stock
+        and a monkeypatched version of requests.get()
+    WHEN the quotes of two symbols are requested repeatedly
+    THEN check that they are retrieved once (in one refresh), and then
+        answered from the cache, or from the store once the cache is
+        cleared (for the held symbol)
+    """
+    database.session.add(Stock("QTB", "5", "10.00", 82, datetime(2022, 1, 3)))
+    database.session.commit()
+    urls = []
+    mock_get = requests.get
+    monkeypatch.setattr(
+        requests, "get", lambda url: urls.append(url) or mock_get(url)
+    )
+    now = datetime.now()
+
+    quotes = get_quotes(["QTA", "QTB"], now)
+    assert len(urls) == 2
+    quote, source = quotes["QTA"]
+    assert source == "upstream"
+    assert quote.price == 14834
+    assert quote.retrieved_at == now
+
+    quotes = get_quotes(["QTA", "QTB"], now)
+    assert {source for quote, source in quotes.values()} == {"cache"}
+
+    quote_cache.clear()
+    quotes = get_quotes(["QTA", "QTB"], now)
+    assert len(urls) == 3
+    assert quotes["QTA"][1] == "upstream"
+    assert quotes["QTB"][1] == "store"
+    assert quotes["QTB"][0].price == 14834
+
+
+def test_get_quotes_failed_refresh(
+    test_client, app_context, monkeypatch, mock_requests_get_failure
+):
+    """
+    GIVEN a monkeypatched version of requests.get() that fails
+    WHEN the quotes of a stored symbol and an unknown symbol are
+        requested three times, the last time after the retry delay
+    THEN check that the stored (old) quote is returned, that the unknown
+        symbol is left out and that the failed symbols are only retried
+        after the retry delay
+    """
+    DailyPrice.add_prices("QTD", [(date(2022, 1, 3), 500, 500, 500, 500)])
+    database.session.commit()
+    urls = []
+    mock_get = requests.get
+    monkeypatch.setattr(
+        requests, "get", lambda url: urls.append(url) or mock_get(url)
+    )
+
+    quotes = get_quotes(["QTD", "QTE"])
+    assert len(urls) == 2
+    assert get_quotes(["QTD", "QTE"]).keys() == {"QTD"}
+    assert len(urls) == 2
+    monkeypatch.setitem(current_app.config, "QUOTE_RETRY_SECONDS", 0)
+    assert get_quotes(["QTD", "QTE"]).keys() == {"QTD"}
+    assert len(urls) == 4
+    quote, source = quotes["QTD"]
+    assert (quote.price, quote.price_date, source) == (
+        500,
+        date(2022, 1, 3),
+        "store",
+    )
+    assert quote.retrieved_at == datetime(2022, 1, 3)
+    assert "QTE" not in quotes
+
+
+def test_get_quotes_not_refreshable(
+    test_client, app_context, monkeypatch, mock_requests_get_success_daily
+):
+    """
+    GIVEN a monkeypatched version of requests.get()
+    WHEN the quote of a symbol is requested, but the symbol is not one
+        of the symbols that can be refreshed
+    THEN check that the symbol is not retrieved from upstream
+    """
+    urls = []
+    mock_get = requests.get
+    monkeypatch.setattr(
+        requests, "get", lambda url: urls.append(url) or mock_get(url)
+    )
+
+    assert get_quotes(["QTH"], refreshable={"QTI"}) == {}
+    assert urls == []
+    assert get_quotes(["QTI"], refreshable={"QTI"})["QTI"][1] == "upstream"
@@ -0,0 +1,97 @@
+"""
+This file contains the unit tests for returns.py.
+"""
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from project import database
+from project.models import DailyPrice, PortfolioReturn, Stock
+from project.returns import compute_irr, compute_npv, update_portfolio_returns
+
+
+def add_daily_prices(symbol, closes):
+    # helper to store daily prices (as {date: close in cents})
+    DailyPrice.add_prices(
+        symbol,
+        [(day, close, close, close, close) for day, close in closes.items()],
+    )
+    database.session.commit()
+
+
+def test_compute_irr():
+    """
+    GIVEN the cash flows of three portfolios (one without a gain or loss
+        that can be solved)
+    WHEN the internal rates of return are computed
+    THEN check the rate of each portfolio
+    """
+    amounts = np.array(
+        [[-100.0, 0.0, 110.0], [-100.0, -100.0, 230.0], [-100.0, 0.0, 0.0]]
+    )
+    times = np.array([[0.0, 0.0, 1.0], [0.0, 0.5, 1.0], [0.0, 0.0, 1.0]])
+
+    rates = compute_irr(amounts, times)
+    assert rates[0] == pytest.approx(0.1)
+    assert compute_npv(rates[1:2], amounts[1:2], times[1:2]) == pytest.approx(
+        [0.0], abs=1e-6
+    )
+    assert np.isnan(rates[2])
+
+    # the bisection fallback finds the same rates
+    assert compute_irr(amounts, times, max_iterations=0)[:2] == pytest.approx(
+        rates[:2]
+    )
+
+
+def test_update_portfolio_returns(test_client, app_context):
+    """
+    GIVEN the lots of two users and the stored daily prices
+    WHEN the returns of their portfolios are computed in chunks of one
+        user
+    THEN check the time-weighted and money-weighted returns of each user
+    """
+    add_daily_prices("RTA", {date(2021, 1, 4): 100, date(2022, 1, 4): 110})
+    add_daily_prices(
+        "RTB",
+        {date(2021, 1, 4): 100, date(2021, 7, 5): 200, date(2022, 1, 4): 100},
+    )
+    database.session.add(Stock("RTA", "10", "1.00", 90, datetime(2021, 1, 4)))
+    database.session.add(Stock("RTB", "10", "1.00", 89, datetime(2021, 1, 4)))
+    database.session.add(Stock("RTB", "10", "2.00", 89, datetime(2021, 7, 5)))
+    database.session.commit()
+
+    assert update_portfolio_returns([89, 90], date(2022, 1, 4), 1) == 2
+
+    portfolio_return = PortfolioReturn.query.filter_by(user_id=90).first()
+    assert portfolio_return.as_of == date(2022, 1, 4)
+    assert portfolio_return.time_weighted_return == pytest.approx(0.1)
+    assert portfolio_return.money_weighted_return == pytest.approx(0.1)
+
+    # the price doubles and then halves: no time-weighted return, but a
+    # loss on the money invested at the higher price
+    portfolio_return = PortfolioReturn.query.filter_by(user_id=89).first()
+    assert portfolio_return.time_weighted_return == pytest.approx(0.0)
+    assert portfolio_return.money_weighted_return < 0.0
+
+
+def test_update_portfolio_returns_workers(test_client, app_context):
+    """
+    GIVEN the lots of a user and the daily prices stored in the database
+    WHEN the returns are computed by a pool of two worker processes
+    THEN check that the returns are stored, and updated by the next run
+    """
+    add_daily_prices("RTC", {date(2021, 2, 1): 100, date(2022, 2, 1): 120})
+    database.session.add(Stock("RTC", "10", "1.00", 88, datetime(2021, 2, 1)))
+    database.session.commit()
+
+    assert update_portfolio_returns([88, 12345], date(2022, 2, 1), 1, 2) == 1
+    portfolio_return = PortfolioReturn.query.filter_by(user_id=88).first()
+    assert portfolio_return.time_weighted_return == pytest.approx(0.2)
+
+    add_daily_prices("RTC", {date(2022, 2, 2): 150})
+    assert update_portfolio_returns([88], date(2022, 2, 2)) == 1
+    database.session.refresh(portfolio_return)
+    assert portfolio_return.as_of == date(2022, 2, 2)
+    assert portfolio_return.time_weighted_return == pytest.approx(0.5)